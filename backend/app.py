@@ -7,10 +7,27 @@ from functools import wraps
 import sqlite3
 import os
 import json
-import google.generativeai as genai
+import time
 from supabase import create_client, Client
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory, send_file
+from llm import get_llm_provider, LLMTimeoutError
+from note_actions import ACTIONS_PROMPT, NoteActionError, apply_actions, parse_actions, strip_actions
+import chat_sessions
+from note_summaries import note_excerpt, schedule_note_summary, schedule_summary_backfill
+import folder_digest
+from background import submit
+import render_jobs
+import manim_validator
+import render_quality
+import live_stream
+import video_delivery
+import video_media
+import storage
+import render_timings
+import render_leases
+import lessons
+import hmac
 
 app = Flask(__name__)
 
@@ -26,17 +43,24 @@ app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change this in production
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-DATABASE = 'users.db'
+DATABASE = os.getenv('DATABASE', 'users.db')
 
-# Configure Gemini AI (you'll need to set your API key)
-# Get your free API key from: https://makersuite.google.com/app/apikey
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'your-gemini-api-key-here')
-if GEMINI_API_KEY != 'your-gemini-api-key-here':
-    genai.configure(api_key=GEMINI_API_KEY)
+# Configure the LLM provider (see llm.py). Gemini needs GEMINI_API_KEY set;
+# get your free API key from: https://makersuite.google.com/app/apikey
+# Set LLM_PROVIDER=local to use the offline stand-in for load testing.
+llm_provider = get_llm_provider()
 
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+def ensure_columns(cursor, table, columns):
+    """Add columns that were introduced after a table first shipped"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+
 def init_db():
     """Initialize the database"""
     conn = sqlite3.connect(DATABASE)
@@ -93,8 +117,230 @@ def init_db():
         )
     ''')
     
+    # Chat sessions table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            title TEXT,
+            summary TEXT,
+            summarized_through INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    
+    # Chat messages table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            tokens INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id)')
+    
+    # Precomputed note summaries (filled in by a background job)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS note_summaries (
+            note_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            summary TEXT,
+            key_terms TEXT,
+            outline TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (note_id) REFERENCES notes (id)
+        )
+    ''')
+    
+    # Folder digest jobs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS digest_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            folder_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            total_steps INTEGER NOT NULL DEFAULT 0,
+            completed_steps INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (folder_id) REFERENCES folders (id)
+        )
+    ''')
+    
+    # Cached LLM summaries keyed by a hash of their prompt
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_summary_cache (
+            cache_key TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Render jobs (queued by /api/render-video, consumed by render workers)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS render_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT,
+            note_id INTEGER,
+            topic TEXT,
+            file_name TEXT NOT NULL,
+            scene_name TEXT,
+            manim_code TEXT NOT NULL,
+            cache_key TEXT,
+            scene_identity TEXT,
+            estimated_seconds REAL,
+            requested_quality TEXT,
+            render_quality TEXT,
+            upgrade_of INTEGER,
+            lease_owner TEXT,
+            lease_token TEXT,
+            lease_expires_at TIMESTAMP,
+            lease_attempts INTEGER NOT NULL DEFAULT 0,
+            repairs TEXT,
+            status TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            stage TEXT,
+            video_path TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    ensure_columns(cursor, 'render_jobs', [('cache_key', 'TEXT'), ('note_id', 'INTEGER'), ('scene_identity', 'TEXT'),
+                                           ('estimated_seconds', 'REAL'), ('requested_quality', 'TEXT'),
+                                           ('render_quality', 'TEXT'), ('upgrade_of', 'INTEGER'),
+                                           ('lease_owner', 'TEXT'), ('lease_token', 'TEXT'),
+                                           ('lease_expires_at', 'TIMESTAMP'),
+                                           ('lease_attempts', 'INTEGER NOT NULL DEFAULT 0'), ('repairs', 'TEXT')])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_render_jobs_status ON render_jobs (status, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_render_jobs_cache_key ON render_jobs (cache_key, status)')
+    
+    # Stage and per-animation timings of render jobs (render_timings.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS render_timings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            stage TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            animation INTEGER,
+            label TEXT,
+            frames INTEGER,
+            hits INTEGER,
+            misses INTEGER,
+            detail TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES render_jobs (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_render_timings_job ON render_timings (job_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_render_timings_stage ON render_timings (stage, created_at)')
+    
+    # Content-addressed cache of finished renders
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS render_cache (
+            cache_key TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Published videos: metadata, poster and sprite thumbnails (video_media.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_path TEXT UNIQUE NOT NULL,
+            note_id INTEGER,
+            job_id INTEGER,
+            user_email TEXT,
+            content_hash TEXT NOT NULL,
+            duration REAL,
+            fps REAL,
+            width INTEGER,
+            height INTEGER,
+            bit_rate INTEGER,
+            size_bytes INTEGER,
+            sprite TEXT,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP,
+            FOREIGN KEY (note_id) REFERENCES notes (id)
+        )
+    ''')
+    ensure_columns(cursor, 'videos', [('user_email', 'TEXT'), ('ref_count', 'INTEGER NOT NULL DEFAULT 0'),
+                                      ('last_used_at', 'TIMESTAMP')])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_note ON videos (note_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_videos_user ON videos (user_email)')
+    # Notes and users that joined another submission's render; video_path is set when it publishes
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS video_owners (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            video_path TEXT,
+            note_id INTEGER,
+            user_email TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES render_jobs (id),
+            FOREIGN KEY (note_id) REFERENCES notes (id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_owners_job ON video_owners (job_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_owners_path ON video_owners (video_path)')
+    
+    # Topic-to-video lessons (lessons.py) and their cached stage outputs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT,
+            topic TEXT NOT NULL,
+            topic_key TEXT NOT NULL,
+            quality TEXT,
+            status TEXT NOT NULL,
+            stage TEXT,
+            title TEXT,
+            sections TEXT,
+            stages TEXT,
+            render_job_id INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (render_job_id) REFERENCES render_jobs (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lesson_stage_cache (
+            cache_key TEXT PRIMARY KEY,
+            stage TEXT NOT NULL,
+            output TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Note versions (added after the notes table shipped)
+    ensure_columns(cursor, 'notes', [('version', 'INTEGER NOT NULL DEFAULT 1')])
+    
     conn.commit()
     conn.close()
+    
+    # Background jobs run on in-process threads and do not survive a restart
+    folder_digest.fail_interrupted_jobs(DATABASE)
+    lessons.fail_interrupted_lessons(DATABASE)
 
 def hash_password(password):
     """Hash a password using SHA-256"""
@@ -129,6 +375,32 @@ def token_required(f):
         return f(current_user_email, *args, **kwargs)
     return decorated
 
+def render_worker_required(f):
+    """Decorator for render node endpoints: requires the shared RENDER_WORKER_TOKEN"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not render_leases.RENDER_WORKER_TOKEN:
+            return jsonify({'error': 'Remote render workers are disabled'}), 404
+        token = request.headers.get('Authorization', '')
+        if token.startswith('Bearer '):
+            token = token[7:]
+        if not hmac.compare_digest(token.encode('utf-8'), render_leases.RENDER_WORKER_TOKEN.encode('utf-8')):
+            return jsonify({'error': 'Invalid render worker token'}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+def optional_user_email():
+    """Email from the JWT token if a valid one was sent, otherwise None"""
+    token = request.headers.get('Authorization')
+    if not token:
+        return None
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        return jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])['email']
+    except jwt.InvalidTokenError:
+        return None
+
 @app.route('/api/signup', methods=['POST'])
 def signup():
     data = request.get_json()
@@ -307,17 +579,21 @@ def get_notes(current_user_email):
         # Get notes
         if folder_id:
             cursor.execute('''
-                SELECT id, title, content, folder_id, created_at, updated_at 
-                FROM notes 
-                WHERE user_id = ? AND folder_id = ?
-                ORDER BY updated_at DESC
+                SELECT n.id, n.title, n.content, n.folder_id, n.created_at, n.updated_at, n.version,
+                       s.summary, s.key_terms
+                FROM notes n
+                LEFT JOIN note_summaries s ON s.note_id = n.id
+                WHERE n.user_id = ? AND n.folder_id = ?
+                ORDER BY n.updated_at DESC
             ''', (user_id, folder_id))
         else:
             cursor.execute('''
-                SELECT id, title, content, folder_id, created_at, updated_at 
-                FROM notes 
-                WHERE user_id = ? AND folder_id IS NULL
-                ORDER BY updated_at DESC
+                SELECT n.id, n.title, n.content, n.folder_id, n.created_at, n.updated_at, n.version,
+                       s.summary, s.key_terms
+                FROM notes n
+                LEFT JOIN note_summaries s ON s.note_id = n.id
+                WHERE n.user_id = ? AND n.folder_id IS NULL
+                ORDER BY n.updated_at DESC
             ''', (user_id,))
         
         notes = []
@@ -328,9 +604,16 @@ def get_notes(current_user_email):
                 'content': row[2],
                 'folder_id': row[3],
                 'created_at': row[4],
-                'updated_at': row[5]
+                'updated_at': row[5],
+                'version': row[6],
+                'excerpt': note_excerpt(row[7], row[2]),
+                'key_terms': json.loads(row[8]) if row[8] else []
             })
         
+        videos = video_media.media_for_notes(conn, [note['id'] for note in notes])
+        for note in notes:
+            note['videos'] = videos.get(note['id'], [])
+        
         conn.close()
         return jsonify({'notes': notes}), 200
         
@@ -365,6 +648,7 @@ def create_note(current_user_email):
         note_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        schedule_note_summary(DATABASE, note_id)
         
         return jsonify({
             'message': 'Note created successfully',
@@ -396,7 +680,7 @@ def update_note(current_user_email, note_id):
         # Update note
         cursor.execute('''
             UPDATE notes 
-            SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP
+            SET title = ?, content = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
             WHERE id = ? AND user_id = ?
         ''', (data.get('title'), data.get('content'), note_id, user_id))
         
@@ -405,6 +689,7 @@ def update_note(current_user_email, note_id):
         
         conn.commit()
         conn.close()
+        schedule_note_summary(DATABASE, note_id)
         
         return jsonify({'message': 'Note updated successfully'}), 200
         
@@ -415,9 +700,10 @@ def update_note(current_user_email, note_id):
 @token_required
 def ai_chat(current_user_email):
     """Chat with AI about notes"""
+    session_id = None
     try:
-        if GEMINI_API_KEY == 'your-gemini-api-key-here':
-            return jsonify({'error': 'Gemini API key not configured'}), 503
+        if not llm_provider.is_available():
+            return jsonify({'error': f'LLM provider "{llm_provider.name}" not configured'}), 503
             
         data = request.get_json()
         if not data or not data.get('message'):
@@ -435,9 +721,10 @@ def ai_chat(current_user_email):
         
         # Get all user's notes and folders for context
         cursor.execute('''
-            SELECT n.id, n.title, n.content, n.folder_id, f.name as folder_name
+            SELECT n.id, n.title, n.content, n.folder_id, f.name as folder_name, s.summary, s.key_terms
             FROM notes n
             LEFT JOIN folders f ON n.folder_id = f.id
+            LEFT JOIN note_summaries s ON s.note_id = n.id
             WHERE n.user_id = ?
             ORDER BY n.updated_at DESC
         ''', (user_id,))
@@ -445,10 +732,19 @@ def ai_chat(current_user_email):
         
         cursor.execute('SELECT id, name, parent_id FROM folders WHERE user_id = ?', (user_id,))
         all_folders = cursor.fetchall()
-        conn.close()
         
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Load or start the server-side chat session
+        session_id = data.get('session_id')
+        if session_id:
+            session = chat_sessions.get_session(conn, user_id, session_id)
+            if not session:
+                conn.close()
+                return jsonify({'error': 'Chat session not found'}), 404
+        else:
+            session_id = chat_sessions.create_session(conn, user_id, data['message'][:60])
+            session = chat_sessions.get_session(conn, user_id, session_id)
+        history_context = chat_sessions.build_history_context(conn, session)
+        conn.close()
         
         # Prepare comprehensive context
         user_message = data['message']
@@ -458,9 +754,10 @@ def ai_chat(current_user_email):
         # Format all notes for AI context
         notes_context = "All User's Notes:\n"
         for note in all_notes:
-            note_id, title, content, folder_id, folder_name = note
+            note_id, title, content, folder_id, folder_name, summary, key_terms = note
             folder_info = f" (in folder: {folder_name})" if folder_name else " (in root)"
-            notes_context += f"\n--- Note ID: {note_id} ---\nTitle: {title}{folder_info}\nContent: {content[:500]}{'...' if len(content) > 500 else ''}\n"
+            terms_info = f"\nKey terms: {', '.join(json.loads(key_terms))}" if key_terms else ""
+            notes_context += f"\n--- Note ID: {note_id} ---\nTitle: {title}{folder_info}\nSummary: {note_excerpt(summary, content)}{terms_info}\n"
         
         # Format folders for AI context
         folders_context = "\nUser's Folders:\n"
@@ -497,40 +794,63 @@ def ai_chat(current_user_email):
         CURRENT NOTE CONTEXT: {current_note_context if current_note_context else "No specific note selected"}
         CURRENT NOTE ID: {current_note_id if current_note_id else "None"}
         
+        CONVERSATION SO FAR:
+        {history_context}
+        
         USER MESSAGE: {user_message}
         
         INSTRUCTIONS:
-        - If user asks to create/edit notes, provide the formatted content
+        - If user asks to create/edit notes, provide the formatted content in the actions block
         - Use LaTeX for any mathematical expressions
-        - Suggest specific actions like "CREATE_NOTE", "EDIT_NOTE", "ORGANIZE_FOLDERS"
         - Be proactive in improving and organizing their notes
         - Create diagrams using ASCII art when helpful
         - Use rich HTML formatting for better readability
         
+        {ACTIONS_PROMPT}
         Respond helpfully and take action on their notes when appropriate.
         """
         
         # Generate response
-        response = model.generate_content(prompt)
+        ai_response = llm_provider.generate(prompt)
         
-        # Parse AI response for actions
-        ai_response = response.text
+        # Parse AI response for actions and apply them all in one transaction
         actions = []
+        action_error = None
+        try:
+            ai_response, parsed_actions = parse_actions(ai_response)
+            if parsed_actions:
+                conn = sqlite3.connect(DATABASE)
+                try:
+                    actions = apply_actions(conn, user_id, parsed_actions)
+                finally:
+                    conn.close()
+                for action in actions:
+                    schedule_note_summary(DATABASE, action['note_id'])
+        except NoteActionError as e:
+            ai_response = strip_actions(ai_response)
+            action_error = str(e)
+        
+        # Record the turn and fold old turns into the summary if it grew too long
+        conn = sqlite3.connect(DATABASE)
+        try:
+            chat_sessions.add_message(conn, session_id, 'user', user_message)
+            chat_sessions.add_message(conn, session_id, 'assistant', ai_response)
+            chat_sessions.maybe_schedule_summary(conn, DATABASE, session_id)
+        finally:
+            conn.close()
         
-        # Check if AI wants to create or edit notes
-        if "CREATE_NOTE:" in ai_response:
-            # Extract note creation instructions
-            pass
-        elif "EDIT_NOTE:" in ai_response:
-            # Extract note editing instructions
-            pass
-        
-        return jsonify({
+        result = {
             'response': ai_response,
             'actions': actions,
+            'session_id': session_id,
             'message': 'AI response with full note access generated successfully'
-        }), 200
+        }
+        if action_error:
+            result['action_error'] = action_error
+        return jsonify(result), 200
         
+    except LLMTimeoutError as e:
+        return jsonify({'error': f'AI service timed out: {str(e)}'}), 504
     except Exception as e:
         error_str = str(e)
         
@@ -551,14 +871,189 @@ def ai_chat(current_user_email):
             else:
                 fallback_response = f"I'm experiencing high demand but I can still help you manage your notes! I can:\n\n• **Create new notes** with rich formatting\n• **Edit existing notes** with LaTeX math\n• **Organize your content** with proper structure\n• **Add diagrams** and visual elements\n• **Format text** with various styles and sizes\n\nWhat would you like me to help you with? '{user_message[:50]}...' sounds interesting!"
             
+            fallback_response += "\n\n💡 **Note**: I'm currently experiencing high demand. For full AI assistance, try again in a few minutes."
+            
+            # Keep the session's history whole: record this turn like a normal reply
+            if session_id:
+                conn = sqlite3.connect(DATABASE)
+                try:
+                    chat_sessions.add_message(conn, session_id, 'user', data['message'])
+                    chat_sessions.add_message(conn, session_id, 'assistant', fallback_response)
+                    chat_sessions.maybe_schedule_summary(conn, DATABASE, session_id)
+                finally:
+                    conn.close()
+            
             return jsonify({
-                'response': fallback_response + "\n\n💡 **Note**: I'm currently experiencing high demand. For full AI assistance, try again in a few minutes.",
+                'response': fallback_response,
                 'actions': [],
+                'session_id': session_id,
                 'message': 'Fallback response with note management features'
             }), 200
         else:
             return jsonify({'error': f'AI service error: {str(e)}'}), 500
 
+@app.route('/api/ai/chat-sessions', methods=['GET'])
+@token_required
+def get_chat_sessions(current_user_email):
+    """List the current user's chat sessions"""
+    try:
+        conn = sqlite3.connect(DATABASE)
+        cursor = conn.cursor()
+        
+        # Get user ID
+        cursor.execute('SELECT id FROM users WHERE email = ?', (current_user_email,))
+        user = cursor.fetchone()
+        if not user:
+            conn.close()
+            return jsonify({'error': 'User not found'}), 404
+        user_id = user[0]
+        
+        cursor.execute('''
+            SELECT id, title, created_at, updated_at
+            FROM chat_sessions
+            WHERE user_id = ?
+            ORDER BY updated_at DESC
+        ''', (user_id,))
+        
+        sessions = []
+        for row in cursor.fetchall():
+            sessions.append({
+                'id': row[0],
+                'title': row[1],
+                'created_at': row[2],
+                'updated_at': row[3]
+            })
+        
+        conn.close()
+        return jsonify({'sessions': sessions}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ai/chat-sessions', methods=['POST'])
+@token_required
+def create_chat_session(current_user_email):
+    """Start a new chat session"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        conn = sqlite3.connect(DATABASE)
+        cursor = conn.cursor()
+        
+        # Get user ID
+        cursor.execute('SELECT id FROM users WHERE email = ?', (current_user_email,))
+        user = cursor.fetchone()
+        if not user:
+            conn.close()
+            return jsonify({'error': 'User not found'}), 404
+        user_id = user[0]
+        
+        session_id = chat_sessions.create_session(conn, user_id, data.get('title'))
+        conn.close()
+        
+        return jsonify({
+            'message': 'Chat session created successfully',
+            'session_id': session_id
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ai/chat-sessions/<int:session_id>', methods=['GET'])
+@token_required
+def get_chat_session(current_user_email, session_id):
+    """Get a chat session with its summary and messages"""
+    try:
+        conn = sqlite3.connect(DATABASE)
+        cursor = conn.cursor()
+        
+        # Get user ID
+        cursor.execute('SELECT id FROM users WHERE email = ?', (current_user_email,))
+        user = cursor.fetchone()
+        if not user:
+            conn.close()
+            return jsonify({'error': 'User not found'}), 404
+        user_id = user[0]
+        
+        session = chat_sessions.get_session(conn, user_id, session_id)
+        if not session:
+            conn.close()
+            return jsonify({'error': 'Chat session not found'}), 404
+        session['messages'] = chat_sessions.get_messages(conn, session_id)
+        conn.close()
+        
+        return jsonify({'session': session}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ai/folder-digest', methods=['POST'])
+@token_required
+def create_folder_digest(current_user_email):
+    """Start a study-guide digest of a folder and everything below it"""
+    try:
+        if not llm_provider.is_available():
+            return jsonify({'error': f'LLM provider "{llm_provider.name}" not configured'}), 503
+        
+        data = request.get_json()
+        if not data or not data.get('folder_id'):
+            return jsonify({'error': 'Folder ID is required'}), 400
+        folder_id = data['folder_id']
+        
+        conn = sqlite3.connect(DATABASE)
+        cursor = conn.cursor()
+        
+        # Get user ID
+        cursor.execute('SELECT id FROM users WHERE email = ?', (current_user_email,))
+        user = cursor.fetchone()
+        if not user:
+            conn.close()
+            return jsonify({'error': 'User not found'}), 404
+        user_id = user[0]
+        
+        cursor.execute('SELECT id FROM folders WHERE id = ? AND user_id = ?', (folder_id, user_id))
+        if not cursor.fetchone():
+            conn.close()
+            return jsonify({'error': 'Folder not found'}), 404
+        
+        job_id = folder_digest.create_job(conn, user_id, folder_id)
+        conn.close()
+        submit(folder_digest.run_job, DATABASE, job_id, user_id, folder_id)
+        
+        return jsonify({
+            'message': 'Folder digest started',
+            'job_id': job_id
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ai/folder-digest/<int:job_id>', methods=['GET'])
+@token_required
+def get_folder_digest(current_user_email, job_id):
+    """Get the status, progress and result of a folder digest job"""
+    try:
+        conn = sqlite3.connect(DATABASE)
+        cursor = conn.cursor()
+        
+        # Get user ID
+        cursor.execute('SELECT id FROM users WHERE email = ?', (current_user_email,))
+        user = cursor.fetchone()
+        if not user:
+            conn.close()
+            return jsonify({'error': 'User not found'}), 404
+        user_id = user[0]
+        
+        job = folder_digest.get_job(conn, user_id, job_id)
+        conn.close()
+        if not job:
+            return jsonify({'error': 'Digest job not found'}), 404
+        
+        return jsonify({'job': job}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 # New endpoint for AI to create notes
 @app.route('/api/ai/create-note', methods=['POST'])
 @token_required
@@ -588,6 +1083,7 @@ def ai_create_note(current_user_email):
         note_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        schedule_note_summary(DATABASE, note_id)
         
         return jsonify({
             'note_id': note_id,
@@ -631,24 +1127,25 @@ def ai_edit_note(current_user_email, note_id):
         if new_title and new_content:
             cursor.execute('''
                 UPDATE notes 
-                SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP
+                SET title = ?, content = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ? AND user_id = ?
             ''', (new_title, new_content, note_id, user_id))
         elif new_content:
             cursor.execute('''
                 UPDATE notes 
-                SET content = ?, updated_at = CURRENT_TIMESTAMP
+                SET content = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ? AND user_id = ?
             ''', (new_content, note_id, user_id))
         elif new_title:
             cursor.execute('''
                 UPDATE notes 
-                SET title = ?, updated_at = CURRENT_TIMESTAMP
+                SET title = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
                 WHERE id = ? AND user_id = ?
             ''', (new_title, note_id, user_id))
         
         conn.commit()
         conn.close()
+        schedule_note_summary(DATABASE, note_id)
         
         return jsonify({
             'note_id': note_id,
@@ -660,138 +1157,350 @@ def ai_edit_note(current_user_email, note_id):
 
 @app.route('/api/render-video', methods=['POST'])
 def render_video():
-    """Render a video using Manim - NO FALLBACKS, MANIM MUST WORK"""
+    """Queue a Manim render and return the job id immediately"""
     try:
         data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
         manim_code = data.get('manimCode', '')
-        print(f"Received Manim code:\n{manim_code}")
         file_name = data.get('fileName', 'untitled')
         topic = data.get('topic', 'Untitled Video')
+        note_id = data.get('noteId')  # optional; lets re-renders of a note reuse unchanged animations
+        quality = data.get('quality')  # profile like '720p30' or a manim -q flag; defaults to 480p15
+        adaptive = data.get('adaptive', True)  # allow a cheaper first render when the queue is busy
         
         if not manim_code:
             return jsonify({'error': 'No Manim code provided'}), 400
+        try:
+            quality = render_quality.normalize(quality)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Reject code that cannot render before it takes a worker slot
+        validation_started = time.perf_counter()
+        validation = manim_validator.validate(manim_code)
+        validation_seconds = time.perf_counter() - validation_started
+        if not validation['ok']:
+            return jsonify({
+                'error': 'Manim code failed validation',
+                'errors': validation['errors'],
+                'warnings': validation['warnings']
+            }), 422
         
-        # Clean filename for safety
-        safe_filename = "".join(c for c in file_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        safe_filename = safe_filename.replace(' ', '_')
+        user_email = optional_user_email()
+        conn = render_jobs.connect(DATABASE)
+        try:
+            storage.enforce_user_quota(conn, user_email)
+        except storage.QuotaExceeded as e:
+            conn.close()
+            return jsonify({
+                'error': 'Storage quota exceeded',
+                'used_bytes': e.used_bytes,
+                'quota_bytes': e.quota_bytes
+            }), 507
+        job_id = render_jobs.enqueue_job(conn, manim_code, file_name, topic, user_email, note_id,
+                                         quality, bool(adaptive))
+        render_timings.record(conn, job_id, 'validation', validation_seconds)
+        job = render_jobs.get_job(conn, job_id)
+        conn.close()
         
-        # Create videos directory if it doesn't exist
-        videos_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'public', 'videos')
-        os.makedirs(videos_dir, exist_ok=True)
+        return jsonify({
+            'job_id': job_id,
+            'job': job,
+            'eta_seconds': job['eta_seconds'],
+            'status_url': f'/api/render-jobs/{job_id}',
+            'events_url': f'/api/render-jobs/{job_id}/events',
+            'message': f'Video "{topic}" queued for rendering'
+        }), 202
         
-        # Create a temporary Python file with the Manim code
-        temp_py_file = os.path.join(videos_dir, f'{safe_filename}_temp.py')
+    except Exception as e:
+        error_msg = f'Failed to queue video render: {str(e)}'
+        print(error_msg)
+        return jsonify({'error': error_msg}), 500
+
+@app.route('/api/lessons', methods=['POST'])
+def create_lesson():
+    """Turn a topic into a video: script, Manim code, validation and render, each stage cached"""
+    try:
+        if not llm_provider.is_available():
+            return jsonify({'error': f'LLM provider "{llm_provider.name}" not configured'}), 503
         
-        with open(temp_py_file, 'w') as f:
-            f.write(manim_code)
+        data = request.get_json()
+        if not data or not (data.get('topic') or '').strip():
+            return jsonify({'error': 'Topic is required'}), 400
+        topic = data['topic'].strip()
+        try:
+            quality = render_quality.normalize(data.get('quality'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        user_email = optional_user_email()
+        conn = sqlite3.connect(DATABASE)
         try:
-            import subprocess
-            import shutil
-            import re
-            
-            # Extract scene class name from the code
-            scene_match = re.search(r'class\s+(\w+)\s*\(.*Scene.*\):', manim_code)
-            scene_name = scene_match.group(1) if scene_match else 'VideoLesson'
-            
-            # Path to Python 3.12 virtual environment
-            venv_python = os.path.join(os.path.dirname(__file__), 'venv312', 'bin', 'python')
-            venv_manim = os.path.join(os.path.dirname(__file__), 'venv312', 'bin', 'manim')
-            
-            # Check if venv manim exists
-            if not os.path.exists(venv_manim):
-                raise Exception(f"Manim not found in virtual environment: {venv_manim}")
-            
-            # Run manim command using the virtual environment
-            cmd = [
-                venv_manim,
-                '-pql',  # preview, quality low, write to file
-                '--media_dir', videos_dir,
-                temp_py_file,
-                scene_name
-            ]
-            
-            print(f"Running Manim command: {' '.join(cmd)}")
-            
-            # Run manim with timeout
-            result = subprocess.run(
-                cmd,
-                timeout=180,  # 3 minute timeout
-                capture_output=True,
-                text=True,
-                cwd=videos_dir
-            )
-            
-            print(f"Manim exit code: {result.returncode}")
-            print(f"Manim stdout: {result.stdout}")
-            print(f"Manim stderr: {result.stderr}")
-            
-            if result.returncode != 0:
-                raise Exception(f"Manim failed with exit code {result.returncode}: {result.stderr}")
-            
-            # Manim succeeded, find the generated video file
-            # Manim typically outputs to: media_dir/videos/scene_file/quality/scene_name.mp4
-            manim_output_dir = os.path.join(videos_dir, 'videos', os.path.splitext(os.path.basename(temp_py_file))[0], '480p15')
-            expected_video = os.path.join(manim_output_dir, f'{scene_name}.mp4')
-            
-            print(f"Looking for video at: {expected_video}")
-            
-            if not os.path.exists(expected_video):
-                # Try alternative output locations
-                alternative_paths = [
-                    os.path.join(videos_dir, 'videos', os.path.splitext(os.path.basename(temp_py_file))[0], '480p15', f'{scene_name}.mp4'),
-                    os.path.join(videos_dir, 'videos', os.path.splitext(os.path.basename(temp_py_file))[0], '720p30', f'{scene_name}.mp4'),
-                    os.path.join(videos_dir, 'videos', os.path.splitext(os.path.basename(temp_py_file))[0], '1080p60', f'{scene_name}.mp4'),
-                ]
-                
-                for alt_path in alternative_paths:
-                    print(f"Checking alternative path: {alt_path}")
-                    if os.path.exists(alt_path):
-                        expected_video = alt_path
-                        break
-                else:
-                    # List what was actually created
-                    if os.path.exists(os.path.join(videos_dir, 'videos')):
-                        print("Contents of videos directory:")
-                        for root, dirs, files in os.walk(os.path.join(videos_dir, 'videos')):
-                            for file in files:
-                                print(f"  {os.path.join(root, file)}")
-                    raise Exception(f"Video file not found. Expected at: {expected_video}")
-            
-            final_video_path = os.path.join(videos_dir, f'{safe_filename}.mp4')
-            
-            # Move the video to our desired location
-            shutil.move(expected_video, final_video_path)
-            
-            # Clean up temporary directories
-            try:
-                shutil.rmtree(os.path.join(videos_dir, 'videos'))
-            except Exception as cleanup_error:
-                print(f"Cleanup warning: {cleanup_error}")
-            
-            print(f"Video successfully created: {final_video_path}")
-            
+            storage.enforce_user_quota(conn, user_email)
+        except storage.QuotaExceeded as e:
+            conn.close()
             return jsonify({
-                'success': True,
-                'video_path': f'/videos/{safe_filename}.mp4',
-                'message': f'Video "{topic}" rendered successfully with Manim',
-                'method': 'manim'
-            }), 200
+                'error': 'Storage quota exceeded',
+                'used_bytes': e.used_bytes,
+                'quota_bytes': e.quota_bytes
+            }), 507
+        lesson_id = lessons.create_lesson(conn, user_email, topic, quality)
+        conn.close()
+        submit(lessons.run_job, DATABASE, lesson_id, topic, user_email, quality)
         
-        finally:
-            # Clean up temporary Python file
-            if os.path.exists(temp_py_file):
-                try:
-                    os.remove(temp_py_file)
-                except Exception as cleanup_error:
-                    print(f"Temp file cleanup warning: {cleanup_error}")
+        return jsonify({
+            'lesson_id': lesson_id,
+            'status_url': f'/api/lessons/{lesson_id}',
+            'message': f'Lesson "{topic}" started'
+        }), 202
         
     except Exception as e:
-        error_msg = f'Manim video rendering failed: {str(e)}'
+        error_msg = f'Failed to start lesson: {str(e)}'
         print(error_msg)
         return jsonify({'error': error_msg}), 500
 
+@app.route('/api/lessons/<int:lesson_id>', methods=['GET'])
+def get_lesson(lesson_id):
+    """Get a lesson's stages, script sections and render job"""
+    try:
+        conn = sqlite3.connect(DATABASE)
+        lesson = lessons.get_lesson(conn, lesson_id)
+        conn.close()
+        if not lesson or (lesson['user_email'] and lesson['user_email'] != optional_user_email()):
+            return jsonify({'error': 'Lesson not found'}), 404
+        return jsonify({'lesson': lesson}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/render-jobs/<int:job_id>', methods=['GET'])
+def get_render_job(job_id):
+    """Get status, progress, output path and errors of a render job"""
+    try:
+        conn = render_jobs.connect(DATABASE)
+        job = render_jobs.get_job(conn, job_id)
+        conn.close()
+        if not job:
+            return jsonify({'error': 'Render job not found'}), 404
+        return jsonify({'job': job}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/render-jobs/<int:job_id>/timings', methods=['GET'])
+def get_render_job_timings(job_id):
+    """Stage and per-animation timings of a finished render job"""
+    try:
+        conn = render_jobs.connect(DATABASE)
+        try:
+            if not render_jobs.get_job(conn, job_id):
+                return jsonify({'error': 'Render job not found'}), 404
+            timings = render_timings.for_job(conn, job_id)
+        finally:
+            conn.close()
+        return jsonify({'job_id': job_id, **timings}), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/render-stats/timings', methods=['GET'])
+def get_render_timing_histograms():
+    """Histograms of render stage timings over the last `hours` (default 24)"""
+    stage = request.args.get('stage')
+    if stage and stage not in render_timings.STAGES:
+        return jsonify({'error': f'Unknown stage; expected one of {", ".join(render_timings.STAGES)}'}), 400
+    try:
+        hours = float(request.args.get('hours', 24))
+    except ValueError:
+        return jsonify({'error': 'hours must be a number'}), 400
+    conn = render_jobs.connect(DATABASE)
+    stats = render_timings.histograms(conn, hours, stage)
+    conn.close()
+    return jsonify({'hours': hours, 'buckets': list(render_timings.BUCKETS), 'stages': stats}), 200
+
+@app.route('/api/render-jobs/<int:job_id>/events', methods=['GET'])
+def stream_render_job(job_id):
+    """Server-sent events with live updates of a render job"""
+    conn = render_jobs.connect(DATABASE)
+    job = render_jobs.get_job(conn, job_id)
+    conn.close()
+    if not job:
+        return jsonify({'error': 'Render job not found'}), 404
+    
+    def events():
+        last_sent = None
+        idle_polls = 0
+        while True:
+            conn = render_jobs.connect(DATABASE)
+            try:
+                job = render_jobs.get_job(conn, job_id)
+            finally:
+                conn.close()
+            if job != last_sent:
+                yield f"data: {json.dumps(job)}\n\n"
+                last_sent = job
+                idle_polls = 0
+            else:
+                idle_polls += 1
+                if idle_polls % 30 == 0:
+                    yield ": keep-alive\n\n"
+            if job['status'] in render_jobs.TERMINAL_STATUSES:
+                break
+            time.sleep(0.5)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/render-jobs/<int:job_id>/stream/<path:name>', methods=['GET'])
+def render_job_stream(job_id, name):
+    """Progressive HLS playlist and segments of a render in progress"""
+    directory = live_stream.live_dir(job_id)
+    if not os.path.isdir(directory):
+        return jsonify({'error': 'No live stream for this render job'}), 404
+    if name == live_stream.PLAYLIST_NAME:
+        # The playlist grows while the job renders; segments never change
+        response = send_from_directory(directory, name, mimetype='application/vnd.apple.mpegurl', max_age=0)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return send_from_directory(directory, name, mimetype='video/mp2t', max_age=31536000)
+
+@app.route('/api/videos/<name>', methods=['GET'])
+def get_video(name):
+    """Finished render with Range support and a strong ETag"""
+    try:
+        path = video_delivery.video_file(name)
+        digest = video_delivery.content_hash(path)
+    except video_delivery.VideoNotFound:
+        return jsonify({'error': 'Video not found'}), 404
+    storage.touch(DATABASE, f'/videos/{name}')
+    response = send_file(path, mimetype='video/mp4', conditional=True, etag=digest)
+    if request.args.get('v') and digest.startswith(request.args['v']):
+        response.headers['Cache-Control'] = video_delivery.IMMUTABLE
+    else:
+        # Same name may be re-published (quality upgrade); revalidate by ETag
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/videos/<name>/master.m3u8', methods=['GET'])
+def get_video_hls(name):
+    """Adaptive HLS ladder of a finished render, built on first request"""
+    try:
+        digest, playlist = video_delivery.master_playlist(video_delivery.video_file(name))
+    except video_delivery.VideoNotFound:
+        return jsonify({'error': 'Video not found'}), 404
+    except Exception as e:
+        print(f"Could not build HLS ladder for {name}: {e}")
+        return jsonify({'error': 'Could not prepare the video stream'}), 500
+    response = Response(playlist, mimetype='application/vnd.apple.mpegurl')
+    response.set_etag(digest)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/hls/<digest>/<path:name>', methods=['GET'])
+def get_hls_file(digest, name):
+    """Variant playlists and segments of a cached ladder; content-addressed"""
+    if not all(c in '0123456789abcdef' for c in digest):
+        return jsonify({'error': 'Not found'}), 404
+    mimetype = 'application/vnd.apple.mpegurl' if name.endswith('.m3u8') else 'video/mp2t'
+    response = send_from_directory(video_delivery.ladder_dir(digest), name, mimetype=mimetype, conditional=True)
+    response.headers['Cache-Control'] = video_delivery.IMMUTABLE
+    return response
+
+@app.route('/api/render-workers/lease', methods=['POST'])
+@render_worker_required
+def lease_render_job():
+    """Lease the next render job to a remote render node; 204 when there is none"""
+    data = request.get_json() or {}
+    worker = data.get('worker')
+    if not worker:
+        return jsonify({'error': 'worker is required'}), 400
+    job = render_leases.lease(DATABASE, str(worker)[:200])
+    if not job:
+        return '', 204
+    return jsonify(job), 200
+
+@app.route('/api/render-workers/jobs/<int:job_id>/heartbeat', methods=['POST'])
+@render_worker_required
+def render_job_heartbeat(job_id):
+    """Renew a render node's lease and record its progress"""
+    data = request.get_json() or {}
+    try:
+        lease_seconds = render_leases.heartbeat(DATABASE, job_id, data.get('lease_token'),
+                                                data.get('progress'), data.get('stage'))
+    except render_leases.LeaseLost:
+        return jsonify({'error': 'Lease expired; the job was requeued'}), 409
+    return jsonify({'lease_seconds': lease_seconds}), 200
+
+@app.route('/api/render-workers/uploads/<digest>', methods=['PUT'])
+@render_worker_required
+def upload_render(digest):
+    """Store a render node's finished mp4 under its sha256"""
+    # Read the WSGI input directly: renders can be larger than MAX_CONTENT_LENGTH
+    try:
+        render_leases.store_upload(request.environ['wsgi.input'], request.content_length, digest)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'sha256': digest}), 201
+
+@app.route('/api/render-workers/jobs/<int:job_id>/complete', methods=['POST'])
+@render_worker_required
+def complete_render_job(job_id):
+    """Publish a render node's upload as the job's video, exactly once"""
+    data = request.get_json() or {}
+    try:
+        video_path = render_leases.complete(DATABASE, job_id, data.get('lease_token'), data.get('sha256'),
+                                            data.get('timings'))
+    except render_leases.PublishPending:
+        return jsonify({'error': 'The job is already being published'}), 409
+    except render_leases.LeaseLost:
+        return jsonify({'error': 'Lease expired; the job was requeued'}), 409
+    except render_leases.UploadMissing:
+        return jsonify({'error': 'Upload the video before completing the job'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Failed to publish render: {str(e)}'}), 500
+    return jsonify({'video_path': video_path}), 200
+
+@app.route('/api/render-workers/jobs/<int:job_id>/fail', methods=['POST'])
+@render_worker_required
+def fail_render_job(job_id):
+    """Fail a leased job with the render node's error"""
+    data = request.get_json() or {}
+    try:
+        render_leases.fail(DATABASE, job_id, data.get('lease_token'), str(data.get('error') or 'Render failed'))
+    except render_leases.LeaseLost:
+        return jsonify({'error': 'Lease expired; the job was requeued'}), 409
+    return jsonify({'status': 'failed'}), 200
+
+@app.route('/api/storage', methods=['GET'])
+@token_required
+def get_storage(current_user_email):
+    """Bytes of published videos this user has, and their quota"""
+    conn = sqlite3.connect(DATABASE)
+    usage = storage.usage(conn, current_user_email)
+    conn.close()
+    return jsonify(usage), 200
+
+@app.route('/api/media/<digest>/<name>', methods=['GET'])
+def get_video_media(digest, name):
+    """Poster or sprite sheet of a published video; content-addressed"""
+    if name not in video_media.ASSET_NAMES or not all(c in '0123456789abcdef' for c in digest):
+        return jsonify({'error': 'Not found'}), 404
+    response = send_from_directory(video_media.assets_dir(digest), name, mimetype='image/jpeg', conditional=True)
+    response.headers['Cache-Control'] = video_delivery.IMMUTABLE
+    return response
+
 if __name__ == '__main__':
     # Initialize database on startup
     init_db()
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+    debug = True
+    # The debug reloader imports this file twice; only the serving process runs workers
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        render_jobs.start_workers(DATABASE)
+        storage.start_sweeper(DATABASE)
+        schedule_summary_backfill(DATABASE)
+    app.run(debug=debug, host='0.0.0.0', port=int(os.getenv('PORT', '5001')))
\ No newline at end of file
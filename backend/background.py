@@ -0,0 +1,63 @@
+"""Small in-process background job runner for work that should not block a request.
+
+Jobs run on a shared thread pool. ``submit_once`` drops a job if another job
+with the same key is already queued or running, and ``debounce`` waits for a
+key to go quiet before running, which keeps bursts of requests from piling up
+duplicate work.
+"""
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', '4'))
+
+_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='background')
+_active_keys = set()
+_timers = {}
+_lock = threading.Lock()
+
+
+def _run(fn, args, kwargs, key=None):
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        print(f"Background job {getattr(fn, '__name__', fn)} failed:\n{traceback.format_exc()}")
+    finally:
+        if key is not None:
+            with _lock:
+                _active_keys.discard(key)
+
+
+def submit(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the background pool"""
+    return _executor.submit(_run, fn, args, kwargs)
+
+
+def submit_once(key, fn, *args, **kwargs):
+    """Like submit, but skip the job if one with the same key is pending"""
+    with _lock:
+        if key in _active_keys:
+            return None
+        _active_keys.add(key)
+    return _executor.submit(_run, fn, args, kwargs, key)
+
+
+def debounce(key, delay, fn, *args, **kwargs):
+    """Run fn once, delay seconds after the last call with the same key"""
+    def fire():
+        with _lock:
+            if _timers.get(key) is timer:
+                del _timers[key]
+        # Still busy with an earlier run: try again later so the latest state is picked up
+        if submit_once(key, fn, *args, **kwargs) is None:
+            debounce(key, delay, fn, *args, **kwargs)
+
+    timer = threading.Timer(delay, fire)
+    timer.daemon = True
+    with _lock:
+        previous = _timers.get(key)
+        if previous is not None:
+            previous.cancel()
+        _timers[key] = timer
+    timer.start()
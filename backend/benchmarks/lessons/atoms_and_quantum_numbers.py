@@ -0,0 +1,23 @@
+from manim import *
+
+
+class AtomsAndQuantumNumbers(Scene):
+    def construct(self):
+        title = Text("Atoms and Quantum Numbers", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        nucleus = Dot(radius=0.2, color=RED)
+        shells = VGroup(*[Circle(radius=r, color=GREY) for r in (1, 1.6, 2.2)])
+        electrons = VGroup(*[Dot(shell.point_at_angle(i * PI / 2), color=YELLOW) for i, shell in enumerate(shells)])
+        self.play(FadeIn(nucleus), Create(shells))
+        self.play(FadeIn(electrons))
+        self.play(Rotate(electrons, angle=PI, about_point=ORIGIN), run_time=2)
+
+        numbers = VGroup(
+            MathTex(r"n = 1, 2, 3, \ldots"),
+            MathTex(r"\ell = 0, \ldots, n - 1"),
+            MathTex(r"m_\ell = -\ell, \ldots, \ell"),
+            MathTex(r"m_s = \pm \tfrac{1}{2}")
+        ).arrange(DOWN, aligned_edge=LEFT).to_edge(RIGHT)
+        self.play(Write(numbers))
+        self.wait(1)
@@ -0,0 +1,20 @@
+from manim import *
+
+
+class DerivativesVideo(Scene):
+    def construct(self):
+        title = Text("Derivatives of Trigonometric Functions", font_size=36, color=BLUE)
+        self.play(Write(title))
+        self.wait(1)
+        self.play(title.animate.to_edge(UP))
+
+        rule = MathTex(r"\frac{d}{dx}[\sin(x)] = \cos(x)", font_size=48)
+        self.play(Write(rule))
+        self.wait(1)
+
+        examples = VGroup(
+            MathTex(r"\frac{d}{dx}[\cos(x)] = -\sin(x)"),
+            MathTex(r"\frac{d}{dx}[\tan(x)] = \sec^2(x)")
+        ).arrange(DOWN, buff=0.5)
+        self.play(Transform(rule, examples))
+        self.wait(1)
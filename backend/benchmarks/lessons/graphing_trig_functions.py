@@ -0,0 +1,22 @@
+from manim import *
+
+
+class GraphingTrigFunctions(Scene):
+    def construct(self):
+        title = Text("Graphing Trigonometric Functions", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        axes = Axes(x_range=[-2 * PI, 2 * PI, PI / 2], y_range=[-2, 2, 1], x_length=10, y_length=4)
+        self.play(Create(axes))
+
+        sine = axes.plot(np.sin, color=YELLOW)
+        cosine = axes.plot(np.cos, color=GREEN)
+        labels = VGroup(MathTex(r"\sin x", color=YELLOW), MathTex(r"\cos x", color=GREEN)).arrange(RIGHT, buff=1)
+        labels.next_to(axes, DOWN)
+        self.play(Create(sine), Write(labels[0]))
+        self.play(Create(cosine), Write(labels[1]))
+        self.wait(1)
+
+        amplitude = axes.plot(lambda x: 2 * np.sin(x), color=YELLOW)
+        self.play(Transform(sine, amplitude), run_time=2)
+        self.wait(1)
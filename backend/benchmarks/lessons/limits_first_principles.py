@@ -0,0 +1,21 @@
+from manim import *
+
+
+class LimitsFromFirstPrinciples(Scene):
+    def construct(self):
+        title = Text("Derivatives from First Principles", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        definition = MathTex(r"f'(x) = \lim_{h \to 0} \frac{f(x + h) - f(x)}{h}").next_to(title, DOWN)
+        self.play(Write(definition))
+
+        axes = Axes(x_range=[-1, 3, 1], y_range=[-1, 5, 1], x_length=5, y_length=3.5).to_edge(DOWN)
+        curve = axes.plot(lambda x: 0.5 * x ** 2, color=YELLOW)
+        self.play(Create(axes), Create(curve))
+
+        h = ValueTracker(1.5)
+        secant = always_redraw(lambda: axes.get_secant_slope_group(
+            x=1, graph=curve, dx=h.get_value(), secant_line_color=GREEN, secant_line_length=4))
+        self.add(secant)
+        self.play(h.animate.set_value(0.05), run_time=3)
+        self.wait(1)
@@ -0,0 +1,19 @@
+from manim import *
+
+
+class PolynomialFunctions(Scene):
+    def construct(self):
+        title = Text("Graphing Polynomial Functions", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        axes = Axes(x_range=[-3, 3, 1], y_range=[-4, 4, 1], x_length=6, y_length=4).shift(DOWN * 0.5)
+        self.play(Create(axes))
+
+        cubic = axes.plot(lambda x: 0.5 * x ** 3 - 1.5 * x, color=YELLOW)
+        label = MathTex(r"f(x) = \tfrac{1}{2}x^3 - \tfrac{3}{2}x").next_to(axes, RIGHT)
+        self.play(Create(cubic), Write(label))
+        self.wait(1)
+
+        roots = VGroup(*[Dot(axes.c2p(x, 0), color=RED) for x in (-1.732, 0, 1.732)])
+        self.play(FadeIn(roots))
+        self.wait(1)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Reproducible render benchmark: the lesson corpus, cold and warm, with a regression check.
+
+Renders every lesson in benchmarks/lessons (the topics users ask for most:
+derivatives of trig functions, limits from first principles, graphing
+polynomials and trig functions, atoms and quantum numbers) through
+manim_render.render(), the path render jobs take, in two cache states:
+
+- cold: empty LaTeX cache and no partial movie cache
+- warm: LaTeX cache filled and the partial movies of an identical earlier
+  render reused, like a re-render of an unchanged lesson
+
+All caches live in a scratch directory (--cache-dir, wiped at start), so
+runs do not touch the backend's caches and start from the same state.
+Per lesson and state it reports the median wall time, CPU time, peak RSS,
+output size and seconds per render stage (render_timings.py). CPU time and
+peak RSS come from the render children themselves (stage 'process'); with
+the CLI runner they come from this process' reaped children instead, and
+peak RSS is then the largest child so far.
+
+    python backend/benchmarks/render_bench.py --repeat 3 --output bench.json
+    python backend/benchmarks/render_bench.py --compare baseline.json --output bench.json
+    python backend/benchmarks/render_bench.py --compare baseline.json bench.json
+
+--compare exits with status 1 when any metric of any lesson is more than
+--threshold (default 10%) worse than the baseline. Given a results file
+instead of lessons, it compares without rendering.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+LESSONS_DIR = os.path.join(BENCHMARK_DIR, 'lessons')
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'render_bench')
+STATES = ('cold', 'warm')
+METRICS = ('wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'size_bytes')
+# Absolute slack below which a change is noise, per metric
+NOISE_FLOOR = {'wall_seconds': 0.25, 'cpu_seconds': 0.25, 'peak_rss_bytes': 16 * 1024 ** 2, 'size_bytes': 4096}
+
+sys.path.insert(0, BACKEND_DIR)
+
+
+def point_caches_at(cache_dir):
+    """Isolate every render cache under cache_dir; must run before importing manim_render"""
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.environ['TEX_CACHE_DIR'] = os.path.join(cache_dir, 'tex')
+    os.environ['PARTIAL_CACHE_DIR'] = os.path.join(cache_dir, 'partial_movies')
+    os.environ['RENDER_WORK_DIR'] = os.path.join(cache_dir, 'work')
+
+
+def children_usage():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024
+
+
+def measure(manim_render, render_timings, code, name, index, runner, quality, identity, section_workers):
+    """Render once; returns the sample's metrics and seconds per stage"""
+    timer = render_timings.Timer()
+    cpu_before, _ = children_usage()
+    started = time.perf_counter()
+    video_path = manim_render.render(code, f'bench {name}', f'bench{index}', runner=runner, quality=quality,
+                                     partial_identity=identity, section_workers=section_workers, timer=timer)
+    wall = time.perf_counter() - started
+    cpu_after, child_rss = children_usage()
+
+    disk_path = os.path.join(manim_render.VIDEOS_DIR, os.path.basename(video_path))
+    size = os.path.getsize(disk_path)
+    os.remove(disk_path)
+
+    processes = [entry for entry in timer.entries if entry['stage'] == 'process']
+    stages = {}
+    for entry in timer.entries:
+        if entry['stage'] != 'process':
+            stages[entry['stage']] = stages.get(entry['stage'], 0) + entry['seconds']
+    return {
+        'wall_seconds': wall,
+        'cpu_seconds': sum(entry['cpu_seconds'] for entry in processes) if processes else cpu_after - cpu_before,
+        'peak_rss_bytes': max(entry['peak_rss_bytes'] for entry in processes) if processes else child_rss,
+        'size_bytes': size,
+    }, stages
+
+
+def summarize(samples, stages):
+    summary = {metric: round(statistics.median(sample[metric] for sample in samples), 4) for metric in METRICS}
+    summary['samples'] = [{metric: round(sample[metric], 4) for metric in METRICS} for sample in samples]
+    names = sorted({name for run in stages for name in run})
+    summary['stages'] = {name: round(statistics.median(run.get(name, 0) for run in stages), 4) for name in names}
+    return summary
+
+
+def run(args):
+    point_caches_at(args.cache_dir)
+    import manim_render
+    import render_timings
+
+    lessons = args.lessons or sorted(glob.glob(os.path.join(LESSONS_DIR, '*.py')))
+    runner = args.runner or manim_render.RENDER_RUNNER
+    if runner == 'zygote':
+        started = time.perf_counter()
+        manim_render._zygote.ensure_started()
+        print(f"Zygote startup (not counted): {time.perf_counter() - started:.2f}s")
+
+    results = {}
+    index = 0
+    try:
+        for path in lessons:
+            name = os.path.splitext(os.path.basename(path))[0]
+            with open(path) as f:
+                code = f.read()
+            results[name] = {}
+            for state in STATES:
+                samples, stages = [], []
+                identity = f'bench-{name}' if state == 'warm' else None
+                if state == 'warm':
+                    # Fill the LaTeX and partial movie caches; not measured
+                    index += 1
+                    measure(manim_render, render_timings, code, name, index, runner, args.quality, identity,
+                            args.section_workers)
+                for _ in range(args.repeat):
+                    if state == 'cold':
+                        shutil.rmtree(os.environ['TEX_CACHE_DIR'], ignore_errors=True)
+                    index += 1
+                    sample, sample_stages = measure(manim_render, render_timings, code, name, index, runner,
+                                                    args.quality, identity, args.section_workers)
+                    samples.append(sample)
+                    stages.append(sample_stages)
+                results[name][state] = summarize(samples, stages)
+                summary = results[name][state]
+                print(f"{name:<32} {state:<5} {summary['wall_seconds']:>7.2f}s wall "
+                      f"{summary['cpu_seconds']:>7.2f}s cpu {summary['peak_rss_bytes'] / 1024 ** 2:>7.0f} MB rss {summary['size_bytes'] / 1024:>7.0f} KB")
+    finally:
+        if runner == 'zygote':
+            manim_render._zygote.stop()
+
+    return {'meta': environment(runner, args), 'results': results}
+
+
+def environment(runner, args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        import render_zygote
+        manim_version = subprocess.run([render_zygote.VENV_PYTHON, '-c', 'import manim; print(manim.__version__)'],
+                                       capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        manim_version = None
+    return {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'manim': manim_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'runner': runner,
+        'quality': args.quality,
+        'repeat': args.repeat,
+        'section_workers': args.section_workers,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print the change of every metric; returns the regressions beyond threshold"""
+    regressions = []
+    print(f"\n{'lesson':<32} {'state':<5} {'metric':<15} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, states in sorted(current['results'].items()):
+        for state, summary in sorted(states.items()):
+            before = baseline['results'].get(name, {}).get(state)
+            if not before:
+                print(f"{name:<32} {state:<5} (not in baseline)")
+                continue
+            for metric in METRICS:
+                old, new = before.get(metric), summary.get(metric)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old if old else 0.0
+                regressed = change > threshold and new - old > NOISE_FLOOR[metric]
+                if regressed:
+                    regressions.append((name, state, metric, old, new, change))
+                print(f"{name:<32} {state:<5} {metric:<15} {old:>12.4g} {new:>12.4g} {change:>+7.1%}"
+                      f"{'  REGRESSION' if regressed else ''}")
+    for name in sorted(set(baseline['results']) - set(current['results'])):
+        print(f"{name:<32} (missing from current run)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='measured renders per lesson and cache state')
+    parser.add_argument('--runner', choices=('zygote', 'cli'), help='default: RENDER_RUNNER')
+    parser.add_argument('--quality', default='480p15',
+                        help='render_quality profile or manim -q flag (default: 480p15)')
+    parser.add_argument('--section-workers', type=int, default=None,
+                        help='parallel section renders (default: RENDER_SECTION_WORKERS; 0 or 1 renders serially)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='scratch directory for all render caches')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag regressions against this results file')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative slowdown (default: 0.10)')
+    parser.add_argument('lessons', nargs='*', help='lesson scripts (default: benchmarks/lessons/*.py), '
+                                                   'or one results file to compare without rendering')
+    args = parser.parse_args()
+
+    if args.compare and len(args.lessons) == 1 and args.lessons[0].endswith('.json'):
+        with open(args.lessons[0]) as f:
+            current = json.load(f)
+    else:
+        current = run(args)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f"\nResults written to {args.output}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    if baseline['meta'].get('runner') != current['meta'].get('runner') or \
+            baseline['meta'].get('quality') != current['meta'].get('quality'):
+        print("Warning: baseline was recorded with a different runner or quality")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
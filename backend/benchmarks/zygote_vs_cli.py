@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Benchmark: cold manim CLI per job vs. the pre-forked render zygote.
+
+Renders every sample lesson in benchmarks/lessons with both runners and
+prints the median wall time per lesson. The zygote's one-off startup (the
+manim import it exists to amortize) is reported separately.
+
+    python backend/benchmarks/zygote_vs_cli.py --repeat 3
+"""
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import manim_render  # noqa: E402
+
+LESSONS_DIR = os.path.join(BENCHMARK_DIR, 'lessons')
+
+
+def time_render(code, name, runner, index):
+    started = time.perf_counter()
+    video_path = manim_render.render(code, f'bench {name} {runner}', f'bench{index}', runner=runner)
+    elapsed = time.perf_counter() - started
+    disk_path = os.path.join(manim_render.VIDEOS_DIR, os.path.basename(video_path))
+    if os.path.exists(disk_path):
+        os.remove(disk_path)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='renders per lesson and runner')
+    parser.add_argument('lessons', nargs='*', help='lesson scripts (default: benchmarks/lessons/*.py)')
+    args = parser.parse_args()
+
+    lessons = args.lessons or sorted(glob.glob(os.path.join(LESSONS_DIR, '*.py')))
+
+    started = time.perf_counter()
+    manim_render._zygote.ensure_started()
+    print(f"Zygote startup (paid once per backend process): {time.perf_counter() - started:.2f}s\n")
+
+    print(f"{'lesson':<32} {'cli':>8} {'zygote':>8} {'saved':>8}")
+    index = 0
+    totals = {'cli': 0.0, 'zygote': 0.0}
+    for path in lessons:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            code = f.read()
+        medians = {}
+        for runner in ('cli', 'zygote'):
+            samples = []
+            for _ in range(args.repeat):
+                index += 1
+                samples.append(time_render(code, name, runner, index))
+            medians[runner] = statistics.median(samples)
+            totals[runner] += medians[runner]
+        saved = medians['cli'] - medians['zygote']
+        print(f"{name:<32} {medians['cli']:>7.2f}s {medians['zygote']:>7.2f}s {saved:>7.2f}s")
+
+    saved = totals['cli'] - totals['zygote']
+    percent = 100 * saved / totals['cli'] if totals['cli'] else 0
+    print(f"{'total':<32} {totals['cli']:>7.2f}s {totals['zygote']:>7.2f}s {saved:>7.2f}s ({percent:.0f}%)")
+    manim_render._zygote.stop()
+
+
+if __name__ == '__main__':
+    main()
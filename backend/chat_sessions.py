@@ -0,0 +1,147 @@
+"""Server-side chat sessions with a rolling summary.
+
+Every turn is stored in chat_messages. The prompt for a turn is built from the
+session summary plus the turns that have not been summarized yet. Once those
+unsummarized turns grow past CHAT_SUMMARY_TOKEN_THRESHOLD, a background job
+folds all but the most recent CHAT_KEEP_RECENT_MESSAGES into the summary, so
+prompt size stays roughly constant however long the conversation runs.
+"""
+import os
+import sqlite3
+
+from background import submit_once
+from llm import estimate_tokens, get_llm_provider
+
+CHAT_SUMMARY_TOKEN_THRESHOLD = int(os.getenv('CHAT_SUMMARY_TOKEN_THRESHOLD', '2000'))
+CHAT_KEEP_RECENT_MESSAGES = int(os.getenv('CHAT_KEEP_RECENT_MESSAGES', '6'))
+
+
+def create_session(conn, user_id, title=None):
+    """Create a new chat session and return its id"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO chat_sessions (user_id, title)
+        VALUES (?, ?)
+    ''', (user_id, title or 'New chat'))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def get_session(conn, user_id, session_id):
+    """Return the session row as a dict, or None if it is not the user's"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, title, summary, summarized_through, created_at, updated_at
+        FROM chat_sessions
+        WHERE id = ? AND user_id = ?
+    ''', (session_id, user_id))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        'id': row[0],
+        'title': row[1],
+        'summary': row[2],
+        'summarized_through': row[3],
+        'created_at': row[4],
+        'updated_at': row[5]
+    }
+
+
+def add_message(conn, session_id, role, content):
+    """Append a message to a session"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO chat_messages (session_id, role, content, tokens)
+        VALUES (?, ?, ?, ?)
+    ''', (session_id, role, content, estimate_tokens(content)))
+    cursor.execute('UPDATE chat_sessions SET updated_at = CURRENT_TIMESTAMP WHERE id = ?', (session_id,))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def get_messages(conn, session_id, after_id=0):
+    """Return messages of a session with id greater than after_id, oldest first"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, role, content, tokens, created_at
+        FROM chat_messages
+        WHERE session_id = ? AND id > ?
+        ORDER BY id ASC
+    ''', (session_id, after_id))
+    return [
+        {'id': row[0], 'role': row[1], 'content': row[2], 'tokens': row[3], 'created_at': row[4]}
+        for row in cursor.fetchall()
+    ]
+
+
+def build_history_context(conn, session):
+    """Format the summary and unsummarized turns for the chat prompt"""
+    context = ''
+    if session['summary']:
+        context += f"Summary of earlier conversation:\n{session['summary']}\n\n"
+    recent = get_messages(conn, session['id'], session['summarized_through'])
+    if recent:
+        context += 'Recent messages:\n'
+        for message in recent:
+            speaker = 'User' if message['role'] == 'user' else 'Assistant'
+            context += f"{speaker}: {message['content']}\n"
+    return context or 'No previous conversation'
+
+
+def maybe_schedule_summary(conn, database, session_id):
+    """Queue a summary job if the unsummarized turns exceed the threshold"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT COALESCE(SUM(m.tokens), 0)
+        FROM chat_messages m
+        JOIN chat_sessions s ON s.id = m.session_id
+        WHERE m.session_id = ? AND m.id > s.summarized_through
+    ''', (session_id,))
+    pending_tokens = cursor.fetchone()[0]
+    if pending_tokens > CHAT_SUMMARY_TOKEN_THRESHOLD:
+        submit_once(('chat-summary', session_id), summarize_session, database, session_id)
+
+
+def summarize_session(database, session_id):
+    """Fold older turns of a session into its rolling summary"""
+    conn = sqlite3.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT summary, summarized_through FROM chat_sessions WHERE id = ?', (session_id,))
+        row = cursor.fetchone()
+        if not row:
+            return
+        summary, summarized_through = row
+
+        pending = get_messages(conn, session_id, summarized_through)
+        to_fold = pending[:-CHAT_KEEP_RECENT_MESSAGES] if CHAT_KEEP_RECENT_MESSAGES else pending
+        if not to_fold:
+            return
+
+        transcript = '\n'.join(
+            f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in to_fold
+        )
+        prompt = f"""
+        Update the running summary of a conversation between a student and their note-taking assistant.
+        Keep facts, decisions, note titles/IDs and open questions. Drop pleasantries. Stay under 200 words.
+
+        CURRENT SUMMARY:
+        {summary or 'None yet'}
+
+        NEW MESSAGES:
+        {transcript}
+
+        Return only the updated summary text.
+        """
+        new_summary = get_llm_provider().generate(prompt).strip()
+
+        # Only advance if nobody else summarized in the meantime
+        cursor.execute('''
+            UPDATE chat_sessions
+            SET summary = ?, summarized_through = ?
+            WHERE id = ? AND summarized_through = ?
+        ''', (new_summary, to_fold[-1]['id'], session_id, summarized_through))
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,234 @@
+"""Map-reduce study guides over a folder subtree.
+
+A digest job walks every note below a folder, summarizes each note (split into
+chunks when it is long) concurrently under the shared LLM rate limiter, then
+reduces the summaries bottom-up through the folder tree into one study guide.
+
+Every LLM call is cached in llm_summary_cache keyed by a hash of its prompt
+inputs. Re-running a digest after one note changed therefore only repeats the
+calls on that note's branch: its own summary and the reductions of the folders
+above it.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import rate_limited_generate
+from note_summaries import html_to_text
+
+DIGEST_CHUNK_CHARS = int(os.getenv('DIGEST_CHUNK_CHARS', '6000'))
+DIGEST_REDUCE_FANOUT = int(os.getenv('DIGEST_REDUCE_FANOUT', '8'))
+DIGEST_MAX_WORKERS = int(os.getenv('DIGEST_MAX_WORKERS', os.getenv('LLM_MAX_CONCURRENCY', '4')))
+
+MAP_PROMPT = """
+Summarize this part of a student's note titled "{title}" for a study guide.
+Keep definitions, formulas (as LaTeX), worked examples and key facts. Use concise HTML bullet points.
+
+{text}
+"""
+
+REDUCE_PROMPT = """
+Combine these summaries from the "{label}" section of a student's notes into one study guide section.
+Merge duplicates, keep every formula (as LaTeX) and key fact, and organize with HTML headings and bullet points.
+
+{text}
+"""
+
+
+def create_job(conn, user_id, folder_id):
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO digest_jobs (user_id, folder_id, status)
+        VALUES (?, ?, 'queued')
+    ''', (user_id, folder_id))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def fail_interrupted_jobs(database):
+    """Fail digests that were queued or running when the backend last stopped.
+
+    Digests run on in-process threads, so nothing is left to finish them.
+    """
+    conn = sqlite3.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE digest_jobs
+            SET status = 'failed', error = 'Interrupted by a backend restart', updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+        ''')
+        conn.commit()
+        if cursor.rowcount:
+            print(f"Failed {cursor.rowcount} interrupted digest job(s)")
+    finally:
+        conn.close()
+
+
+def get_job(conn, user_id, job_id):
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, folder_id, status, total_steps, completed_steps, result, error, created_at, updated_at
+        FROM digest_jobs
+        WHERE id = ? AND user_id = ?
+    ''', (job_id, user_id))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        'id': row[0],
+        'folder_id': row[1],
+        'status': row[2],
+        'progress': {'total': row[3], 'completed': row[4]},
+        'result': row[5],
+        'error': row[6],
+        'created_at': row[7],
+        'updated_at': row[8]
+    }
+
+
+class _DigestRun:
+    """State for one digest job while it runs on a background thread"""
+
+    def __init__(self, database, job_id):
+        self.database = database
+        self.job_id = job_id
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        conn = sqlite3.connect(self.database)
+        try:
+            assignments = ', '.join(f'{name} = ?' for name in fields)
+            conn.execute(
+                f'UPDATE digest_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (*fields.values(), self.job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _step_done(self):
+        with self._lock:
+            self.completed += 1
+            self.update(completed_steps=self.completed)
+
+    def _cached_generate(self, prompt):
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        conn = sqlite3.connect(self.database)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT summary FROM llm_summary_cache WHERE cache_key = ?', (key,))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+        finally:
+            conn.close()
+
+        summary = rate_limited_generate(prompt).strip()
+
+        conn = sqlite3.connect(self.database)
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO llm_summary_cache (cache_key, summary, created_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (key, summary))
+            conn.commit()
+        finally:
+            conn.close()
+        return summary
+
+    def _reduce(self, label, parts):
+        """Reduce labelled summaries in groups of DIGEST_REDUCE_FANOUT until one is left"""
+        while len(parts) > 1:
+            groups = [parts[i:i + DIGEST_REDUCE_FANOUT] for i in range(0, len(parts), DIGEST_REDUCE_FANOUT)]
+            parts = [
+                (label, self._cached_generate(REDUCE_PROMPT.format(
+                    label=label,
+                    text='\n\n'.join(f'### {title}\n{summary}' for title, summary in group),
+                )))
+                for group in groups
+            ]
+        return parts[0][1] if parts else ''
+
+    def _summarize_note(self, note):
+        note_id, title, content, folder_id = note
+        text = html_to_text(content)
+        chunks = [text[i:i + DIGEST_CHUNK_CHARS] for i in range(0, len(text), DIGEST_CHUNK_CHARS)] or ['']
+        summaries = [
+            (title, self._cached_generate(MAP_PROMPT.format(title=title, text=chunk)))
+            for chunk in chunks
+        ]
+        summary = self._reduce(title, summaries)
+        self._step_done()
+        return note_id, summary
+
+    def run(self, user_id, folder_id):
+        conn = sqlite3.connect(self.database)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                WITH RECURSIVE subtree(id, depth) AS (
+                    SELECT id, 0 FROM folders WHERE id = ? AND user_id = ?
+                    UNION ALL
+                    SELECT f.id, s.depth + 1 FROM folders f JOIN subtree s ON f.parent_id = s.id
+                    WHERE f.user_id = ?
+                )
+                SELECT f.id, f.name, f.parent_id, s.depth
+                FROM subtree s JOIN folders f ON f.id = s.id
+            ''', (folder_id, user_id, user_id))
+            folders = {row[0]: {'name': row[1], 'parent_id': row[2], 'depth': row[3]} for row in cursor.fetchall()}
+            if not folders:
+                raise ValueError('Folder not found')
+
+            placeholders = ','.join('?' * len(folders))
+            cursor.execute(f'''
+                SELECT id, title, content, folder_id FROM notes
+                WHERE user_id = ? AND folder_id IN ({placeholders})
+                ORDER BY title ASC, id ASC
+            ''', (user_id, *folders))
+            notes = cursor.fetchall()
+        finally:
+            conn.close()
+
+        self.update(status='running', total_steps=len(notes) + len(folders), completed_steps=0)
+
+        # Map: summarize all notes concurrently (the rate limiter bounds the real fan-out)
+        with ThreadPoolExecutor(max_workers=max(1, DIGEST_MAX_WORKERS)) as pool:
+            note_summaries = dict(pool.map(self._summarize_note, notes))
+
+        # Reduce: fold folders bottom-up, all folders at one depth in parallel
+        folder_digests = {}
+
+        def reduce_folder(fid):
+            parts = [(title, note_summaries[nid]) for nid, title, _, nfid in notes if nfid == fid]
+            children = sorted(
+                (c for c, info in folders.items() if info['parent_id'] == fid and c in folder_digests),
+                key=lambda c: folders[c]['name'],
+            )
+            parts += [(folders[c]['name'], folder_digests[c]) for c in children if folder_digests[c]]
+            digest = self._reduce(folders[fid]['name'], parts)
+            self._step_done()
+            return fid, digest
+
+        max_depth = max(info['depth'] for info in folders.values())
+        with ThreadPoolExecutor(max_workers=max(1, DIGEST_MAX_WORKERS)) as pool:
+            for depth in range(max_depth, -1, -1):
+                level = [fid for fid, info in folders.items() if info['depth'] == depth]
+                folder_digests.update(pool.map(reduce_folder, level))
+
+        return folder_digests[folder_id]
+
+
+def run_job(database, job_id, user_id, folder_id):
+    """Background entry point for a digest job"""
+    digest = _DigestRun(database, job_id)
+    try:
+        result = digest.run(user_id, folder_id)
+        digest.update(status='completed', result=result)
+    except Exception as e:
+        digest.update(status='failed', error=str(e))
+        raise
+
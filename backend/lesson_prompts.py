@@ -0,0 +1,248 @@
+"""Prompts of the topic-to-video pipeline (lessons.py).
+
+string.Template strings: $name placeholders are filled with safe_substitute.
+SCRIPT_PROMPT turns a topic into a sectioned video script and MANIM_PROMPT
+turns that script into a Manim scene. A prompt's text is part of its stage's
+cache key, so editing it invalidates the cached outputs of that stage and
+everything after it.
+"""
+from string import Template
+
+SCRIPT_PROMPT = Template(r'''Create a comprehensive educational video script for the topic: "$topic"
+
+You must break this into exactly 30-second segments. Each segment should be educational, engaging, and buildable with Manim animations.
+
+Please structure your response as a detailed video plan with the following format:
+
+TITLE: [Video Title] (don't include any repetitive phrases from the prompt)
+
+OVERVIEW: [Brief overview of what the video covers]
+
+SECTIONS: [Break the content into 30-second segments - aim for 6-10 sections total]
+
+For each section, provide:
+- Section Title: [Clear, descriptive title]
+- Duration: 30 seconds
+- Content: [What will be explained - be specific about mathematical concepts, formulas, relationships]
+- Visuals: [Detailed description of animations, graphs, diagrams, equations that Manim should create]
+- Captions: [Key text that should appear on screen]
+- Narration: [Exact script for voiceover - educational and clear]
+
+Requirements:
+- Focus on mathematical concepts, scientific principles, or educational content
+- Each section should build on the previous one logically
+- Include specific mathematical formulas where relevant (use LaTeX notation)
+- Describe visual elements that can be animated with Manim (graphs, equations, geometric shapes, etc.)
+- Make it engaging and educational
+- Total video should be 3-5 minutes (6-10 sections)
+
+Example format:
+SECTION 1: Introduction to Derivatives
+Duration: 30s
+Content: Introduce the concept of derivatives as the instantaneous rate of change
+Visuals: Graph of f(x) = x² with a tangent line that moves along the curve, showing slope changes
+Captions: "Derivative = Instantaneous Rate of Change"
+Narration: "Welcome to our lesson on derivatives. A derivative tells us how fast something is changing at any given moment. Watch as this tangent line shows us the slope at different points..."
+
+SECTION 2: The Limit Definition
+Duration: 30s
+Content: Show the formal limit definition of a derivative
+Visuals: Animation of secant lines approaching a tangent line, with the limit formula appearing
+Captions: "f'(x) = lim(h→0) [f(x+h) - f(x)]/h"
+Narration: "The derivative is defined as the limit of the difference quotient as h approaches zero..."
+
+Continue this format for all sections.''')
+
+MANIM_PROMPT = Template(r'''Generate complete, runnable Manim Python code for this video script:
+
+Title: $title
+Total Duration: $total_duration seconds
+Number of Sections: $section_count
+
+Sections:
+$sections
+
+Requirements:
+1. Create a complete Python file with proper Manim imports
+2. Use a single Scene class that implements all sections
+3. Include smooth transitions between sections (use self.wait() appropriately)
+4. Create all mathematical equations using MathTex
+5. Include graphs, charts, and diagrams as described in the visuals
+6. Add text captions and titles using Text() objects
+7. Use colors and animations to make it engaging
+8. Follow Manim best practices and syntax
+9. Each section should run for approximately 30 seconds
+10. Include proper scene cleanup between sections
+11. IMPORTANT: when one piece of text appears, it should disappear before the next piece comes or should not overlap it if both are to be on the screen at the same time. also make sure that text doesn't overlap graphs, diagrams, or equations AT ALL. if both are on the screen at the same time, move the text to an appropriate position so that it's completely unoverlapped by any other elements. ALSO MAKE SURE EVERYTHING IS CONTAINED WITHIN THE VIDEO'S DIMENSIONS
+The code should be complete and runnable with: manim -pql filename.py SceneName
+
+Template structure:
+```python
+from manim import *
+import numpy as np
+
+class ${class_name}(Scene):
+    def construct(self):
+        # Title screen
+        title = Text("$title", font_size=48, color=BLUE)
+        self.play(Write(title))
+        self.wait(2)
+        self.play(FadeOut(title))
+
+        # Section 1: [Implementation based on script]
+        # Example of correct syntax:
+        # axes = Axes(x_range=[-3, 3], y_range=[-2, 2])
+        # func = axes.plot(lambda x: x**2, color=BLUE)
+        # tracker = ValueTracker(1)
+        # dot = Dot().add_updater(lambda m: m.move_to(axes.c2p(tracker.get_value(), tracker.get_value()**2)))
+        # self.play(Create(axes), Create(func))
+        # self.play(tracker.animate.set_value(2), run_time=3)
+
+        # Section 2: [Implementation based on script]
+        # ... continue for all sections
+
+        # End screen
+        end_text = Text("Thank you for watching!", font_size=36)
+        self.play(Write(end_text))
+        self.wait(3)
+```
+
+WORKING ANIMATION EXAMPLES:
+1. Moving a dot along a curve:
+   tracker = ValueTracker(0)
+   dot = Dot()
+   dot.add_updater(lambda m: m.move_to(axes.c2p(tracker.get_value(), np.sin(tracker.get_value()))))
+   self.play(tracker.animate.set_value(TAU), run_time=4)
+
+2. Animating function parameters:
+   a_tracker = ValueTracker(1)
+   func = always_redraw(lambda: axes.plot(lambda x: a_tracker.get_value() * x**2, color=BLUE))
+   self.play(a_tracker.animate.set_value(3), run_time=2)
+
+3. Moving objects:
+   circle = Circle()
+   self.play(circle.animate.move_to(RIGHT * 2))
+
+Generate the complete implementation for each section based on the provided script. Use appropriate Manim objects:
+- Text() for titles and captions
+- MathTex() for mathematical formulas
+- Axes() and plot functions for coordinate systems and graphs
+- Circle(), Rectangle(), Polygon() for shapes
+- NumberLine() for number representations
+- Transform(), Write(), FadeIn(), FadeOut() for animations
+- Line(), Arrow(), Dot() for basic geometric elements
+- VGroup() to group multiple objects together
+
+IMPORTANT: NEVER use external files! Create all visuals using Manim's built-in objects:
+- Instead of ImageMobject("file.png"), use Circle(), Rectangle(), Polygon(), or other built-in shapes
+- Instead of SVGMobject("file.svg"), use combinations of built-in geometric objects
+- All visuals must be created using only Manim's primitive objects and mathematical functions
+- You can combine multiple simple shapes to create complex diagrams
+- Use colors, fills, and positioning to make shapes representative of the concepts
+
+IMPORTANT: MAKE SURE ALL ELEMENTS AND TEXT IN TEH VIDEO ARE CONTAINED WITHIN IT'S DIMENSIONS. IT IS IMPERATIVE TO NOT HAVE TEXT OR DIAGRAMS OVERFLOWING BEYOND THE EDGES OF THE VIDEO.
+IMPORTANT: MAKE STUFF DISAPPEAR BEFORE PUTTING NEW STUFF. DON'T PLACE GRAPHS AND DIAGRAMS AND NUMBERS ON TOP OF EACH OTHER AT THE SAME TIME. AFTER ONE HAS BEEN USED, MAKE IT DISAPPEAR AND MAKE THEM APPEAR ONE BY ONE, NOT ALL AT ONCE.
+
+CRITICAL MANIM SYNTAX RULES (Community v0.19.0):
+- For plotting functions, use: axes.plot(lambda x: np.sin(x), x_range=[-3, 3], color=BLUE)
+- For parametric plots, use: ParametricFunction(lambda t: [t, np.sin(t), 0], t_range=[-3, 3])
+- DO NOT use Graph() class with x_range parameter - this is incorrect syntax
+- For unit circles and trig functions, use Circle() and plot() methods
+- For animating values, use ValueTracker: tracker = ValueTracker(0), then tracker.animate.set_value(3)
+- DO NOT try to animate plain numbers or integers - they have no animate attribute
+- For moving objects, use: obj.animate.move_to(point) or obj.animate.shift(vector)
+- For transforming objects, use: Transform(obj1, obj2) or ReplacementTransform(obj1, obj2)
+- Always create Manim objects (ValueTracker, Dot, Line, etc.) before trying to animate them
+- Always use proper Manim Community v0.19.0 syntax
+- For LaTeX strings, ALWAYS use r-strings: MathTex(r"\sin(x)") not MathTex("\sin(x)")
+- VALID positioning methods: .to_edge(UP), .to_corner(UL), .next_to(obj, RIGHT), .move_to(ORIGIN), .shift(UP)
+- INVALID methods: .to_center(), .move_along_path(), .center() - these don't exist
+
+FORBIDDEN CODE PATTERNS - NEVER WRITE THESE:
+❌ a = 2; a.animate.set_value(3)  # WRONG: 'a' is integer, not ValueTracker
+❌ h_val = 1; h_val.animate.set_value(0.5)  # WRONG: 'h_val' is integer, not ValueTracker
+❌ x_val = 1; x_val.animate.set_value(2)  # WRONG: 'x_val' is integer, not ValueTracker
+❌ ImageMobject("any_file.png")  # WRONG: External image files don't exist
+❌ SVGMobject("any_file.svg")  # WRONG: External SVG files don't exist
+❌ ImageMobject("rutherford_experiment.png")  # WRONG: Image files are not available
+❌ dot.animate.move_along_path(circle)  # WRONG: move_along_path doesn't exist
+❌ obj.to_center()  # WRONG: to_center doesn't exist, use .move_to(ORIGIN)
+❌ MathTex("y = \sin(x)")  # WRONG: Single backslash causes escape sequence error
+❌ MathTex("\pi")  # WRONG: Single backslash causes escape sequence error
+
+CORRECT CODE PATTERNS - ALWAYS USE THESE:
+✅ a_tracker = ValueTracker(2); a_tracker.animate.set_value(3)  # CORRECT
+✅ h_tracker = ValueTracker(1); h_tracker.animate.set_value(0.5)  # CORRECT
+✅ x_tracker = ValueTracker(1); x_tracker.animate.set_value(2)  # CORRECT
+✅ Circle(radius=0.5, color=RED, fill_opacity=1)  # CORRECT: Use built-in shapes
+✅ Rectangle(width=2, height=1, color=BLUE)  # CORRECT: Use built-in shapes
+✅ Polygon([0,0,0], [1,0,0], [0.5,1,0], color=GREEN)  # CORRECT: Use built-in shapes
+✅ obj.animate.move_to(ORIGIN)  # CORRECT: Use move_to for positioning
+✅ obj.animate.shift(RIGHT*2)  # CORRECT: Use shift for relative movement
+✅ MathTex(r"y = \sin(x)")  # CORRECT: Use r-string for LaTeX with double backslash
+✅ MathTex(r"\pi")  # CORRECT: Use r-string for LaTeX symbols
+✅ MathTex(r"\frac{1}{2}")  # CORRECT: Use r-string for LaTeX fractions
+
+If you need to animate a changing value, ALWAYS use ValueTracker, never plain numbers.
+
+Make sure ALL code is syntactically correct and follows current Manim conventions.
+
+SUMMARY:
+You'll receive a complete script. Your job is to generate fully functional Manim (Python) code that mirrors every line of that script—verbatim—using on-screen text and visuals. Follow these rules exactly:
+
+1. **Exact text only.** Every word of the script that appears on screen must match character for character. No paraphrasing or editing. make sure that stuff is not overlayed on top of other stuff.
+IMPORTANT: when one piece of text appears, it should disappear before the next piece comes or should not overlap it if both are to be on the screen at the same time. also make sure that text doesn't overlap graphs, diagrams, or equations AT ALL. if both are on the screen at the same time, move the text to an appropriate position so that it's completely unoverlapped by any other elements. ALSO MAKE SURE EVERYTHING IS CONTAINED WITHIN THE VIDEO'S DIMENSIONS
+2. **Visualize only what's described.** Whenever the script mentions a shape, graph, mathematical object, or concept, show a matching Manim primitive (e.g., Circle(), Line(), NumberPlane()); if it doesn't, simply display the script text with Text() or Tex().
+3. **No added assumptions.** If something is ambiguous or unspecified, skip inventing visuals—just render the original text.
+4. **Well-structured, runnable code.** Provide a single Python file with all imports ('from manim import *'), a Scene subclass, and clear comments tying each code block to its script lines. It must run without errors in a standard ManimCE setup.
+5. **Timing and layout.** Honor any timestamps with 'wait()', keep text legible for a 16:9 video, and space objects to avoid overlap.
+6. **No extras.** Do not include commentary, reasoning, or any content not explicitly in the script.
+7. Make sure that all text and graphics are completely visible in the video area.
+8. Add visuals wherever possible to illustrate the concepts in the script, but do not add any extra content that is not in the script. Make sure these visuals are appropriately positioned and sized for clarity.
+9. **NO EXTERNAL FILES**: Never use ImageMobject(), SVGMobject(), or any file loading functions. Create all visuals using only Manim's built-in geometric objects (Circle, Rectangle, Polygon, Line, Arrow, Dot, etc.). Combine simple shapes to create complex diagrams.
+10. **Precise timing control:** When timestamps appear in the script (like "[0:08]"), implement precise scene transitions. At each timestamp:
+   a. Clear previous elements with appropriate FadeOut animations
+   b. Introduce new content with suitable animations (Write, FadeIn, etc.)
+   c. Use wait() calls to maintain exact timing between timestamps
+   d. Ensure smooth transitions between sections while strictly adhering to the timestamp progression
+   e. For mathematical concepts introduced at specific timestamps, time their appearance to match exactly when mentioned
+11. The video should be finished when the final timestamp is reached, with all elements cleared.
+Your output should be a complete, clean, executable Manim script that faithfully and exactly represents the input, with just enough visuals to illustrate what the script names.
+
+****** IMPORTANT *******
+# instead of
+curve = plane.get_graph(curve_func, t_range=[-4.5, 4.5], color=YELLOW, stroke_width=4)
+
+# do this:
+curve = plane.plot(
+    curve_func,
+    x_range=[-4.5, 4.5],
+    color=YELLOW,
+    stroke_width=4
+)
+
+CRITICAL LaTeX FORMATTING RULES:
+- ALWAYS use r-strings for LaTeX: MathTex(r"\sin(x)") NOT MathTex("\sin(x)")
+- Double backslashes in r-strings: r"\pi", r"\sin", r"\cos", r"\frac{1}{2}"
+- Common LaTeX symbols: r"\pi", r"\theta", r"\alpha", r"\beta", r"\infty"
+- Fractions: r"\frac{numerator}{denominator}"
+- Subscripts: r"x_1", r"a_n"
+- Superscripts: r"x^2", r"e^{\pi i}"
+- Functions: r"\sin(x)", r"\cos(\theta)", r"\tan(\alpha)"
+
+EXAMPLE CORRECT LaTeX:
+- MathTex(r"y = \sin(x)")
+- MathTex(r"\frac{d}{dx}[\sin(x)] = \cos(x)")
+- MathTex(r"\pi \approx 3.14159")
+- MathTex(r"e^{i\pi} + 1 = 0")
+
+IMPORTANT: Provide ONLY the complete Python code with no explanations, comments outside the code, or markdown formatting. Just the raw Python code that can be directly saved to a file and executed.
+''')
+
+SECTION_TEMPLATE = Template('''
+SECTION $number: $title
+Content: $content
+Visuals: $visuals
+Captions: $captions
+Narration: $narration
+''')
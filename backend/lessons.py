@@ -0,0 +1,325 @@
+"""Topic-to-video lessons: script, Manim code, validation and render as one backend pipeline.
+
+POST /api/lessons takes a topic and a background job runs the stages:
+
+1. script: the LLM writes a sectioned video script (SCRIPT_PROMPT)
+2. manim: the LLM turns the script into a Manim scene (MANIM_PROMPT)
+3. validation: manim_validator checks the scene before it takes a worker
+4. render: render_jobs.enqueue_job, which serves cache hits and joins
+   identical in-flight renders
+
+Each stage's output is cached in lesson_stage_cache under a hash of the
+stage, its prompt and its input: the normalized topic for the script, the
+script for the code, the code for validation. Requests are normalized by
+topic_key() first, so "make a video on the atom" and "create a video on the
+atom" share one script, one scene and one render. Identical requests that
+arrive together wait for the first one's LLM call instead of repeating it.
+Code that fails validation is dropped from the cache so the next request
+writes it again.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import weakref
+
+import manim_validator
+import render_jobs
+import render_timings
+from lesson_prompts import MANIM_PROMPT, SCRIPT_PROMPT, SECTION_TEMPLATE
+from llm import rate_limited_generate, strip_code_fences
+
+SECTION_SECONDS = 30
+
+# How people ask for a video, stripped before the topic is keyed
+REQUEST_RE = re.compile(r'''
+    ^\s*(?:please\s+)?(?:(?:can|could|would|will)\s+you\s+)?(?:please\s+)?
+    (?:
+        (?:make|create|generate|produce|build|render|draw|give|show|do|write)\s+(?:me\s+|us\s+)?
+        (?:an?\s+|the\s+|some\s+)?(?:(?:short|quick|simple|brief|animated|manim|educational)\s+)*
+        (?:video|lesson|animation|explainer|clip)s?\s+
+        (?:on|about|explaining|of|for|covering|to\s+explain|that\s+explains)\s+
+      | (?:(?:short|quick|simple|brief|animated|manim|educational)\s+)*
+        (?:video|lesson|animation|explainer|clip)s?\s+(?:on|about|explaining|of|for|covering)\s+
+      | (?:explain\s*:?\s+|teach\s+(?:me\s+|us\s+)?(?:about\s+)?)
+    )
+''', re.IGNORECASE | re.VERBOSE)
+ARTICLES = {'a', 'an', 'the'}
+
+_key_locks = weakref.WeakValueDictionary()
+_key_locks_lock = threading.Lock()
+
+
+class LessonError(Exception):
+    """A stage failed in a way retrying the same request will not fix"""
+
+
+def subject(topic):
+    """The topic without request phrasing, in its original casing"""
+    stripped = REQUEST_RE.sub('', topic.strip(), count=1).strip().strip('"\'.!?').strip()
+    return stripped or topic.strip()
+
+
+def topic_key(topic):
+    """Normalized topic: lowercase words of the subject without articles or punctuation"""
+    words = re.findall(r'[a-z0-9]+', subject(topic).lower())
+    return ' '.join(word for word in words if word not in ARTICLES) or ' '.join(words)
+
+
+def stage_key(stage, *parts):
+    hasher = hashlib.sha256(stage.encode('utf-8'))
+    for part in parts:
+        hasher.update(b'\0' + part.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def parse_script(script_text):
+    """Sections of a generated script: title, content, visuals, captions, narration"""
+    sections = []
+    for block in re.findall(r'SECTION \d+:[\s\S]*?(?=SECTION \d+:|$)', script_text):
+        def field(pattern):
+            match = re.search(pattern, block)
+            return match.group(1).strip() if match else ''
+        sections.append({
+            'title': field(r'SECTION \d+: (.+)') or 'Untitled Section',
+            'content': field(r'Content: (.+)'),
+            'visuals': field(r'Visuals: (.+)'),
+            'captions': field(r'Captions: (.+)'),
+            'narration': field(r'Narration: (.+)'),
+            'duration': SECTION_SECONDS,
+        })
+    return sections
+
+
+def class_name(title):
+    name = re.sub(r'[^a-zA-Z0-9]', '', title)
+    if not name or name[0].isdigit():
+        name = f'Lesson{name}'
+    return f'{name}Video'
+
+
+def create_lesson(conn, user_email, topic, quality):
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO lessons (user_email, topic, topic_key, quality, status, stage)
+        VALUES (?, ?, ?, ?, 'queued', 'queued')
+    ''', (user_email, topic, topic_key(topic), quality))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def fail_interrupted_lessons(database):
+    """Fail lessons whose pipeline was queued or running when the backend last stopped.
+
+    Lessons that reached the render stage are left to their render job.
+    """
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE lessons
+            SET status = 'failed', error = 'Interrupted by a backend restart', updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+        ''')
+        conn.commit()
+        if cursor.rowcount:
+            print(f"Failed {cursor.rowcount} interrupted lesson(s)")
+    finally:
+        conn.close()
+
+
+def get_lesson(conn, lesson_id):
+    """A lesson with its stages, script sections and render job; None if there is no such lesson"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, user_email, topic, topic_key, quality, status, stage, render_job_id, title, sections, stages,
+               error, created_at, updated_at
+        FROM lessons WHERE id = ?
+    ''', (lesson_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    sections = json.loads(row[9]) if row[9] else []
+    lesson = {
+        'id': row[0],
+        'user_email': row[1],
+        'topic': row[2],
+        'topic_key': row[3],
+        'quality': row[4],
+        'status': row[5],
+        'stage': row[6],
+        'render_job_id': row[7],
+        'title': row[8],
+        'sections': sections,
+        'total_duration': len(sections) * SECTION_SECONDS,
+        'stages': json.loads(row[10]) if row[10] else {},
+        'error': row[11],
+        'created_at': row[12],
+        'updated_at': row[13],
+        'render_job': None,
+    }
+    if row[7]:
+        job = render_jobs.get_job(conn, row[7])
+        lesson['render_job'] = job
+        # The pipeline ends when the render is queued; the render job decides the rest
+        if job and lesson['status'] == 'rendering' and job['status'] in render_jobs.TERMINAL_STATUSES:
+            lesson['status'] = job['status']
+            lesson['error'] = job['error']
+    return lesson
+
+
+def _lock_for(key):
+    with _key_locks_lock:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = threading.Lock()
+            _key_locks[key] = lock
+        return lock
+
+
+class _LessonRun:
+    """State for one lesson while its stages run on a background thread"""
+
+    def __init__(self, database, lesson_id):
+        self.database = database
+        self.lesson_id = lesson_id
+        self.stages = {}
+
+    def update(self, **fields):
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            assignments = ', '.join(f'{name} = ?' for name in fields)
+            conn.execute(
+                f'UPDATE lessons SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                (*fields.values(), self.lesson_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _lookup(self, key):
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT output FROM lesson_stage_cache WHERE cache_key = ?', (key,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute('''
+                    UPDATE lesson_stage_cache SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP
+                    WHERE cache_key = ?
+                ''', (key,))
+                conn.commit()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def _store(self, stage, key, output):
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO lesson_stage_cache (stage, cache_key, output, created_at, last_used_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ''', (stage, key, output))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def forget(self, key):
+        conn = sqlite3.connect(self.database, timeout=30)
+        try:
+            conn.execute('DELETE FROM lesson_stage_cache WHERE cache_key = ?', (key,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _stage(self, stage, key, produce):
+        """A stage's cached output, or produce() it once for all lessons waiting on the same key"""
+        self.update(status='running', stage=stage)
+        started = time.perf_counter()
+        with _lock_for(key):
+            output = self._lookup(key)
+            cached = output is not None
+            if not cached:
+                output = produce()
+                self._store(stage, key, output)
+        self.stages[stage] = {'cached': cached, 'seconds': round(time.perf_counter() - started, 3)}
+        self.update(stages=json.dumps(self.stages))
+        return output
+
+    def run(self, topic, user_email, quality):
+        title = subject(topic)
+        key = topic_key(topic)
+
+        def write_script():
+            text = rate_limited_generate(SCRIPT_PROMPT.safe_substitute(topic=title)).strip()
+            return json.dumps({'title': title, 'text': text})
+
+        script_key = stage_key('script', SCRIPT_PROMPT.template, key)
+        script = json.loads(self._stage('script', script_key, write_script))
+        sections = parse_script(script['text'])
+        self.update(title=script['title'], sections=json.dumps(sections))
+
+        def write_code():
+            prompt = MANIM_PROMPT.safe_substitute(
+                title=script['title'],
+                total_duration=len(sections) * SECTION_SECONDS,
+                section_count=len(sections),
+                sections='\n'.join(
+                    SECTION_TEMPLATE.safe_substitute(number=i + 1, **section) for i, section in enumerate(sections)),
+                class_name=class_name(script['title']),
+            )
+            return strip_code_fences(rate_limited_generate(prompt)).strip() + '\n'
+
+        code_key = stage_key('manim', MANIM_PROMPT.template, text_hash(json.dumps(script, sort_keys=True)))
+        manim_code = self._stage('manim', code_key, write_code)
+
+        validation_seconds = None
+
+        def validate():
+            nonlocal validation_seconds
+            started = time.perf_counter()
+            result = manim_validator.validate(manim_code)
+            validation_seconds = time.perf_counter() - started
+            return json.dumps(result)
+
+        validation_key = stage_key('validation', text_hash(manim_code))
+        validation = json.loads(self._stage('validation', validation_key, validate))
+        if not validation['ok']:
+            # Write the scene again next time instead of failing on the cached one
+            self.forget(code_key)
+            self.forget(validation_key)
+            raise LessonError(f"Generated Manim code failed validation:\n{manim_validator.format_errors(validation)}")
+
+        self.update(stage='render')
+        started = time.perf_counter()
+        file_name = re.sub(r'[^a-zA-Z0-9]', '_', script['title'])
+        conn = render_jobs.connect(self.database)
+        try:
+            job_id = render_jobs.enqueue_job(conn, manim_code, file_name, script['title'], user_email, None, quality)
+            if validation_seconds is not None:
+                render_timings.record(conn, job_id, 'validation', validation_seconds)
+            job = render_jobs.get_job(conn, job_id)
+        finally:
+            conn.close()
+        self.stages['render'] = {'cached': job['stage'] == 'cache hit',
+                                 'seconds': round(time.perf_counter() - started, 3), 'job_id': job_id}
+        self.update(status='rendering', stage='render', render_job_id=job_id, stages=json.dumps(self.stages))
+        return job_id
+
+
+def run_job(database, lesson_id, topic, user_email=None, quality=None):
+    """Background entry point for a lesson"""
+    lesson = _LessonRun(database, lesson_id)
+    try:
+        job_id = lesson.run(topic, user_email, quality)
+        print(f"Lesson {lesson_id} ({topic_key(topic)!r}) is rendering as job {job_id}: {lesson.stages}")
+    except Exception as e:
+        lesson.update(status='failed', error=str(e))
+        if not isinstance(e, LessonError):
+            raise
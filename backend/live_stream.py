@@ -0,0 +1,118 @@
+"""Progressive HLS playback of a scene while it is still rendering.
+
+Manim writes every play()/wait() to its own partial movie file as soon as
+the animation is done. In progressive mode the render child remuxes each
+finished partial (stream copy, no re-encode) into an MPEG-TS segment and
+appends it to an EVENT playlist in the job's live directory. The frontend can
+start playing after the first animation instead of after the whole render.
+Segment timestamps continue from the previous segment, so the stream plays
+as one timeline. The playlist gets #EXT-X-ENDLIST when the scene finishes.
+
+Live directories live under RENDER_LIVE_DIR/<job id> and are served by
+GET /api/render-jobs/<id>/stream/<file>. sweep() removes them
+RENDER_LIVE_TTL_S after their last write; by then the finished mp4 is
+published and players have moved on to it.
+"""
+import math
+import os
+import shutil
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_LIVE_DIR = os.getenv('RENDER_LIVE_DIR', os.path.join(BACKEND_DIR, 'render_live'))
+RENDER_LIVE_TTL_S = int(os.getenv('RENDER_LIVE_TTL_S', '3600'))
+PLAYLIST_NAME = 'index.m3u8'
+
+
+def live_dir(job_id):
+    return os.path.join(RENDER_LIVE_DIR, str(job_id))
+
+
+def stream_url(job_id):
+    return f'/api/render-jobs/{job_id}/stream/{PLAYLIST_NAME}'
+
+
+def _write_atomic(path, text):
+    staging_path = f'{path}.partial'
+    with open(staging_path, 'w') as f:
+        f.write(text)
+    os.replace(staging_path, path)
+
+
+class LivePlaylist:
+    """HLS EVENT playlist that grows by one segment per finished animation.
+
+    Used inside the render child, where PyAV is available.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.segments = []  # (file name, seconds)
+        self.offset = 0.0
+        os.makedirs(directory, exist_ok=True)
+        self._write_playlist(finished=False)
+
+    def add(self, partial_movie_path):
+        """Remux one finished partial movie into the next segment"""
+        import av
+
+        name = f'segment{len(self.segments):04d}.ts'
+        staging_path = os.path.join(self.directory, f'{name}.partial')
+        with av.open(partial_movie_path) as source:
+            stream = source.streams.video[0]
+            shift = int(round(self.offset / stream.time_base))
+            start = end = None
+            with av.open(staging_path, 'w', format='mpegts') as target:
+                output = target.add_stream(template=stream)
+                for packet in source.demux(stream):
+                    # Skip the flushing packets demux generates
+                    if packet.dts is None:
+                        continue
+                    first = packet.pts if packet.pts is not None else packet.dts
+                    start = first if start is None else min(start, first)
+                    end = max(end or 0, first + (packet.duration or 0))
+                    packet.pts = None if packet.pts is None else packet.pts + shift
+                    packet.dts += shift
+                    packet.stream = output
+                    target.mux(packet)
+            seconds = float((end - start) * stream.time_base) if start is not None else 0.0
+        if seconds <= 0:
+            os.remove(staging_path)
+            return
+        os.replace(staging_path, os.path.join(self.directory, name))
+        self.segments.append((name, seconds))
+        self.offset += seconds
+        self._write_playlist(finished=False)
+
+    def finish(self):
+        self._write_playlist(finished=True)
+
+    def _write_playlist(self, finished):
+        target_duration = max([2] + [math.ceil(seconds) for _, seconds in self.segments])
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            '#EXT-X-PLAYLIST-TYPE:EVENT',
+            f'#EXT-X-TARGETDURATION:{target_duration}',
+            '#EXT-X-MEDIA-SEQUENCE:0',
+        ]
+        for name, seconds in self.segments:
+            lines.append(f'#EXTINF:{seconds:.3f},')
+            lines.append(name)
+        if finished:
+            lines.append('#EXT-X-ENDLIST')
+        _write_atomic(os.path.join(self.directory, PLAYLIST_NAME), '\n'.join(lines) + '\n')
+
+
+def sweep(max_age=None):
+    """Delete live directories nobody has written to for max_age seconds"""
+    max_age = RENDER_LIVE_TTL_S if max_age is None else max_age
+    if not os.path.isdir(RENDER_LIVE_DIR):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(RENDER_LIVE_DIR):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed
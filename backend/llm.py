@@ -0,0 +1,265 @@
+"""LLM provider abstraction used by the AI endpoints.
+
+The backend talks to whichever provider is selected with the LLM_PROVIDER
+environment variable:
+
+    LLM_PROVIDER=gemini   Google Gemini (default, needs GEMINI_API_KEY)
+    LLM_PROVIDER=local    Deterministic local stand-in for load testing
+
+The local provider never touches the network. It returns canned responses and
+can be tuned to behave like a slow or flaky upstream:
+
+    LLM_LOCAL_LATENCY_MS      fixed time to first token (default 200)
+    LLM_LOCAL_TOKENS_PER_SEC  simulated generation speed, 0 = instant (default 50)
+    LLM_LOCAL_429_RATE        fraction of calls failing with a 429 (default 0)
+    LLM_LOCAL_TIMEOUT_RATE    fraction of calls timing out (default 0)
+    LLM_LOCAL_TIMEOUT_S       how long a timed out call hangs (default 30)
+    LLM_LOCAL_SEED            seed for error injection (default 0)
+    LLM_LOCAL_RESPONSES       optional JSON file with a list of canned responses
+
+Fan-out work (such as folder digests) goes through ``rate_limited_generate``,
+which caps concurrent calls and calls per minute across the process and
+retries 429s with backoff:
+
+    LLM_MAX_CONCURRENCY       concurrent provider calls (default 4)
+    LLM_REQUESTS_PER_MINUTE   provider calls per minute, 0 = unlimited (default 60)
+    LLM_MAX_RETRIES           retries after a 429 (default 3)
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+GEMINI_PLACEHOLDER_KEY = 'your-gemini-api-key-here'
+
+
+class LLMError(Exception):
+    """Base error raised by LLM providers"""
+
+
+class LLMRateLimitError(LLMError):
+    """Upstream rejected the call because of quota or rate limits"""
+
+    def __init__(self, message='429 RATE_LIMIT_EXCEEDED: Quota exceeded'):
+        super().__init__(message)
+
+
+class LLMTimeoutError(LLMError):
+    """Upstream did not answer in time"""
+
+
+class LLMProvider:
+    """Interface every LLM backend implements"""
+
+    name = 'base'
+
+    def is_available(self):
+        """Whether the provider is configured and can serve requests"""
+        return True
+
+    def generate(self, prompt):
+        """Return the model's text response for a prompt"""
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini via google-generativeai"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key=None, model_name=DEFAULT_MODEL):
+        self.api_key = api_key or os.getenv('GEMINI_API_KEY', GEMINI_PLACEHOLDER_KEY)
+        self.model_name = model_name
+        if self.is_available():
+            genai.configure(api_key=self.api_key)
+
+    def is_available(self):
+        return self.api_key != GEMINI_PLACEHOLDER_KEY
+
+    def generate(self, prompt):
+        model = genai.GenerativeModel(self.model_name)
+        # Map quota and deadline errors so callers can back off or answer 504
+        try:
+            response = model.generate_content(prompt)
+        except (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests) as e:
+            raise LLMRateLimitError(str(e)) from e
+        except google_exceptions.DeadlineExceeded as e:
+            raise LLMTimeoutError(str(e)) from e
+        return response.text
+
+
+LOCAL_CHAT_RESPONSES = [
+    "<h2>Summary</h2><p>Here is a quick overview of your notes. The key ideas are "
+    "organized below with the most important formulas highlighted.</p><ul><li>"
+    "Derivative of sine: $\\frac{d}{dx}\\sin(x) = \\cos(x)$</li><li>Derivative of "
+    "cosine: $\\frac{d}{dx}\\cos(x) = -\\sin(x)$</li></ul>",
+    "<p>I can help with that. Break the topic into short sections, add a heading "
+    "for each one and keep one worked example per section.</p>",
+    "<h3>Study tip</h3><p>Review the definitions first, then practice two problems "
+    "of each type. Use $$\\lim_{h \\to 0} \\frac{f(x+h) - f(x)}{h}$$ to check your "
+    "derivatives.</p>",
+]
+
+LOCAL_MANIM_RESPONSE = '''from manim import *
+
+class LocalStandInVideo(Scene):
+    def construct(self):
+        title = Text("Local stand-in lesson", font_size=48, color=BLUE)
+        self.play(Write(title))
+        self.wait(1)
+        self.play(FadeOut(title))
+        formula = MathTex(r"\\frac{d}{dx}[\\sin(x)] = \\cos(x)")
+        self.play(Write(formula))
+        self.wait(1)
+        self.play(FadeOut(formula))
+'''
+
+
+class LocalLLMProvider(LLMProvider):
+    """Deterministic offline stand-in with configurable latency and failures"""
+
+    name = 'local'
+
+    def __init__(self, latency_ms=None, tokens_per_sec=None, rate_limit_rate=None,
+                 timeout_rate=None, timeout_s=None, seed=None, responses=None):
+        self.latency_ms = _env_float('LLM_LOCAL_LATENCY_MS', 200) if latency_ms is None else latency_ms
+        self.tokens_per_sec = _env_float('LLM_LOCAL_TOKENS_PER_SEC', 50) if tokens_per_sec is None else tokens_per_sec
+        self.rate_limit_rate = _env_float('LLM_LOCAL_429_RATE', 0) if rate_limit_rate is None else rate_limit_rate
+        self.timeout_rate = _env_float('LLM_LOCAL_TIMEOUT_RATE', 0) if timeout_rate is None else timeout_rate
+        self.timeout_s = _env_float('LLM_LOCAL_TIMEOUT_S', 30) if timeout_s is None else timeout_s
+        seed = int(_env_float('LLM_LOCAL_SEED', 0)) if seed is None else seed
+        self.responses = responses or _load_local_responses() or LOCAL_CHAT_RESPONSES
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            roll = self._random.random()
+
+        time.sleep(self.latency_ms / 1000.0)
+
+        if roll < self.rate_limit_rate:
+            raise LLMRateLimitError()
+        if roll < self.rate_limit_rate + self.timeout_rate:
+            time.sleep(self.timeout_s)
+            raise LLMTimeoutError(f'Local LLM stand-in timed out after {self.timeout_s}s')
+
+        text = self.canned_response(prompt)
+        if self.tokens_per_sec > 0:
+            time.sleep(len(text.split()) / self.tokens_per_sec)
+        return text
+
+    def canned_response(self, prompt):
+        """Pick a canned response; the same prompt always gets the same answer"""
+        if 'manim' in prompt.lower():
+            return LOCAL_MANIM_RESPONSE
+        digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+        return self.responses[digest[0] % len(self.responses)]
+
+
+def strip_code_fences(text):
+    """The code inside a ```python (or bare ```) fence, or the text as is"""
+    match = re.search(r'```(?:python)?\n([\s\S]*?)\n```', text)
+    return match.group(1) if match else text
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return len(text or '') // 4 + 1
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    if value is None or value == '':
+        return default
+    return float(value)
+
+
+def _load_local_responses():
+    path = os.getenv('LLM_LOCAL_RESPONSES')
+    if not path:
+        return None
+    with open(path) as f:
+        responses = json.load(f)
+    return [str(r) for r in responses] or None
+
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'local': LocalLLMProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_llm_provider():
+    """Return the process-wide provider selected by LLM_PROVIDER"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            name = os.getenv('LLM_PROVIDER', 'gemini').strip().lower()
+            if name not in PROVIDERS:
+                raise ValueError(f"Unknown LLM_PROVIDER '{name}', expected one of: {', '.join(PROVIDERS)}")
+            _provider = PROVIDERS[name]()
+            print(f"Using LLM provider: {_provider.name}")
+        return _provider
+
+
+def set_llm_provider(provider):
+    """Swap the active provider (used by benchmarks and scripts)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+class RateLimiter:
+    """Caps concurrent calls and spaces call starts to a per-minute budget"""
+
+    def __init__(self, max_concurrency, requests_per_minute):
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._slots.acquire()
+        if self._interval:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + self._interval
+            if start > now:
+                time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self._slots.release()
+        return False
+
+
+_rate_limiter = RateLimiter(
+    int(_env_float('LLM_MAX_CONCURRENCY', 4)),
+    _env_float('LLM_REQUESTS_PER_MINUTE', 60),
+)
+LLM_MAX_RETRIES = int(_env_float('LLM_MAX_RETRIES', 3))
+
+
+def rate_limited_generate(prompt, provider=None):
+    """Generate through the shared rate limiter, retrying 429s with backoff"""
+    provider = provider or get_llm_provider()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            with _rate_limiter:
+                return provider.generate(prompt)
+        except LLMRateLimitError:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            time.sleep(min(30.0, 2 ** attempt) + random.random())
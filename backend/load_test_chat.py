@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Fire concurrent /api/ai/chat requests and report throughput and tail latency.
+
+Start the backend with the local LLM stand-in so no quota is used:
+
+    LLM_PROVIDER=local LLM_LOCAL_LATENCY_MS=300 python app.py
+    python load_test_chat.py --token <jwt> --requests 200 --concurrency 20
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def send_chat(url, token, i):
+    started = time.perf_counter()
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({'message': f'Summarize my notes ({i})'}).encode('utf-8'),
+        headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5001/api/ai/chat')
+    parser.add_argument('--token', required=True, help='JWT for an existing user')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda i: send_chat(args.url, args.token, i), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    print(json.dumps({
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 2) if elapsed else None,
+        'latency_s': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3) if latencies else 0.0,
+        },
+        'statuses': statuses,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,412 @@
+"""Run a single Manim render for a render job.
+
+This is the body of the old synchronous /api/render-video handler. It is now
+called from a render worker thread (see render_jobs.py) and reports progress
+through a callback instead of printing and blocking an HTTP request.
+
+Every job renders inside its own private workspace under RENDER_WORK_DIR
+(script, media_dir and Manim's intermediate files), so concurrent renders,
+even of the same topic, never share paths. Only the finished mp4 leaves the
+workspace, published into the served videos directory with an atomic rename.
+
+By default scenes run on the pre-forked render zygote (render_zygote.py),
+which skips interpreter startup and the manim import for every job. Set
+RENDER_RUNNER=cli to launch the manim CLI per job instead; the CLI is also
+the fallback when the zygote cannot be started.
+
+On the zygote, scenes with at least RENDER_PARALLEL_MIN_ANIMATIONS animations
+are split into up to RENDER_SECTION_WORKERS contiguous animation ranges (at
+next_section() boundaries when the scene has them, otherwise where the scene
+timestamps balance the work). The ranges render in parallel children, and
+their partial movies are stream-copied into one file with manim's own
+combine logic. test_section_parallel.py checks that this matches the serial
+render frame for frame.
+
+With a live_dir, the zygote render also publishes each finished animation
+to a progressive HLS playlist (live_stream.py) so playback can start long
+before the render ends. Streaming needs the animations to finish in order,
+so it only applies to scenes that render serially anyway: a scene that can
+render section-parallel ignores live_dir and is playable when it finishes.
+"""
+import contextlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import manim_validator
+import partial_cache
+import render_quality
+import render_timings
+import render_zygote
+import tex_cache
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+VIDEOS_DIR = os.path.join(BACKEND_DIR, '..', 'frontend', 'public', 'videos')
+VENV_MANIM = os.path.join(BACKEND_DIR, 'venv312', 'bin', 'manim')
+RENDER_WORK_DIR = os.getenv('RENDER_WORK_DIR', os.path.join(BACKEND_DIR, 'render_work'))
+RENDER_TIMEOUT_S = int(os.getenv('RENDER_TIMEOUT_S', '180'))
+RENDER_RUNNER = os.getenv('RENDER_RUNNER', 'zygote')
+# Zygote children per job for section-parallel rendering (1 disables it)
+RENDER_SECTION_WORKERS = int(os.getenv('RENDER_SECTION_WORKERS', '4'))
+RENDER_PARALLEL_MIN_ANIMATIONS = int(os.getenv('RENDER_PARALLEL_MIN_ANIMATIONS', '8'))
+
+ANIMATION_PROGRESS_RE = re.compile(r'Animation (\d+)')
+# Updaters advance with each frame's dt, which a replay that skips frames
+# cannot reproduce; scenes using them always render serially
+PARALLEL_UNSAFE_RE = re.compile(r'\b(add_updater|always_rotate|always_shift|turn_animation_into_updater)\b')
+
+
+class RenderError(Exception):
+    """Manim failed or produced no video"""
+
+
+def safe_file_name(file_name):
+    """Clean a user supplied file name for use on disk"""
+    safe_filename = "".join(c for c in file_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return safe_filename.replace(' ', '_') or 'untitled'
+
+
+def find_scene_name(manim_code):
+    """Extract scene class name from the code"""
+    scene_name = manim_validator.find_scene_name(manim_code)
+    if scene_name:
+        return scene_name
+    # Unparseable code; the render will fail anyway, but with manim's error
+    scene_match = re.search(r'class\s+(\w+)\s*\(.*Scene.*\):', manim_code)
+    return scene_match.group(1) if scene_match else 'VideoLesson'
+
+
+def count_animations(manim_code):
+    """Rough number of play()/wait() calls, used as the progress denominator"""
+    return max(1, len(re.findall(r'self\.(?:play|wait)\s*\(', manim_code)))
+
+
+def section_parallel(manim_code, workers):
+    """Whether a zygote render of manim_code with this many workers is split into sections"""
+    return (workers > 1 and count_animations(manim_code) >= RENDER_PARALLEL_MIN_ANIMATIONS
+            and not PARALLEL_UNSAFE_RE.search(manim_code))
+
+
+def publish_video(source_path, public_name):
+    """Atomically place a finished video in the served videos directory.
+
+    The file is first hard-linked (or copied, across filesystems) next to its
+    final name, then renamed over it, so readers see either no file or the
+    complete one, never a partial write.
+    """
+    os.makedirs(VIDEOS_DIR, exist_ok=True)
+    final_path = os.path.join(VIDEOS_DIR, public_name)
+    staging_path = os.path.join(VIDEOS_DIR, f'.{public_name}.{uuid.uuid4().hex}.partial')
+    try:
+        try:
+            os.link(source_path, staging_path)
+        except OSError:
+            shutil.copyfile(source_path, staging_path)
+        os.replace(staging_path, final_path)
+    except Exception:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        raise
+    return f'/videos/{public_name}'
+
+
+_zygote = render_zygote.ZygoteClient()
+
+
+def find_output_video(media_dir, scene_name, quality):
+    """Manim outputs to: media_dir/videos/scene/<height>p<fps>/scene_name.mp4"""
+    module_dir = os.path.join(media_dir, 'videos', 'scene')
+    expected_video = os.path.join(module_dir, render_quality.output_dir_name(quality), f'{scene_name}.mp4')
+    if os.path.exists(expected_video):
+        return expected_video
+    raise RenderError(f"Video file not found under {module_dir}")
+
+
+def write_manim_cfg(workspace, partial_movie_dir=None):
+    """manim.cfg for the CLI, which reads it from its working directory.
+
+    Points the CLI at the shared LaTeX/text cache and, when given, the scene's
+    persistent partial movie dir (the zygote path sets these through config).
+    """
+    lines = [tex_cache.manim_cfg()]
+    if partial_movie_dir:
+        lines.append(f"partial_movie_dir = {partial_movie_dir}\n")
+        lines.append(f"max_files_cached = {partial_cache.PARTIAL_CACHE_MAX_FILES}\n")
+    with open(os.path.join(workspace, 'manim.cfg'), 'w') as f:
+        f.write(''.join(lines))
+
+
+def run_cli(workspace, script_path, media_dir, scene_name, quality, on_animation, partial_movie_dir=None):
+    """Render with a fresh ``manim`` CLI process and return the mp4 path.
+
+    The CLI cannot cap wait() holds, so a profile's max_wait only applies
+    on the zygote.
+    """
+    write_manim_cfg(workspace, partial_movie_dir)
+
+    # Check if venv manim exists
+    if not os.path.exists(VENV_MANIM):
+        raise RenderError(f"Manim not found in virtual environment: {VENV_MANIM}")
+
+    # Run manim command using the virtual environment
+    settings = render_quality.profile(quality)
+    cmd = [
+        VENV_MANIM,
+        '--resolution', f"{settings['pixel_width']},{settings['pixel_height']}",
+        '--frame_rate', str(settings['frame_rate']),
+        '--media_dir', media_dir,
+        script_path,
+        scene_name
+    ]
+
+    print(f"Running Manim command: {' '.join(cmd)}")
+
+    # Manim reports "Animation N: ..." on stderr as it goes; use it for progress
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        cwd=workspace
+    )
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        process.kill()
+
+    watchdog = threading.Timer(RENDER_TIMEOUT_S, kill_on_timeout)
+    watchdog.start()
+    output_lines = []
+    try:
+        for line in process.stdout:
+            output_lines.append(line)
+            match = ANIMATION_PROGRESS_RE.search(line)
+            if match:
+                on_animation(int(match.group(1)))
+        process.wait()
+    finally:
+        watchdog.cancel()
+
+    if timed_out.is_set():
+        raise RenderError(f"Manim timed out after {RENDER_TIMEOUT_S} seconds")
+
+    output = ''.join(output_lines)
+    print(f"Manim exit code: {process.returncode}")
+
+    if process.returncode != 0:
+        raise RenderError(f"Manim failed with exit code {process.returncode}: {output[-4000:]}")
+
+    return find_output_video(media_dir, scene_name, quality)
+
+
+def zygote_spec(workspace, script_path, media_dir, scene_name, quality, partial_movie_dir=None, **extra):
+    spec = {
+        'workspace': workspace,
+        'script_path': script_path,
+        'media_dir': media_dir,
+        'scene_name': scene_name,
+        'quality': quality,
+        'log_path': os.path.join(workspace, 'render.log'),
+        'result_path': os.path.join(workspace, 'result.json'),
+        'timings_path': render_timings.timings_path(workspace),
+        'partial_movie_dir': partial_movie_dir,
+        'max_files_cached': partial_cache.PARTIAL_CACHE_MAX_FILES,
+    }
+    spec.update(extra)
+    return spec
+
+
+def run_zygote_job(spec, on_animation=None, timer=None, **tags):
+    """Run one job in a zygote child and return its output; raise RenderError on failure.
+
+    With a timer, the child's timings are merged into it, tagged with tags.
+    """
+    try:
+        result = _zygote.run(spec, RENDER_TIMEOUT_S, on_animation)
+    except TimeoutError:
+        raise RenderError(f"Manim timed out after {RENDER_TIMEOUT_S} seconds")
+    finally:
+        if timer:
+            timer.load(spec['timings_path'], **tags)
+    if not result.get('ok'):
+        log = ''
+        if os.path.exists(spec['log_path']):
+            with open(spec['log_path'], errors='replace') as f:
+                log = f.read()
+        raise RenderError(f"Manim failed: {(log or result.get('error', ''))[-4000:]}")
+    return result['output']
+
+
+def run_zygote(workspace, script_path, media_dir, scene_name, quality, on_animation, partial_movie_dir=None,
+               live_dir=None, timer=None):
+    """Render in a child forked from the warm render zygote and return the mp4 path"""
+    output = run_zygote_job(
+        zygote_spec(workspace, script_path, media_dir, scene_name, quality, partial_movie_dir, live_dir=live_dir),
+        on_animation, timer)
+    if not os.path.exists(output):
+        return find_output_video(media_dir, scene_name, quality)
+    return output
+
+
+def plan_ranges(timeline, section_starts, workers):
+    """Split animations into up to `workers` contiguous (first, last) ranges.
+
+    Splits only at section starts when the scene uses next_section(), and
+    anywhere otherwise, choosing the boundaries whose scene timestamps best
+    balance the seconds of video (frames to draw) per range.
+    """
+    count = len(timeline)
+    if count < RENDER_PARALLEL_MIN_ANIMATIONS or workers < 2:
+        return None
+    starts = [0.0] + timeline[:-1]
+    total = timeline[-1] or 1.0
+    candidates = section_starts[1:] if len(section_starts) > 1 else list(range(1, count))
+
+    boundaries = []
+    for k in range(1, workers):
+        target = total * k / workers
+        remaining = [b for b in candidates if not boundaries or b > boundaries[-1]]
+        if not remaining:
+            break
+        best = min(remaining, key=lambda b: abs(starts[b] - target))
+        if best not in boundaries:
+            boundaries.append(best)
+    if not boundaries:
+        return None
+    edges = [0] + boundaries + [count]
+    return [(edges[i], edges[i + 1] - 1) for i in range(len(edges) - 1)]
+
+
+def run_sections(workspace, script_path, scene_name, quality, on_animation, partial_movie_dir=None, workers=None,
+                 timer=None):
+    """Render contiguous animation ranges in parallel zygote children and stream-copy them together.
+
+    Each child replays the animations before its range without drawing
+    them (manim's from/upto animation numbers), so it starts from the same
+    state the serial render would have. Returns the combined mp4 path, or
+    None when the scene is too short to be worth splitting.
+    """
+    workers = RENDER_SECTION_WORKERS if workers is None else workers
+    plan_dir = os.path.join(workspace, 'plan')
+    os.makedirs(plan_dir)
+    plan = run_zygote_job(zygote_spec(plan_dir, script_path, os.path.join(plan_dir, 'media'), scene_name, quality,
+                                      mode='plan'), timer=timer, section='plan')
+    ranges = plan_ranges(plan['timeline'], plan['section_starts'], workers)
+    if not ranges:
+        return None
+    print(f"Rendering {scene_name} as {len(ranges)} parallel ranges: {ranges}")
+
+    rendered = [0] * len(ranges)
+    progress_lock = threading.Lock()
+
+    def render_range(index):
+        first, last = ranges[index]
+        range_dir = os.path.join(workspace, f'range{index}')
+        os.makedirs(range_dir)
+
+        def on_range_animation(count):
+            with progress_lock:
+                rendered[index] = max(0, count - first)
+                on_animation(sum(rendered))
+
+        spec = zygote_spec(range_dir, script_path, os.path.join(range_dir, 'media'), scene_name, quality,
+                           partial_movie_dir, mode='range', from_animation=first, upto_animation=last)
+        return run_zygote_job(spec, on_range_animation, timer, section=index)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        segments = list(pool.map(render_range, range(len(ranges))))
+
+    combine_dir = os.path.join(workspace, 'combine')
+    os.makedirs(combine_dir)
+    output = os.path.join(combine_dir, f'{scene_name}.mp4')
+    return run_zygote_job(zygote_spec(combine_dir, script_path, None, scene_name, quality, mode='combine',
+                                      inputs=[path for segment in segments for path in segment], output=output),
+                          timer=timer)
+
+
+def render(manim_code, file_name, job_id, on_progress=None, store_output=None, runner=None,
+           partial_identity=None, section_workers=None, quality=None, live_dir=None, timer=None,
+           output_path=None):
+    """Render manim_code in a private workspace and publish the result.
+
+    store_output, if given, is called with the rendered file before the
+    workspace is removed and returns the path to publish from (the render
+    cache uses this to keep its own copy). runner is 'zygote' or 'cli' and
+    defaults to RENDER_RUNNER. partial_identity, if given, keeps Manim's
+    partial movies in that scene's persistent cache dir (partial_cache.py)
+    so unchanged animations are not re-rendered. section_workers overrides
+    RENDER_SECTION_WORKERS for section-parallel rendering on the zygote.
+    quality is a render_quality profile name or manim -q flag and defaults
+    to render_quality.DEFAULT_QUALITY. live_dir, if given, receives a
+    progressive HLS stream of the render (zygote runner, serial renders
+    only). timer, a render_timings.Timer, collects the render and publish
+    stages plus the render children's own timings. output_path, if given,
+    receives the video instead of the videos directory (render_node.py
+    uploads it).
+
+    Returns the public path of the video (``/videos/<name>-<job_id>.mp4``),
+    or output_path.
+    Raises RenderError when Manim fails.
+    """
+    on_progress = on_progress or (lambda progress, stage: None)
+    timer = timer or render_timings.Timer()
+    runner = runner or RENDER_RUNNER
+    quality = render_quality.normalize(quality)
+    safe_filename = safe_file_name(file_name)
+
+    # Private workspace for this job: script, media dir and all intermediates
+    os.makedirs(RENDER_WORK_DIR, exist_ok=True)
+    workspace = tempfile.mkdtemp(prefix=f'job{job_id}_', dir=RENDER_WORK_DIR)
+    media_dir = os.path.join(workspace, 'media')
+    script_path = os.path.join(workspace, 'scene.py')
+
+    with open(script_path, 'w') as f:
+        f.write(manim_code)
+
+    try:
+        scene_name = find_scene_name(manim_code)
+        total_animations = count_animations(manim_code)
+
+        def on_animation(count):
+            on_progress(min(0.95, count / total_animations), 'rendering')
+
+        on_progress(0.0, 'rendering')
+        expected_video = None
+        partial_lock = partial_cache.locked(partial_identity) if partial_identity else contextlib.nullcontext()
+        with timer.stage('render', runner=runner), partial_lock as partial_movie_dir:
+            if runner == 'zygote':
+                workers = RENDER_SECTION_WORKERS if section_workers is None else section_workers
+                try:
+                    # Parallel beats streaming: the whole scene is ready sooner
+                    if section_parallel(manim_code, workers):
+                        expected_video = run_sections(workspace, script_path, scene_name, quality, on_animation,
+                                                      partial_movie_dir, workers, timer)
+                    if expected_video is None:
+                        expected_video = run_zygote(workspace, script_path, media_dir, scene_name, quality,
+                                                    on_animation, partial_movie_dir, live_dir, timer)
+                except render_zygote.ZygoteUnavailable as e:
+                    print(f"Render zygote unavailable, using the manim CLI: {e}")
+            if expected_video is None:
+                expected_video = run_cli(workspace, script_path, media_dir, scene_name, quality, on_animation,
+                                         partial_movie_dir)
+
+        if output_path:
+            shutil.move(expected_video, output_path)
+            return output_path
+
+        on_progress(0.98, 'publishing')
+        with timer.stage('publish'):
+            if store_output:
+                expected_video = store_output(expected_video)
+            video_path = publish_video(expected_video, f'{safe_filename}-{job_id}.mp4')
+        print(f"Video successfully created: {video_path}")
+        return video_path
+
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
@@ -0,0 +1,275 @@
+"""Static pre-flight checks for submitted Manim code.
+
+Many generated scripts fail straight away: syntax errors, no Scene subclass,
+calls removed from Manim Community (get_graph, ShowCreation, ...), file
+loads through ImageMobject/SVGMobject, or imports the renderer should not
+run. validate() finds these from the AST in milliseconds, before a job is
+queued, and returns structured errors instead of a Manim traceback.
+
+Names are checked against what ``from manim import *`` provides in the
+render venv. The list is read statically from the installed package's
+source (every module's ``__all__``), so the backend never has to import
+manim. Results are cached in memory by a hash of the code and the manim
+version.
+"""
+import ast
+import builtins
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import render_cache
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+VALIDATION_CACHE_SIZE = int(os.getenv('VALIDATION_CACHE_SIZE', '512'))
+
+# Removed from Manim Community; using them fails at render time
+DEPRECATED_NAMES = {
+    'ShowCreation': 'Create',
+    'TextMobject': 'Tex',
+    'TexMobject': 'MathTex',
+    'FadeInFrom': 'FadeIn(mobject, shift=...)',
+    'FadeInFromDown': 'FadeIn(mobject, shift=UP)',
+    'FadeInFromLarge': 'FadeIn(mobject, scale=...)',
+    'FadeOutAndShift': 'FadeOut(mobject, shift=...)',
+    'FadeOutAndShiftDown': 'FadeOut(mobject, shift=DOWN)',
+    'ShowCreationThenDestruction': 'ShowPassingFlash',
+    'ShowCreationThenFadeOut': 'ShowPassingFlash',
+    'CircleIndicate': 'Circumscribe(mobject, Circle)',
+    'WiggleOutThenIn': 'Wiggle',
+    'ParametricSurface': 'Surface',
+    'GraphScene': 'Axes inside a regular Scene',
+}
+DEPRECATED_ATTRIBUTES = {
+    'get_graph': 'Axes.plot',
+    'camera_frame': 'self.camera.frame (in a MovingCameraScene)',
+}
+
+ALLOWED_IMPORTS = {
+    'manim', 'numpy', 'math', 'random', 'itertools', 'functools', 'typing', 'collections', 'string',
+    'fractions', 'decimal', 'statistics', 'operator', 'dataclasses', 'enum', 'copy', 'colour', 'scipy',
+    '__future__',
+}
+FORBIDDEN_CALLS = {'open', 'exec', 'eval', 'compile', '__import__', 'input', 'breakpoint', 'globals', 'vars'}
+FILE_LOADING_MOBJECTS = {'ImageMobject', 'SVGMobject'}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_manim_names = None
+
+
+def _manim_package_dir():
+    pattern = os.path.join(BACKEND_DIR, 'venv312', 'lib', 'python*', 'site-packages', 'manim', '__init__.py')
+    found = sorted(glob.glob(pattern))
+    return os.path.dirname(found[-1]) if found else None
+
+
+def _module_exports(package_dir, module, seen):
+    """Names a ``from <module> import *`` binds, read from the module's source"""
+    path = os.path.join(package_dir, *module.split('.'))
+    path = os.path.join(path, '__init__.py') if os.path.isdir(path) else path + '.py'
+    if path in seen or not os.path.exists(path):
+        return set()
+    seen.add(path)
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == '__all__' for t in node.targets):
+            try:
+                return set(ast.literal_eval(node.value))
+            except ValueError:
+                pass
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            for target in (node.targets if isinstance(node, ast.Assign) else [node.target]):
+                names.update(n.id for n in ast.walk(target) if isinstance(n, ast.Name))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == '*' and isinstance(node, ast.ImportFrom) and node.level:
+                    base = module if path.endswith('__init__.py') else module.rpartition('.')[0]
+                    for _ in range(node.level - 1):
+                        base = base.rpartition('.')[0]
+                    target = f'{base}.{node.module}' if node.module else base
+                    names |= _module_exports(package_dir, target.strip('.'), seen)
+                elif alias.name != '*':
+                    names.add((alias.asname or alias.name).split('.')[0])
+        elif isinstance(node, ast.Try):
+            for inner in node.body:
+                if isinstance(inner, (ast.Import, ast.ImportFrom)):
+                    names.update((a.asname or a.name).split('.')[0] for a in inner.names if a.name != '*')
+    return {name for name in names if not name.startswith('_')}
+
+
+def manim_names():
+    """Names provided by ``from manim import *`` in the render venv, or None if unknown"""
+    global _manim_names
+    if _manim_names is None:
+        package_dir = _manim_package_dir()
+        if package_dir is None:
+            return None
+        _manim_names = _module_exports(os.path.dirname(package_dir), 'manim', set())
+    return _manim_names
+
+
+def _error(errors, code, message, node=None):
+    errors.append({
+        'code': code,
+        'message': message,
+        'line': getattr(node, 'lineno', None),
+        'column': getattr(node, 'col_offset', None),
+    })
+
+
+def base_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Subscript):
+        return base_name(node.value)
+    return None
+
+
+def scene_classes(tree):
+    """Scene subclasses defined in the module, in source order.
+
+    A class counts when any base (on any line of a multi-line base list)
+    is named like a manim scene (Scene, MovingCameraScene, ...) or is
+    another scene class from the same module.
+    """
+    scenes = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = [base_name(base) for base in node.bases]
+        if any(base and (base.endswith('Scene') or base in scenes) for base in bases):
+            scenes.append(node.name)
+    return scenes
+
+
+def pick_scene(scenes, tree):
+    """The scene to render: the first one no other scene in the module extends"""
+    extended = set()
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name in scenes:
+            extended.update(base_name(base) for base in node.bases)
+    leaves = [name for name in scenes if name not in extended]
+    return (leaves or scenes)[0]
+
+
+def _defined_names(tree):
+    """Every name bound anywhere in the module (scope-insensitive on purpose)"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names.update((a.asname or a.name).split('.')[0] for a in node.names if a.name != '*')
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+    return names
+
+
+def _check(manim_code):
+    errors = []
+    warnings = []
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError as e:
+        errors.append({'code': 'syntax_error', 'message': e.msg, 'line': e.lineno, 'column': e.offset})
+        return {'ok': False, 'scene_name': None, 'errors': errors, 'warnings': warnings}
+
+    scenes = scene_classes(tree)
+    scene_name = pick_scene(scenes, tree) if scenes else None
+    if not scene_name:
+        _error(errors, 'no_scene', 'No Scene subclass found; define a class that extends Scene')
+
+    star_imports_manim = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] not in ALLOWED_IMPORTS:
+                    _error(errors, 'forbidden_import', f'Importing {alias.name} is not allowed', node)
+        elif isinstance(node, ast.ImportFrom):
+            module = (node.module or '').split('.')[0]
+            if node.level or module not in ALLOWED_IMPORTS:
+                _error(errors, 'forbidden_import', f'Importing from {node.module or "."} is not allowed', node)
+            if module == 'manim' and any(alias.name == '*' for alias in node.names):
+                star_imports_manim = True
+        elif isinstance(node, ast.Call):
+            name = base_name(node.func) if isinstance(node.func, ast.Name) else None
+            if name in FORBIDDEN_CALLS:
+                _error(errors, 'forbidden_call', f'{name}() is not allowed in a scene', node)
+            if base_name(node.func) in FILE_LOADING_MOBJECTS:
+                _error(errors, 'forbidden_file_load',
+                       f'{base_name(node.func)} loads files from disk, which renders cannot access', node)
+        elif isinstance(node, ast.Attribute):
+            if node.attr in DEPRECATED_ATTRIBUTES:
+                _error(errors, 'deprecated', f'.{node.attr} was removed from Manim; use '
+                                             f'{DEPRECATED_ATTRIBUTES[node.attr]}', node)
+            elif node.attr.startswith('__') and node.attr.endswith('__') and node.attr != '__init__':
+                _error(errors, 'forbidden_attribute', f'Accessing {node.attr} is not allowed', node)
+        elif isinstance(node, ast.Name) and node.id in DEPRECATED_NAMES:
+            _error(errors, 'deprecated', f'{node.id} was removed from Manim; use {DEPRECATED_NAMES[node.id]}', node)
+        elif isinstance(node, ast.ClassDef):
+            for item in node.body:
+                if isinstance(item, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'CONFIG'
+                                                        for t in item.targets):
+                    _error(errors, 'deprecated', 'CONFIG dictionaries are from the old manimlib; '
+                                                 'pass settings to __init__ or set them in construct()', item)
+
+    known = manim_names() if star_imports_manim else set()
+    if known is None:
+        warnings.append({'code': 'api_unknown', 'message': 'Installed manim not found; names were not checked',
+                         'line': None, 'column': None})
+    else:
+        defined = _defined_names(tree) | set(dir(builtins)) | known
+        reported = set()
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in defined
+                    and node.id not in DEPRECATED_NAMES and node.id not in reported):
+                reported.add(node.id)
+                hint = '' if star_imports_manim else ' (is "from manim import *" missing?)'
+                _error(errors, 'undefined_name', f'{node.id} is not defined{hint}', node)
+
+    errors.sort(key=lambda e: (e['line'] or 0, e['column'] or 0))
+    return {'ok': not errors, 'scene_name': scene_name, 'errors': errors, 'warnings': warnings}
+
+
+def validate(manim_code):
+    """Validate manim_code; returns {ok, scene_name, errors, warnings}"""
+    key = hashlib.sha256(f'{render_cache.manim_version()}\0{manim_code}'.encode('utf-8')).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    result = _check(manim_code)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > VALIDATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def find_scene_name(manim_code):
+    """Scene class to render, or None if the code does not parse or has no scene"""
+    return validate(manim_code)['scene_name']
+
+
+def format_errors(result):
+    """One line per error, for logs and job error messages"""
+    return '\n'.join(
+        f"line {e['line']}: {e['message']}" if e['line'] else e['message']
+        for e in result['errors']
+    )
@@ -0,0 +1,179 @@
+"""Structured note actions emitted by the AI assistant.
+
+The chat prompt asks the model to put any note changes in a single fenced
+block tagged ``actions`` containing JSON:
+
+    ```actions
+    {"actions": [
+        {"type": "create", "title": "Limits", "content": "<p>...</p>", "folder_id": 3},
+        {"type": "edit", "note_id": 12, "content": "<p>...</p>", "mode": "append"}
+    ]}
+    ```
+
+``parse_actions`` pulls the block out of the response and validates its shape,
+``apply_actions`` checks ownership and applies every action in one transaction.
+"""
+import json
+import re
+
+ACTIONS_BLOCK_RE = re.compile(r'```actions\s*\n(.*?)\n?```', re.DOTALL)
+EDIT_MODES = ('replace', 'append')
+MAX_ACTIONS = 50
+
+ACTIONS_PROMPT = """
+        NOTE ACTIONS:
+        To create or edit notes, end your reply with exactly one fenced block tagged "actions"
+        holding JSON in this format (omit the block when no note changes are needed):
+        ```actions
+        {"actions": [
+            {"type": "create", "title": "Note title", "content": "<p>HTML content</p>", "folder_id": null},
+            {"type": "edit", "note_id": 12, "title": "Optional new title", "content": "<p>HTML content</p>", "mode": "replace"}
+        ]}
+        ```
+        - "folder_id" must be one of the user's folder IDs or null for the root
+        - "note_id" must be one of the user's note IDs
+        - "mode" is "replace" (default) or "append" to add below the existing content
+        - Everything outside the block is shown to the user as your reply
+"""
+
+
+class NoteActionError(ValueError):
+    """Raised when the model's actions are malformed or not allowed"""
+
+
+def strip_actions(ai_response):
+    """The response without its actions block, for when the block is not applied"""
+    return ACTIONS_BLOCK_RE.sub('', ai_response).strip()
+
+
+def parse_actions(ai_response):
+    """Split a model response into display text and validated actions.
+
+    Returns ``(text, actions)``. Raises NoteActionError if an actions block is
+    present but malformed, so nothing is applied from a half-valid reply.
+    """
+    match = ACTIONS_BLOCK_RE.search(ai_response)
+    if not match:
+        return ai_response, []
+
+    text = (ai_response[:match.start()] + ai_response[match.end():]).strip()
+    try:
+        payload = json.loads(match.group(1))
+    except json.JSONDecodeError as e:
+        raise NoteActionError(f'Actions block is not valid JSON: {e}')
+
+    raw_actions = payload.get('actions') if isinstance(payload, dict) else payload
+    if not isinstance(raw_actions, list):
+        raise NoteActionError('Actions block must contain an "actions" list')
+    if len(raw_actions) > MAX_ACTIONS:
+        raise NoteActionError(f'Too many actions ({len(raw_actions)}), limit is {MAX_ACTIONS}')
+
+    return text, [_validate_action(action, i) for i, action in enumerate(raw_actions)]
+
+
+def _validate_action(action, index):
+    if not isinstance(action, dict):
+        raise NoteActionError(f'Action {index} must be an object')
+
+    action_type = action.get('type')
+    title = action.get('title')
+    content = action.get('content')
+    if title is not None and not isinstance(title, str):
+        raise NoteActionError(f'Action {index}: "title" must be a string')
+    if content is not None and not isinstance(content, str):
+        raise NoteActionError(f'Action {index}: "content" must be a string')
+
+    if action_type == 'create':
+        folder_id = action.get('folder_id')
+        if folder_id is not None and not _is_int(folder_id):
+            raise NoteActionError(f'Action {index}: "folder_id" must be an integer or null')
+        return {
+            'type': 'create',
+            'title': (title or '').strip() or 'AI Generated Note',
+            'content': content or '',
+            'folder_id': folder_id,
+        }
+
+    if action_type == 'edit':
+        note_id = action.get('note_id')
+        if not _is_int(note_id):
+            raise NoteActionError(f'Action {index}: "note_id" must be an integer')
+        if title is None and content is None:
+            raise NoteActionError(f'Action {index}: edit needs a "title" or "content"')
+        mode = action.get('mode') or 'replace'
+        if mode not in EDIT_MODES:
+            raise NoteActionError(f'Action {index}: "mode" must be one of {", ".join(EDIT_MODES)}')
+        return {
+            'type': 'edit',
+            'note_id': note_id,
+            'title': title.strip() if title and title.strip() else None,
+            'content': content,
+            'mode': mode,
+        }
+
+    raise NoteActionError(f'Action {index}: unknown type {action_type!r}')
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def apply_actions(conn, user_id, actions):
+    """Apply validated actions for a user in a single transaction.
+
+    Either every action is applied or none is; ownership of the referenced
+    notes and folders is checked inside the transaction. Returns one result
+    per action with the affected note id, its new version, title and content.
+    """
+    results = []
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        for action in actions:
+            if action['type'] == 'create':
+                folder_id = action['folder_id']
+                if folder_id is not None:
+                    cursor.execute('SELECT id FROM folders WHERE id = ? AND user_id = ?', (folder_id, user_id))
+                    if not cursor.fetchone():
+                        raise NoteActionError(f'Folder {folder_id} not found')
+                cursor.execute('''
+                    INSERT INTO notes (title, content, folder_id, user_id, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ''', (action['title'], action['content'], folder_id, user_id))
+                results.append({
+                    'type': 'create',
+                    'note_id': cursor.lastrowid,
+                    'version': 1,
+                    'title': action['title'],
+                    'content': action['content'],
+                    'folder_id': folder_id,
+                })
+            else:
+                note_id = action['note_id']
+                cursor.execute('SELECT title, content, version FROM notes WHERE id = ? AND user_id = ?', (note_id, user_id))
+                note = cursor.fetchone()
+                if not note:
+                    raise NoteActionError(f'Note {note_id} not found')
+                old_title, old_content, version = note
+
+                title = action['title'] or old_title
+                content = old_content
+                if action['content'] is not None:
+                    if action['mode'] == 'append':
+                        content = (old_content or '') + action['content']
+                    else:
+                        content = action['content']
+
+                cursor.execute('''
+                    UPDATE notes
+                    SET title = ?, content = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND user_id = ?
+                ''', (title, content, note_id, user_id))
+                results.append({
+                    'type': 'edit',
+                    'note_id': note_id,
+                    'version': version + 1,
+                    'title': title,
+                    'content': content,
+                })
+    return results
@@ -0,0 +1,197 @@
+"""Precomputed per-note summaries, key terms and outlines.
+
+Note content is stored as editor HTML, so the first few hundred characters are
+often markup rather than text. Whenever a note is written we schedule a
+debounced background job that strips the HTML and stores a compact summary,
+key terms and a heading outline in note_summaries. A content hash lets the job
+skip notes whose title and content have not changed. Notes written before
+summaries existed are backfilled in the background when the backend starts.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from html.parser import HTMLParser
+
+from background import debounce, submit_once
+
+NOTE_SUMMARY_DEBOUNCE_S = float(os.getenv('NOTE_SUMMARY_DEBOUNCE_S', '5'))
+SUMMARY_MAX_CHARS = 400
+MAX_KEY_TERMS = 10
+MAX_OUTLINE_ITEMS = 20
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+EMPHASIS_TAGS = ('b', 'strong', 'em', 'mark')
+SKIPPED_TAGS = ('script', 'style')
+BLOCK_TAGS = HEADING_TAGS + ('p', 'div', 'li', 'br', 'tr', 'pre', 'blockquote')
+
+STOPWORDS = set('''
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just let me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to too
+under until up use used using very was we were what when where which while who whom why will with would
+you your yours yourself yourselves
+'''.split())
+
+
+class _NoteHTMLParser(HTMLParser):
+    """Collect plain text, headings and emphasized phrases from note HTML"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.headings = []
+        self.emphasized = []
+        self._stack = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+        if tag in HEADING_TAGS + EMPHASIS_TAGS + SKIPPED_TAGS:
+            self._stack.append([tag, ''])
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+        if self._stack and self._stack[-1][0] == tag:
+            tag, text = self._stack.pop()
+            text = ' '.join(text.split())
+            if not text:
+                return
+            if tag in HEADING_TAGS:
+                self.headings.append({'level': int(tag[1]), 'text': text})
+            elif tag in EMPHASIS_TAGS:
+                self.emphasized.append(text)
+
+    def handle_data(self, data):
+        if any(tag in SKIPPED_TAGS for tag, _ in self._stack):
+            return
+        for entry in self._stack:
+            entry[1] += data
+        self.parts.append(data)
+
+
+def html_to_text(content):
+    """Strip editor HTML down to readable text"""
+    parser = _NoteHTMLParser()
+    parser.feed(content or '')
+    parser.close()
+    return _clean_text(''.join(parser.parts))
+
+
+def _clean_text(text):
+    lines = [' '.join(line.split()) for line in text.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+def compute_summary(title, content):
+    """Return summary, key terms and outline for a note"""
+    parser = _NoteHTMLParser()
+    parser.feed(content or '')
+    parser.close()
+    text = _clean_text(''.join(parser.parts))
+    heading_texts = {h['text'] for h in parser.headings}
+
+    # Summary: leading body sentences, skipping lines that are just headings
+    body_lines = [line for line in text.split('\n') if line not in heading_texts]
+    summary = ''
+    for sentence in re.split(r'(?<=[.!?])\s+', ' '.join(body_lines)):
+        if not sentence:
+            continue
+        if summary and len(summary) + len(sentence) + 1 > SUMMARY_MAX_CHARS:
+            break
+        summary = f'{summary} {sentence}'.strip()
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = summary[:SUMMARY_MAX_CHARS].rsplit(' ', 1)[0] + '...'
+
+    # Key terms: emphasized phrases first, then the most frequent content words
+    key_terms = []
+    for phrase in parser.emphasized:
+        if phrase.lower() not in (t.lower() for t in key_terms) and len(phrase) <= 60:
+            key_terms.append(phrase)
+    words = re.findall(r"[A-Za-z][A-Za-z'-]{2,}", f'{title} {text}'.lower())
+    counts = Counter(w for w in words if w not in STOPWORDS)
+    for word, _ in counts.most_common(MAX_KEY_TERMS * 2):
+        if len(key_terms) >= MAX_KEY_TERMS:
+            break
+        if word not in (t.lower() for t in key_terms):
+            key_terms.append(word)
+
+    return {
+        'summary': summary,
+        'key_terms': key_terms[:MAX_KEY_TERMS],
+        'outline': parser.headings[:MAX_OUTLINE_ITEMS],
+    }
+
+
+def content_hash(title, content):
+    return hashlib.sha256(f'{title}\0{content}'.encode('utf-8')).hexdigest()
+
+
+def schedule_note_summary(database, note_id):
+    """Recompute a note's summary in the background once edits settle"""
+    debounce(('note-summary', note_id), NOTE_SUMMARY_DEBOUNCE_S, refresh_note_summary, database, note_id)
+
+
+def refresh_note_summary(database, note_id):
+    """Recompute and store the summary for a note if its content changed"""
+    conn = sqlite3.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT title, content FROM notes WHERE id = ?', (note_id,))
+        note = cursor.fetchone()
+        if not note:
+            cursor.execute('DELETE FROM note_summaries WHERE note_id = ?', (note_id,))
+            conn.commit()
+            return
+        title, content = note
+
+        digest = content_hash(title, content)
+        cursor.execute('SELECT content_hash FROM note_summaries WHERE note_id = ?', (note_id,))
+        existing = cursor.fetchone()
+        if existing and existing[0] == digest:
+            return
+
+        result = compute_summary(title, content)
+        cursor.execute('''
+            INSERT OR REPLACE INTO note_summaries (note_id, content_hash, summary, key_terms, outline, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (note_id, digest, result['summary'], json.dumps(result['key_terms']), json.dumps(result['outline'])))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def schedule_summary_backfill(database):
+    """Summarize every note that has no summary yet, in the background"""
+    submit_once('note-summary-backfill', backfill_note_summaries, database)
+
+
+def backfill_note_summaries(database):
+    conn = sqlite3.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT n.id FROM notes n
+            LEFT JOIN note_summaries s ON s.note_id = n.id
+            WHERE s.note_id IS NULL
+        ''')
+        note_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    for note_id in note_ids:
+        refresh_note_summary(database, note_id)
+    if note_ids:
+        print(f"Backfilled summaries for {len(note_ids)} note(s)")
+
+
+def note_excerpt(summary, content, max_chars=SUMMARY_MAX_CHARS):
+    """Precomputed summary if there is one, else stripped text from the note"""
+    if summary:
+        return summary
+    text = ' '.join(html_to_text(content).split())
+    return text[:max_chars] + ('...' if len(text) > max_chars else '')
@@ -0,0 +1,107 @@
+"""Persistent per-scene cache of Manim partial movie files.
+
+Manim hashes every play()/wait() call and skips rendering any call whose
+partial movie (<hash>.mp4 in partial_movie_dir) already exists, then
+concatenates the partials into the final video. Render workspaces are thrown
+away after each job, so by default nothing is ever reused.
+
+Each job instead gets a partial_movie_dir under PARTIAL_CACHE_DIR named after
+its scene identity: a hash of the user, the note (or the file name when the
+render is not tied to a note yet) and the scene class. Re-rendering a tweaked
+script for the same note re-renders only the animations that changed.
+
+A render holds an exclusive lock on its identity's directory, so two renders
+of the same scene never write the same partials or file list at once. Manim
+itself keeps at most PARTIAL_CACHE_MAX_FILES partials per directory;
+evict() deletes whole directories, least recently rendered first, once the
+cache is larger than PARTIAL_CACHE_MAX_BYTES.
+"""
+import contextlib
+import fcntl
+import hashlib
+import os
+import shutil
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PARTIAL_CACHE_DIR = os.getenv('PARTIAL_CACHE_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'partial_movies'))
+PARTIAL_CACHE_MAX_BYTES = int(os.getenv('PARTIAL_CACHE_MAX_BYTES', str(1024 ** 3)))
+PARTIAL_CACHE_MAX_FILES = int(os.getenv('PARTIAL_CACHE_MAX_FILES', '100'))
+
+LOCK_FILE = '.lock'
+
+_evict_lock = threading.Lock()
+
+
+def scene_identity(user_email, note_ref, scene_name):
+    """Stable identity of a scene across edits of its script"""
+    hasher = hashlib.sha256()
+    for part in (user_email or 'anonymous', str(note_ref or ''), scene_name or ''):
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()[:32]
+
+
+def identity_dir(identity):
+    return os.path.join(PARTIAL_CACHE_DIR, identity)
+
+
+@contextlib.contextmanager
+def locked(identity):
+    """Hold the identity's partial movie directory for one render"""
+    directory = identity_dir(identity)
+    lock_path = os.path.join(directory, LOCK_FILE)
+    while True:
+        os.makedirs(directory, exist_ok=True)
+        lock = open(lock_path, 'a')
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.exists(lock_path) and os.stat(lock_path).st_ino == os.fstat(lock.fileno()).st_ino:
+            break
+        # Evicted while we waited for the lock: start over with a fresh dir
+        lock.close()
+    with lock:
+        try:
+            # Directory mtime is the LRU clock for eviction
+            os.utime(directory)
+            yield directory
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _dir_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict(max_bytes=None):
+    """Delete least recently used scene directories until the cache fits"""
+    max_bytes = PARTIAL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(PARTIAL_CACHE_DIR):
+        return 0
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(PARTIAL_CACHE_DIR):
+            if entry.is_dir():
+                entries.append((entry.stat().st_mtime, entry.path, _dir_size(entry.path)))
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, directory, size in sorted(entries):
+            if total <= max_bytes:
+                break
+            with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Being rendered right now
+                shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            print(f"Evicted {evicted} cached partial movie dir(s)")
+        return evicted
@@ -0,0 +1,137 @@
+"""Content-addressed cache of rendered videos.
+
+A render is keyed by a hash of the normalized scene source (its AST dump, so
+whitespace and comments do not matter), the scene name, the quality and the
+installed manim version. Finished renders are stored under RENDER_CACHE_DIR
+by key. A later request for the same key is served from the cache without
+rendering. The cache is bounded by RENDER_CACHE_MAX_BYTES and evicts the
+least recently used entries first.
+"""
+import ast
+import glob
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_CACHE_DIR = os.getenv('RENDER_CACHE_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'videos'))
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+_evict_lock = threading.Lock()
+_manim_version = None
+
+
+def manim_version():
+    """Version of manim installed in the render venv"""
+    global _manim_version
+    if _manim_version is None:
+        pattern = os.path.join(BACKEND_DIR, 'venv312', 'lib', 'python*', 'site-packages', 'manim-*.dist-info')
+        found = sorted(glob.glob(pattern))
+        _manim_version = os.path.basename(found[-1])[len('manim-'):-len('.dist-info')] if found else 'unknown'
+    return _manim_version
+
+
+def normalize_source(manim_code):
+    """Whitespace- and comment-insensitive form of a script"""
+    try:
+        return ast.dump(ast.parse(manim_code))
+    except SyntaxError:
+        # Still cacheable by text; it will fail to render anyway
+        return '\n'.join(line.rstrip() for line in manim_code.strip().splitlines())
+
+
+def cache_key(manim_code, scene_name, quality):
+    hasher = hashlib.sha256()
+    for part in (normalize_source(manim_code), scene_name, quality, manim_version()):
+        hasher.update(part.encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def lookup(conn, key):
+    """Return the cached video path for key and mark it used, or None"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT path FROM render_cache WHERE cache_key = ?', (key,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if not os.path.exists(row[0]):
+        cursor.execute('DELETE FROM render_cache WHERE cache_key = ?', (key,))
+        conn.commit()
+        return None
+    cursor.execute('''
+        UPDATE render_cache
+        SET last_used_at = CURRENT_TIMESTAMP, hits = hits + 1
+        WHERE cache_key = ?
+    ''', (key,))
+    conn.commit()
+    return row[0]
+
+
+def store(database, key, source_path):
+    """Copy a finished render into the cache and return its cached path"""
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    cached_path = os.path.join(RENDER_CACHE_DIR, f'{key}.mp4')
+    fd, staging_path = tempfile.mkstemp(prefix=f'.{key}.', suffix='.partial', dir=RENDER_CACHE_DIR)
+    os.close(fd)
+    try:
+        shutil.copyfile(source_path, staging_path)
+        os.replace(staging_path, cached_path)
+    except Exception:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+        raise
+
+    conn = sqlite3.connect(database, timeout=30)
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO render_cache (cache_key, path, size_bytes, created_at, last_used_at, hits)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 0)
+        ''', (key, cached_path, os.path.getsize(cached_path)))
+        conn.commit()
+    finally:
+        conn.close()
+
+    evict(database)
+    return cached_path
+
+
+def remove(conn, key):
+    """Drop one entry and its file"""
+    row = conn.execute('SELECT path FROM render_cache WHERE cache_key = ?', (key,)).fetchone()
+    if row and os.path.exists(row[0]):
+        os.remove(row[0])
+    conn.execute('DELETE FROM render_cache WHERE cache_key = ?', (key,))
+    conn.commit()
+
+
+def evict(database, max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = RENDER_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        conn = sqlite3.connect(database, timeout=30)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM render_cache')
+            total = cursor.fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            cursor.execute('SELECT cache_key, path, size_bytes FROM render_cache ORDER BY last_used_at ASC, created_at ASC')
+            evicted = 0
+            for key, path, size in cursor.fetchall():
+                if total <= max_bytes:
+                    break
+                if os.path.exists(path):
+                    os.remove(path)
+                conn.execute('DELETE FROM render_cache WHERE cache_key = ?', (key,))
+                total -= size
+                evicted += 1
+            conn.commit()
+            if evicted:
+                print(f"Evicted {evicted} cached render(s)")
+            return evicted
+        finally:
+            conn.close()
@@ -0,0 +1,254 @@
+"""Static render-cost estimate for a Manim script.
+
+Walks the scene's construct() (inlining calls to its own helper methods and
+unrolling literal loops) and adds up the seconds of video: every play() is
+its run_time (default 1s) and every wait() its duration. Frames at the
+render quality, weighted by constructs that make each frame expensive, plus
+a fixed cost for every Tex that is not in the shared LaTeX cache yet, give
+a predicted render time in seconds.
+
+The numbers are rough on purpose. They only need to rank jobs for the
+scheduler (render_jobs.claim_next_job) and give users an ETA. The cost
+constants below can be tuned from the per-job timings in the database.
+"""
+import ast
+import os
+
+import manim_validator
+import render_quality
+import tex_cache
+
+# Seconds to render one plain 2D frame, per million pixels
+FRAME_COST_PER_MEGAPIXEL_S = float(os.getenv('FRAME_COST_PER_MEGAPIXEL_S', '0.05'))
+RENDER_STARTUP_S = float(os.getenv('RENDER_STARTUP_S', '2.0'))
+TEX_COMPILE_S = float(os.getenv('TEX_COMPILE_S', '0.8'))
+TEXT_COMPILE_S = float(os.getenv('TEXT_COMPILE_S', '0.2'))
+# Extra per-frame cost of each always_redraw/updater, relative to a plain frame
+UPDATER_FRAME_FACTOR = 0.5
+THREE_D_FRAME_FACTOR = 3.0
+# Iterations assumed for loops over something that is not a literal
+UNKNOWN_LOOP_ITERATIONS = 3
+MAX_INLINE_DEPTH = 8
+
+TEX_ENVIRONMENTS = {'MathTex': ('align*', ' '), 'Tex': ('center', '')}
+TEXT_CLASSES = {'Text', 'MarkupText', 'Paragraph'}
+UPDATER_CALLS = {'always_redraw', 'add_updater', 'always_rotate', 'always_shift', 'turn_animation_into_updater'}
+THREE_D_NAMES = {'ThreeDScene', 'ThreeDAxes', 'Surface', 'Sphere', 'Cube', 'Prism', 'Cone', 'Cylinder', 'Torus'}
+
+_cached_bodies = {'mtime': None, 'bodies': set()}
+
+
+def _number(node, default):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return default
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else default
+
+
+def _keyword(call, name):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def _is_self_call(node, method):
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == method
+            and isinstance(node.func.value, ast.Name) and node.func.value.id == 'self')
+
+
+def _play_seconds(call):
+    run_time = _keyword(call, 'run_time')
+    if run_time is not None:
+        return _number(run_time, 1.0)
+    # Without an explicit run_time the longest animation decides
+    longest = 1.0
+    for arg in call.args:
+        if isinstance(arg, ast.Call) and _keyword(arg, 'run_time') is not None:
+            longest = max(longest, _number(_keyword(arg, 'run_time'), 1.0))
+    return longest
+
+
+def _wait_seconds(call, max_wait):
+    duration = call.args[0] if call.args else _keyword(call, 'duration')
+    seconds = 1.0 if duration is None else _number(duration, 1.0)
+    return seconds if max_wait is None else min(seconds, max_wait)
+
+
+def _iterations(iterable):
+    """How many times a for loop over iterable runs"""
+    if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and iterable.args:
+        if iterable.func.id == 'range':
+            bounds = [_number(arg, None) for arg in iterable.args]
+            if None in bounds:
+                return UNKNOWN_LOOP_ITERATIONS
+            try:
+                return len(range(*(int(bound) for bound in bounds)))
+            except (ValueError, OverflowError, TypeError):
+                # A zero step, an infinite or huge bound or too many arguments: the render fails on its own
+                return UNKNOWN_LOOP_ITERATIONS
+        if iterable.func.id in ('enumerate', 'reversed', 'zip'):
+            return _iterations(iterable.args[0])
+    if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+        return len(iterable.elts)
+    if isinstance(iterable, ast.Constant) and isinstance(iterable.value, str):
+        return len(iterable.value)
+    return UNKNOWN_LOOP_ITERATIONS
+
+
+class _SceneWalker:
+    """Seconds of video produced by a scene's construct()"""
+
+    def __init__(self, methods, max_wait=None):
+        self.methods = methods
+        self.max_wait = max_wait
+        self.animations = 0
+        self.stack = []
+
+    def statements(self, body, repeat=1.0):
+        return sum(self.statement(node) for node in body) * repeat
+
+    def statement(self, node):
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            return self.statements(node.body, _iterations(node.iter)) + self.statements(node.orelse)
+        if isinstance(node, ast.While):
+            return self.statements(node.body, UNKNOWN_LOOP_ITERATIONS)
+        if isinstance(node, ast.If):
+            # Whichever branch runs; assume the longer one
+            return max(self.statements(node.body), self.statements(node.orelse))
+        if isinstance(node, (ast.With, ast.AsyncWith)):
+            return self.statements(node.body)
+        if isinstance(node, ast.Try):
+            return self.statements(node.body) + self.statements(node.finalbody)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return 0.0
+        return sum(self.call(call) for call in ast.walk(node) if isinstance(call, ast.Call))
+
+    def call(self, node):
+        if _is_self_call(node, 'play'):
+            self.animations += 1
+            return _play_seconds(node)
+        if _is_self_call(node, 'wait') or _is_self_call(node, 'pause'):
+            self.animations += 1
+            return _wait_seconds(node, self.max_wait)
+        if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name) \
+                and node.func.value.id == 'self' and node.func.attr in self.methods:
+            name = node.func.attr
+            if name in self.stack or len(self.stack) >= MAX_INLINE_DEPTH:
+                return 0.0
+            self.stack.append(name)
+            try:
+                return self.statements(self.methods[name].body)
+            finally:
+                self.stack.pop()
+        return 0.0
+
+
+def _scene_methods(tree, scene_name):
+    """Methods visible on the scene, including ones from its in-module bases"""
+    classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+    methods = {}
+    chain = []
+    name = scene_name
+    while name in classes and name not in chain:
+        chain.append(name)
+        bases = [manim_validator.base_name(base) for base in classes[name].bases]
+        name = next((base for base in bases if base in classes), None)
+    for name in reversed(chain):
+        for item in classes[name].body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                methods[item.name] = item
+    return methods
+
+
+def cached_tex_bodies():
+    """Document bodies of every expression in the shared LaTeX cache"""
+    directory = tex_cache.tex_dir()
+    try:
+        mtime = os.stat(directory).st_mtime
+    except OSError:
+        return set()
+    if _cached_bodies['mtime'] != mtime:
+        bodies = set()
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('.tex'):
+                continue
+            try:
+                with open(entry.path, encoding='utf-8') as f:
+                    texcode = f.read()
+            except OSError:
+                continue
+            if r'\begin{document}' in texcode:
+                bodies.add(texcode.split(r'\begin{document}', 1)[1].rsplit(r'\end{document}', 1)[0].strip())
+        _cached_bodies['mtime'], _cached_bodies['bodies'] = mtime, bodies
+    return _cached_bodies['bodies']
+
+
+def _uncached_tex(tree):
+    """Tex/MathTex calls that will need a LaTeX compile"""
+    cached = cached_tex_bodies()
+    uncached = 0
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = manim_validator.base_name(node.func)
+        if name not in TEX_ENVIRONMENTS:
+            continue
+        environment, separator = TEX_ENVIRONMENTS[name]
+        try:
+            strings = [ast.literal_eval(arg) for arg in node.args]
+        except ValueError:
+            uncached += 1
+            continue
+        if not all(isinstance(string, str) for string in strings):
+            uncached += 1
+            continue
+        body = f'\\begin{{{environment}}}\n{separator.join(strings)}\n\\end{{{environment}}}'
+        if body not in cached:
+            uncached += 1
+    return uncached
+
+
+def estimate(manim_code, quality=None, scene_name=None):
+    """Predict the work of rendering manim_code at a render_quality profile.
+
+    Returns a dict of the parts, or None if the code does not parse.
+    """
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError:
+        return None
+    if scene_name is None:
+        scenes = manim_validator.scene_classes(tree)
+        scene_name = manim_validator.pick_scene(scenes, tree) if scenes else None
+
+    settings = render_quality.profile(quality)
+    methods = _scene_methods(tree, scene_name) if scene_name else {}
+    walker = _SceneWalker(methods, settings['max_wait'])
+    construct = methods.get('construct')
+    video_seconds = walker.statements(construct.body) if construct else 0.0
+
+    names = [manim_validator.base_name(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)]
+    updaters = sum(1 for name in names if name in UPDATER_CALLS)
+    three_d = any(isinstance(node, ast.Name) and node.id in THREE_D_NAMES for node in ast.walk(tree))
+    texts = sum(1 for name in names if name in TEXT_CLASSES)
+    uncached_tex = _uncached_tex(tree)
+
+    frames = int(round(video_seconds * settings['frame_rate']))
+    megapixels = settings['pixel_width'] * settings['pixel_height'] / 1e6
+    frame_cost = FRAME_COST_PER_MEGAPIXEL_S * megapixels * (1 + UPDATER_FRAME_FACTOR * updaters)
+    if three_d:
+        frame_cost *= THREE_D_FRAME_FACTOR
+    predicted = RENDER_STARTUP_S + frames * frame_cost + uncached_tex * TEX_COMPILE_S + texts * TEXT_COMPILE_S
+
+    return {
+        'video_seconds': round(video_seconds, 2),
+        'frames': frames,
+        'animations': walker.animations,
+        'uncached_tex': uncached_tex,
+        'texts': texts,
+        'updaters': updaters,
+        'three_d': three_d,
+        'predicted_seconds': round(predicted, 1),
+    }
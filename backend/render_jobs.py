@@ -0,0 +1,605 @@
+"""Persistent render job queue and render worker pool.
+
+POST /api/render-video only inserts a row into render_jobs and returns its id.
+A fixed pool of worker threads (RENDER_WORKERS, default 2, set per host) claims
+queued jobs, runs Manim and records status, progress, output path and errors
+on the row. Jobs live in SQLite, so anything queued or running when the
+backend stops is picked up again on the next start.
+
+Finished renders go into the content-addressed render cache (render_cache.py).
+A submission whose key is already cached completes immediately. A submission
+identical to a job that is still queued or running attaches to that job
+instead of rendering the same thing twice.
+
+Workers do not take jobs in arrival order. Each job gets a static cost
+estimate (render_estimate.py) when it is queued, and claim_next_job picks the
+queued job with the lowest priority score: its estimated render seconds,
+plus the estimated seconds this user already has rendering (per-user fair
+share), minus how long it has waited times RENDER_AGING_RATE (aging, so a
+long job is never starved by a stream of short ones).
+
+Quality is a job parameter (render_quality.py). When the queue is backed up
+or a job's estimate does not fit RENDER_TIME_BUDGET_S, the job is rendered
+with a cheaper profile so users still get a video quickly. Once it is done,
+an upgrade job at the requested quality is queued; upgrades only run when no
+interactive job is waiting, and their output replaces the degraded file in
+place.
+
+With RENDER_PROGRESSIVE on, interactive jobs stream as they render: each
+finished animation is appended to an HLS playlist (live_stream.py) and the
+job reports its stream_url as soon as the playlist exists. Scenes long
+enough to render section-parallel do not stream; they finish sooner instead.
+
+Before a job is marked completed, the worker extracts the video's poster,
+sprite thumbnails and metadata (video_media.py) into the videos table, so
+a finished job always reports its media.
+
+Every job's stage and per-animation timings are saved to render_timings
+(render_timings.py) when it ends.
+
+Each job also carries a scene identity (user + note + scene class, see
+partial_cache.py) so a re-render of an edited script reuses the partial
+movies of every animation that did not change.
+
+Render nodes on other hosts claim jobs through the same queue over HTTP
+(render_leases.py, render_node.py). Their claims are leases that must be
+renewed by heartbeats. A lease that runs out is requeued by the next claim,
+local or remote, and its holder can no longer publish. Local workers hold
+no lease. RENDER_WORKERS=0 leaves all rendering to remote nodes.
+
+A local render that fails inside Manim is not failed straight away: the
+worker asks the LLM for a minimal fix and renders it in the same worker, with
+the job's caches (render_repair.py). The attempts are saved in the job's
+repairs column. A repaired render is cached under the submitted code's key,
+so resubmitting the broken scene gets the working video.
+"""
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+
+import live_stream
+import manim_render
+import partial_cache
+import render_cache
+import render_estimate
+import render_quality
+import render_repair
+import render_timings
+import tex_cache
+import video_delivery
+import video_media
+
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '2'))
+TERMINAL_STATUSES = ('completed', 'failed')
+# Seconds of estimated render time a job gains for every second it waits
+RENDER_AGING_RATE = float(os.getenv('RENDER_AGING_RATE', '0.5'))
+# Weight of the user's in-progress render seconds in their next job's score
+RENDER_FAIR_SHARE_WEIGHT = float(os.getenv('RENDER_FAIR_SHARE_WEIGHT', '1.0'))
+DEFAULT_ESTIMATE_S = 30.0
+# Stream interactive renders as HLS while they render (serial rendering)
+RENDER_PROGRESSIVE = os.getenv('RENDER_PROGRESSIVE', '1') == '1'
+# Interactive latency target: queue wait plus render should fit in this
+RENDER_TIME_BUDGET_S = float(os.getenv('RENDER_TIME_BUDGET_S', '60'))
+# With this many interactive jobs queued, new jobs start one step down the ladder
+RENDER_DEGRADE_QUEUE_DEPTH = int(os.getenv('RENDER_DEGRADE_QUEUE_DEPTH', str(2 * RENDER_WORKERS)))
+# Background re-renders at the requested quality that may run at once
+RENDER_UPGRADE_WORKERS = int(os.getenv('RENDER_UPGRADE_WORKERS', '1'))
+# Remote leases that may run out on one job before it is failed
+RENDER_LEASE_MAX_ATTEMPTS = int(os.getenv('RENDER_LEASE_MAX_ATTEMPTS', '3'))
+
+# Lower runs first; evaluated for a queued row aliased as j
+PRIORITY_SQL = f'''
+    COALESCE(j.estimated_seconds, {DEFAULT_ESTIMATE_S})
+    + {RENDER_FAIR_SHARE_WEIGHT} * COALESCE((
+        SELECT SUM(COALESCE(r.estimated_seconds, {DEFAULT_ESTIMATE_S})) FROM render_jobs r
+        WHERE r.status = 'running' AND r.user_email IS j.user_email
+    ), 0)
+    - {RENDER_AGING_RATE} * (julianday('now') - julianday(j.created_at)) * 86400
+'''
+
+CLAIM_KEYS = ('id', 'manim_code', 'file_name', 'cache_key', 'scene_identity', 'scene_name', 'requested_quality',
+              'render_quality', 'upgrade_of', 'topic', 'user_email', 'note_id')
+CLAIM_COLUMNS = ', '.join(f'j.{key}' for key in CLAIM_KEYS)
+
+JOB_COLUMNS = '''
+    id, status, progress, stage, topic, file_name, scene_name, video_path, error,
+    created_at, started_at, finished_at, updated_at, estimated_seconds,
+    requested_quality, render_quality, upgrade_of, lease_owner, repairs
+'''
+
+
+def connect(database):
+    return sqlite3.connect(database, timeout=30)
+
+
+def _row_to_job(row):
+    return {
+        'id': row[0],
+        'status': row[1],
+        'progress': row[2],
+        'stage': row[3],
+        'topic': row[4],
+        'file_name': row[5],
+        'scene_name': row[6],
+        'video_path': row[7],
+        'error': row[8],
+        'created_at': row[9],
+        'started_at': row[10],
+        'finished_at': row[11],
+        'updated_at': row[12],
+        'estimated_seconds': row[13],
+        'requested_quality': row[14],
+        'render_quality': row[15],
+        'upgrade_of': row[16],
+        'worker': row[17],
+        'repairs': json.loads(row[18]) if row[18] else []
+    }
+
+
+def queue_backlog(conn):
+    """(interactive jobs queued, seconds until a worker could start a new one)"""
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT COUNT(*), COALESCE(SUM(COALESCE(estimated_seconds, {DEFAULT_ESTIMATE_S})), 0)
+        FROM render_jobs WHERE status = 'queued' AND upgrade_of IS NULL
+    ''')
+    depth, queued_seconds = cursor.fetchone()
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(COALESCE(estimated_seconds, {DEFAULT_ESTIMATE_S}) * (1 - progress)), 0)
+        FROM render_jobs WHERE status = 'running'
+    ''')
+    running_seconds = cursor.fetchone()[0]
+    return depth, (queued_seconds + running_seconds) / max(1, RENDER_WORKERS)
+
+
+def choose_quality(manim_code, scene_name, requested, depth, backlog_seconds):
+    """Best profile at or below requested whose render fits the time budget.
+
+    Returns (quality, cost estimate). Falls back to the cheapest profile
+    when nothing fits.
+    """
+    candidates = [requested] + render_quality.cheaper(requested)
+    if depth >= RENDER_DEGRADE_QUEUE_DEPTH and len(candidates) > 1:
+        candidates = candidates[1:]
+    cost = None
+    for quality in candidates:
+        cost = render_estimate.estimate(manim_code, quality, scene_name)
+        if cost is None:
+            return requested, None
+        if backlog_seconds + cost['predicted_seconds'] <= RENDER_TIME_BUDGET_S:
+            return quality, cost
+    return candidates[-1], cost
+
+
+def enqueue_job(conn, manim_code, file_name, topic, user_email=None, note_id=None, quality=None, adaptive=True):
+    """Queue a render and return the job id.
+
+    quality is the requested render_quality profile (or manim -q flag). With
+    adaptive, a busy queue may render a cheaper profile first and upgrade
+    it later. Cache hits complete before this returns; identical in-flight
+    renders return the id of the job already doing the work, and the
+    submitter's note and user are recorded in video_owners for that job.
+    """
+    requested = render_quality.normalize(quality)
+    scene_name = manim_render.find_scene_name(manim_code)
+    requested_key = render_cache.cache_key(manim_code, scene_name, requested)
+    identity = partial_cache.scene_identity(user_email, note_id or file_name, scene_name)
+    cursor = conn.cursor()
+
+    cached_path = render_cache.lookup(conn, requested_key)
+    if cached_path:
+        cursor.execute('''
+            INSERT INTO render_jobs (user_email, note_id, topic, file_name, scene_name, manim_code, cache_key,
+                                     scene_identity, requested_quality, render_quality, status, stage, started_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'running', 'publishing', CURRENT_TIMESTAMP)
+        ''', (user_email, note_id, topic, file_name, scene_name, manim_code, requested_key, identity,
+              requested, requested))
+        conn.commit()
+        job_id = cursor.lastrowid
+        try:
+            video_path = manim_render.publish_video(
+                cached_path, f'{manim_render.safe_file_name(file_name)}-{job_id}.mp4')
+        except OSError:
+            # Evicted between lookup and publish: render it after all
+            cursor.execute("UPDATE render_jobs SET status = 'queued', stage = 'queued' WHERE id = ?", (job_id,))
+            conn.commit()
+            notify_workers()
+            return job_id
+        # Usually instant: the cached bytes were probed when they were rendered
+        record_media(conn, job_id, video_path, note_id, user_email)
+        cursor.execute('''
+            UPDATE render_jobs
+            SET status = 'completed', stage = 'cache hit', progress = 1, video_path = ?,
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (video_path, job_id))
+        conn.commit()
+        return job_id
+
+    if adaptive:
+        depth, backlog_seconds = queue_backlog(conn)
+        chosen, cost = choose_quality(manim_code, scene_name, requested, depth, backlog_seconds)
+    else:
+        chosen, cost = requested, render_estimate.estimate(manim_code, requested, scene_name)
+    if chosen != requested:
+        print(f"Render queue is busy; rendering {file_name} at {chosen} instead of {requested} for now")
+    key = render_cache.cache_key(manim_code, scene_name, chosen)
+    estimated_seconds = cost['predicted_seconds'] if cost else None
+
+    # Single flight: check and insert in one transaction so two identical
+    # submissions cannot both queue a render
+    cursor.execute('BEGIN IMMEDIATE')
+    cursor.execute('''
+        SELECT id, note_id, user_email FROM render_jobs
+        WHERE cache_key IN (?, ?) AND status IN ('queued', 'running') AND upgrade_of IS NULL
+        ORDER BY id ASC
+        LIMIT 1
+    ''', (requested_key, key))
+    row = cursor.fetchone()
+    if row:
+        # The shared video belongs to this submitter too once it publishes (finish_job)
+        if (note_id or user_email) and (note_id, user_email) != (row[1], row[2]):
+            cursor.execute('INSERT INTO video_owners (job_id, note_id, user_email) VALUES (?, ?, ?)',
+                           (row[0], note_id, user_email))
+        conn.commit()
+        return row[0]
+    cursor.execute('''
+        INSERT INTO render_jobs (user_email, note_id, topic, file_name, scene_name, manim_code, cache_key,
+                                 scene_identity, estimated_seconds, requested_quality, render_quality, status, stage)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', 'queued')
+    ''', (user_email, note_id, topic, file_name, scene_name, manim_code, key, identity, estimated_seconds,
+          requested, chosen))
+    conn.commit()
+    job_id = cursor.lastrowid
+    notify_workers()
+    return job_id
+
+
+def get_job(conn, job_id):
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT {JOB_COLUMNS} FROM render_jobs WHERE id = ?', (job_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    job = _row_to_job(row)
+    job['eta_seconds'] = estimate_eta(conn, job)
+    playlist = os.path.join(live_stream.live_dir(job_id), live_stream.PLAYLIST_NAME)
+    job['stream_url'] = live_stream.stream_url(job_id) if os.path.exists(playlist) else None
+    if job['status'] == 'completed':
+        job['video_url'] = video_delivery.video_url(job['video_path'])
+        job['hls_url'] = video_delivery.hls_url(job['video_path'])
+        job['media'] = video_media.media_for(conn, job['video_path'])
+    return job
+
+
+def estimate_eta(conn, job):
+    """Rough seconds until the job finishes, from the queue's estimates"""
+    if job['status'] in TERMINAL_STATUSES:
+        return 0
+    own = job['estimated_seconds'] or DEFAULT_ESTIMATE_S
+    if job['status'] == 'running':
+        return round(own * (1 - (job['progress'] or 0)), 1)
+
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT j.id, COALESCE(j.estimated_seconds, {DEFAULT_ESTIMATE_S}), {PRIORITY_SQL}
+        FROM render_jobs j
+        WHERE j.status = 'queued' AND j.upgrade_of IS NULL
+    ''')
+    queued = cursor.fetchall()
+    scores = {job_id: (score, job_id) for job_id, _, score in queued}
+    if job['id'] not in scores:
+        return round(own, 1)
+    ahead = sum(seconds for job_id, seconds, _ in queued if scores[job_id] < scores[job['id']])
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(COALESCE(estimated_seconds, {DEFAULT_ESTIMATE_S}) * (1 - progress)), 0)
+        FROM render_jobs WHERE status = 'running'
+    ''')
+    running = cursor.fetchone()[0]
+    # Work ahead of this job is shared by the workers
+    return round((ahead + running) / max(1, RENDER_WORKERS) + own, 1)
+
+
+def update_job(database, job_id, **fields):
+    conn = connect(database)
+    try:
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        conn.execute(
+            f'UPDATE render_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+            (*fields.values(), job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def recover_interrupted_jobs(database):
+    """Requeue jobs that were running on this host when the backend last stopped.
+
+    Remote leases keep running; they are requeued if they run out.
+    """
+    conn = connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE render_jobs
+            SET status = 'queued', stage = 'requeued after restart', progress = 0,
+                lease_owner = NULL, lease_token = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running' AND lease_expires_at IS NULL
+        ''')
+        conn.commit()
+        if cursor.rowcount:
+            print(f"Requeued {cursor.rowcount} interrupted render job(s)")
+    finally:
+        conn.close()
+
+
+def requeue_expired_leases(cursor):
+    """Requeue running jobs whose remote lease ran out, or fail them after too many.
+
+    Runs inside the caller's transaction.
+    """
+    cursor.execute('''
+        UPDATE render_jobs
+        SET status = 'failed', stage = 'failed', finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP,
+            error = 'Render nodes stopped responding ' || lease_attempts || ' times', lease_expires_at = NULL
+        WHERE status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP AND lease_attempts >= ?
+    ''', (RENDER_LEASE_MAX_ATTEMPTS,))
+    failed = cursor.rowcount
+    cursor.execute('''
+        UPDATE render_jobs
+        SET status = 'queued', stage = 'requeued after lease expiry', progress = 0,
+            lease_owner = NULL, lease_token = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running' AND lease_expires_at < CURRENT_TIMESTAMP
+    ''')
+    if failed or cursor.rowcount:
+        print(f"Render leases expired: requeued {cursor.rowcount}, failed {failed} job(s)")
+    return cursor.rowcount
+
+
+def claim_next_job(database, lease_owner=None, lease_token=None, lease_seconds=None):
+    """Atomically move the best-scoring queued job to running and return it.
+
+    Background quality upgrades are only claimed when no interactive job is
+    queued, and at most RENDER_UPGRADE_WORKERS of them run at once. With
+    lease_owner, the claim is a lease (render_leases.py) that expires
+    lease_seconds from now unless renewed.
+    """
+    conn = connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        requeue_expired_leases(cursor)
+        cursor.execute(f'''
+            SELECT {CLAIM_COLUMNS} FROM render_jobs j
+            WHERE j.status = 'queued' AND j.upgrade_of IS NULL
+            ORDER BY {PRIORITY_SQL} ASC, j.id ASC
+            LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        if not row:
+            cursor.execute(f'''
+                SELECT {CLAIM_COLUMNS} FROM render_jobs j
+                WHERE j.status = 'queued' AND j.upgrade_of IS NOT NULL
+                  AND (SELECT COUNT(*) FROM render_jobs r
+                       WHERE r.status = 'running' AND r.upgrade_of IS NOT NULL) < ?
+                ORDER BY j.id ASC
+                LIMIT 1
+            ''', (RENDER_UPGRADE_WORKERS,))
+            row = cursor.fetchone()
+        if not row:
+            # Keep the expired leases requeued above
+            conn.commit()
+            return None
+        if lease_owner:
+            cursor.execute('''
+                UPDATE render_jobs
+                SET status = 'running', stage = 'starting', started_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP, lease_owner = ?, lease_token = ?,
+                    lease_expires_at = datetime('now', ?), lease_attempts = lease_attempts + 1
+                WHERE id = ?
+            ''', (lease_owner, lease_token, f'+{int(lease_seconds)} seconds', row[0]))
+        else:
+            cursor.execute('''
+                UPDATE render_jobs
+                SET status = 'running', stage = 'starting', started_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (row[0],))
+        conn.commit()
+        return dict(zip(CLAIM_KEYS, row))
+    finally:
+        conn.close()
+
+
+def run_job(database, job):
+    """Render one claimed job and record the outcome"""
+    last = {'progress': -1.0, 'stage': None}
+
+    def on_progress(progress, stage):
+        # Only write meaningful changes; every write is a SQLite transaction
+        if stage != last['stage'] or progress - last['progress'] >= 0.01:
+            last['progress'], last['stage'] = progress, stage
+            update_job(database, job['id'], progress=round(progress, 3), stage=stage)
+
+    timer = render_timings.Timer()
+    try:
+        store_output = None
+        if job['cache_key']:
+            store_output = lambda path: render_cache.store(database, job['cache_key'], path)
+        # An upgrade publishes over the degraded job's file, swapping it in place
+        output_id = job['upgrade_of'] or job['id']
+        live_dir = live_stream.live_dir(job['id']) if RENDER_PROGRESSIVE and not job['upgrade_of'] else None
+
+        def render(manim_code):
+            return manim_render.render(manim_code, job['file_name'], output_id, on_progress, store_output,
+                                       partial_identity=job['scene_identity'], quality=job['render_quality'],
+                                       live_dir=live_dir, timer=timer)
+
+        try:
+            video_path = render(job['manim_code'])
+        except manim_render.RenderError as e:
+            if not (render_repair.repairable(e) and render_repair.available()):
+                raise
+            video_path, manim_code = repair_job(database, job, e, render, live_dir, on_progress, timer)
+            # Upgrades re-render the code that worked
+            job = dict(job, manim_code=manim_code, scene_name=manim_render.find_scene_name(manim_code))
+            update_job(database, job['id'], manim_code=manim_code, scene_name=job['scene_name'])
+        on_progress(0.99, 'thumbnails')
+        finish_job(database, job, video_path, timer)
+    except Exception as e:
+        print(f"Render job {job['id']} failed: {e}")
+        update_job(database, job['id'], status='failed', stage='failed', error=str(e),
+                   finished_at=time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))
+    save_timings(database, job['id'], timer)
+    try:
+        tex_cache.evict()
+        partial_cache.evict()
+        live_stream.sweep()
+    except OSError as e:
+        print(f"Could not trim the render caches: {e}")
+
+
+def repair_job(database, job, error, render, live_dir, on_progress, timer):
+    """Render LLM fixes of a failed scene in this worker; returns (video path, repaired code)"""
+    print(f"Render job {job['id']} failed in Manim; asking for a fix")
+
+    def on_attempt(attempts):
+        update_job(database, job['id'], repairs=json.dumps(attempts))
+        if attempts[-1].get('outcome') == 'rendering':
+            if live_dir:
+                # The retry streams from the start
+                shutil.rmtree(live_dir, ignore_errors=True)
+            on_progress(0.0, f"repair {attempts[-1]['attempt']}")
+
+    on_progress(0.0, 'repairing')
+    video_path, manim_code = render_repair.render_with_repairs(render, job['manim_code'], error, on_attempt, timer)
+    print(f"Render job {job['id']} rendered after a repair")
+    return video_path, manim_code
+
+
+def finish_job(database, job, video_path, timer):
+    """Record a published video's media, mark its job completed and handle quality upgrades"""
+    conn = connect(database)
+    try:
+        with timer.stage('thumbnails'):
+            record_media(conn, job['id'], video_path, job['note_id'], job['user_email'])
+    finally:
+        conn.close()
+    update_job(database, job['id'], status='completed', stage='done', progress=1.0,
+               video_path=video_path, finished_at=time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))
+    # No submission can attach once the job is completed, so every owner is recorded here
+    conn = connect(database)
+    try:
+        conn.execute('UPDATE video_owners SET video_path = ? WHERE job_id = ?', (video_path, job['id']))
+        conn.commit()
+    finally:
+        conn.close()
+    if job['upgrade_of']:
+        update_job(database, job['upgrade_of'], render_quality=job['render_quality'], stage='upgraded')
+        print(f"Render job {job['upgrade_of']} upgraded to {job['render_quality']}")
+    elif job['render_quality'] and job['render_quality'] != job['requested_quality']:
+        queue_upgrade(database, job)
+
+
+def save_timings(database, job_id, timer):
+    try:
+        conn = connect(database)
+        try:
+            render_timings.save(conn, job_id, timer)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Could not save timings of render job {job_id}: {e}")
+
+
+def record_media(conn, job_id, video_path, note_id=None, user_email=None):
+    """Extract a finished video's poster, sprite and metadata; a failure only loses the preview"""
+    try:
+        video_media.record(conn, video_path, job_id, note_id, user_email)
+    except Exception as e:
+        print(f"Could not extract media for render job {job_id}: {e}")
+
+
+def queue_upgrade(database, job):
+    """Queue a background re-render of a degraded job at its requested quality"""
+    quality = job['requested_quality']
+    key = render_cache.cache_key(job['manim_code'], job['scene_name'], quality)
+    cost = render_estimate.estimate(job['manim_code'], quality, job['scene_name'])
+    conn = connect(database)
+    try:
+        conn.execute('''
+            INSERT INTO render_jobs (user_email, note_id, topic, file_name, scene_name, manim_code, cache_key,
+                                     scene_identity, estimated_seconds, requested_quality, render_quality,
+                                     upgrade_of, status, stage)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', 'waiting for idle workers')
+        ''', (job['user_email'], job['note_id'], job['topic'], job['file_name'], job['scene_name'],
+              job['manim_code'], key, job['scene_identity'], cost['predicted_seconds'] if cost else None,
+              quality, quality, job['id']))
+        conn.commit()
+    finally:
+        conn.close()
+    notify_workers()
+
+
+class RenderWorkerPool:
+    """Fixed number of threads pulling jobs from the render_jobs table"""
+
+    def __init__(self, database, workers=RENDER_WORKERS):
+        self.database = database
+        # 0 leaves rendering to remote render nodes (render_leases.py)
+        self.workers = max(0, workers)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f'render-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Started {self.workers} render worker(s)")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _worker_loop(self):
+        while not self._stopped.is_set():
+            try:
+                job = claim_next_job(self.database)
+            except Exception:
+                print(f"Render worker could not claim a job:\n{traceback.format_exc()}")
+                job = None
+            if job is None:
+                # Sleep until a new job is queued (or poll again shortly)
+                self._wakeup.wait(timeout=2.0)
+                self._wakeup.clear()
+                continue
+            run_job(self.database, job)
+
+
+_pool = None
+
+
+def start_workers(database, workers=RENDER_WORKERS):
+    """Requeue interrupted jobs and start this host's render workers"""
+    global _pool
+    if _pool is not None:
+        return _pool
+    recover_interrupted_jobs(database)
+    _pool = RenderWorkerPool(database, workers)
+    _pool.start()
+    return _pool
+
+
+def notify_workers():
+    if _pool is not None:
+        _pool.notify()
@@ -0,0 +1,220 @@
+"""Remote render nodes: leases on render jobs, heartbeats and result uploads.
+
+Extra hosts run render_node.py from a checkout of this repo with the same
+render venv and pull jobs from the backend over HTTP. The protocol (routes
+under /api/render-workers/, authenticated with the shared
+RENDER_WORKER_TOKEN) is:
+
+1. lease: claim_next_job() with a lease. The node gets the job, a random
+   lease token and the lease length (RENDER_LEASE_S).
+2. heartbeat: every HEARTBEAT_FRACTION of the lease, with the job's progress.
+   Each one renews the lease. It fails with LeaseLost once the lease has
+   been requeued, and the node drops the job.
+3. upload: the finished mp4 goes into UPLOAD_DIR under its sha256, which the
+   backend verifies while streaming it to disk. Uploads are content-addressed,
+   so retrying one is harmless.
+4. complete: publishes the upload exactly once. A compare-and-set on the
+   lease token moves the job to 'publishing' and clears its expiry, then the
+   upload is stored in the render cache, published to the videos directory
+   and finished like a local render (thumbnails, upgrades, timings). A node
+   whose lease was requeued gets LeaseLost. A duplicate complete() that
+   arrives while the first one is publishing gets PublishPending, and a
+   retry after it finished gets the same video path back.
+5. fail: a render error on the node fails the job.
+
+A lease that is not renewed runs out. The next claim, from a local worker or
+any node, requeues the job (render_jobs.requeue_expired_leases), so a node
+that dies or stalls costs at most RENDER_LEASE_S. After
+RENDER_LEASE_MAX_ATTEMPTS expired leases the job fails. Remote renders do not
+stream progressive HLS.
+"""
+import hashlib
+import os
+import re
+import secrets
+import tempfile
+import time
+
+import manim_render
+import render_cache
+import render_jobs
+import render_timings
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_WORKER_TOKEN = os.getenv('RENDER_WORKER_TOKEN')
+RENDER_LEASE_S = int(os.getenv('RENDER_LEASE_S', '60'))
+HEARTBEAT_FRACTION = 1 / 3
+UPLOAD_DIR = os.getenv('RENDER_UPLOAD_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'uploads'))
+RENDER_UPLOAD_MAX_BYTES = int(os.getenv('RENDER_UPLOAD_MAX_BYTES', str(2 * 1024 ** 3)))
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class LeaseLost(Exception):
+    """The job is no longer leased with this token"""
+
+
+class PublishPending(LeaseLost):
+    """Another complete() with the same token is publishing the job right now"""
+
+
+class UploadMissing(Exception):
+    """complete() named an upload that is not (or no longer) in UPLOAD_DIR"""
+
+
+def lease(database, worker):
+    """Lease the next job to a render node; None when the queue is empty"""
+    token = secrets.token_hex(16)
+    job = render_jobs.claim_next_job(database, worker, token, RENDER_LEASE_S)
+    if not job:
+        return None
+    print(f"Render job {job['id']} leased to {worker}")
+    return dict(job, lease_token=token, lease_seconds=RENDER_LEASE_S,
+                heartbeat_seconds=max(1, int(RENDER_LEASE_S * HEARTBEAT_FRACTION)))
+
+
+def heartbeat(database, job_id, token, progress=None, stage=None):
+    """Renew a lease and record the node's progress; LeaseLost if it ran out"""
+    conn = render_jobs.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE render_jobs
+            SET lease_expires_at = datetime('now', ?), progress = COALESCE(?, progress),
+                stage = COALESCE(?, stage), updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running' AND lease_token = ? AND lease_expires_at IS NOT NULL
+        ''', (f'+{RENDER_LEASE_S} seconds', progress, stage, job_id, token))
+        conn.commit()
+        if not cursor.rowcount:
+            raise LeaseLost(job_id)
+    finally:
+        conn.close()
+    return RENDER_LEASE_S
+
+
+def upload_path(digest):
+    return os.path.join(UPLOAD_DIR, f'{digest}.mp4')
+
+
+def store_upload(stream, length, digest):
+    """Stream an uploaded render into UPLOAD_DIR, verifying its sha256; ValueError if it does not match"""
+    if not DIGEST_RE.match(digest):
+        raise ValueError('Uploads are named by the sha256 of their content')
+    if length is None or length > RENDER_UPLOAD_MAX_BYTES:
+        raise ValueError(f'Uploads need a Content-Length of at most {RENDER_UPLOAD_MAX_BYTES} bytes')
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, staging_path = tempfile.mkstemp(prefix=f'.{digest}.', suffix='.partial', dir=UPLOAD_DIR)
+    try:
+        hasher = hashlib.sha256()
+        remaining = length
+        with os.fdopen(fd, 'wb') as f:
+            while remaining:
+                chunk = stream.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    raise ValueError('Upload ended before its Content-Length')
+                hasher.update(chunk)
+                f.write(chunk)
+                remaining -= len(chunk)
+        if hasher.hexdigest() != digest:
+            raise ValueError('Upload does not match its sha256')
+        os.replace(staging_path, upload_path(digest))
+    finally:
+        if os.path.exists(staging_path):
+            os.remove(staging_path)
+    return upload_path(digest)
+
+
+def _claim_publish(database, job_id, token, digest):
+    """Compare-and-set the lease into 'publishing'; returns (job, video path if already published)"""
+    conn = render_jobs.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(f'''
+            SELECT j.status, j.lease_token, j.video_path, j.lease_expires_at, {render_jobs.CLAIM_COLUMNS}
+            FROM render_jobs j WHERE j.id = ?
+        ''', (job_id,))
+        row = cursor.fetchone()
+        if not row or not token or row[1] != token:
+            conn.rollback()
+            raise LeaseLost(job_id)
+        status, _, video_path, lease_expires_at = row[:4]
+        job = dict(zip(render_jobs.CLAIM_KEYS, row[4:]))
+        if status == 'completed':
+            conn.rollback()
+            return job, video_path
+        if status != 'running':
+            conn.rollback()
+            raise LeaseLost(job_id)
+        if lease_expires_at is None:
+            # Claimed by an earlier complete() with this token that is still publishing
+            conn.rollback()
+            raise PublishPending(job_id)
+        if not os.path.exists(upload_path(digest)):
+            conn.rollback()
+            raise UploadMissing(digest)
+        # An expired lease that nobody requeued yet still publishes: no one else has the job
+        cursor.execute('''
+            UPDATE render_jobs
+            SET stage = 'publishing', progress = 0.98, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running' AND lease_token = ? AND lease_expires_at IS NOT NULL
+              AND stage IS NOT 'publishing'
+        ''', (job_id, token))
+        if not cursor.rowcount:
+            conn.rollback()
+            raise PublishPending(job_id)
+        conn.commit()
+        return job, None
+    finally:
+        conn.close()
+
+
+def complete(database, job_id, token, digest, timings=None):
+    """Publish a leased job's uploaded render exactly once and return its video path"""
+    if not DIGEST_RE.match(digest or ''):
+        raise ValueError('Uploads are named by the sha256 of their content')
+    job, video_path = _claim_publish(database, job_id, token, digest)
+    if video_path:
+        return video_path
+
+    timer = render_timings.Timer()
+    timer.entries.extend(timings or [])
+    try:
+        with timer.stage('publish'):
+            source = upload_path(digest)
+            if job['cache_key']:
+                source = render_cache.store(database, job['cache_key'], source)
+            output_id = job['upgrade_of'] or job['id']
+            video_path = manim_render.publish_video(
+                source, f"{manim_render.safe_file_name(job['file_name'])}-{output_id}.mp4")
+        render_jobs.finish_job(database, job, video_path, timer)
+        print(f"Render job {job_id} published from a render node: {video_path}")
+    except Exception as e:
+        print(f"Render job {job_id} failed to publish: {e}")
+        render_jobs.update_job(database, job_id, status='failed', stage='failed', error=str(e),
+                               finished_at=time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime()))
+        raise
+    finally:
+        render_jobs.save_timings(database, job_id, timer)
+    # A node that uploads the same bytes later re-uploads when complete() finds nothing
+    if os.path.exists(upload_path(digest)):
+        os.remove(upload_path(digest))
+    return video_path
+
+
+def fail(database, job_id, token, error):
+    """Fail a leased job with the node's render error; LeaseLost if the lease is gone"""
+    conn = render_jobs.connect(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE render_jobs
+            SET status = 'failed', stage = 'failed', error = ?, lease_expires_at = NULL,
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running' AND lease_token = ? AND lease_expires_at IS NOT NULL
+        ''', (error, job_id, token))
+        conn.commit()
+        if not cursor.rowcount:
+            raise LeaseLost(job_id)
+    finally:
+        conn.close()
+    print(f"Render job {job_id} failed on a render node: {error[:200]}")
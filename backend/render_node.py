@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Render node: renders a remote backend's jobs on this host.
+
+Run it on any host that has a checkout of this repo and its render venv:
+
+    RENDER_WORKER_TOKEN=... python backend/render_node.py --backend http://10.0.0.5:5001 --workers 2
+
+Each worker thread leases a job (render_leases.py), renders it with
+manim_render.render() on this host's render zygote and uploads the mp4
+under its sha256. It then asks the backend to publish the upload. While
+the job renders, a heartbeat thread renews the lease and reports progress.
+If a heartbeat or the publish says the lease is gone, the render is
+dropped, because another node has the job by then. A Manim error fails
+the job. Network and node errors leave the lease to run out, so the job is
+requeued.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+
+import manim_render
+import render_timings
+
+POLL_S = 2.0
+HTTP_TIMEOUT_S = 60
+MAX_BACKOFF_S = 30.0
+
+
+class LeaseLost(Exception):
+    """The backend requeued or finished the job; drop its render"""
+
+
+class BackendError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class BackendClient:
+    """The /api/render-workers/ protocol of one backend"""
+
+    def __init__(self, url, token):
+        self.url = url.rstrip('/')
+        self.token = token
+
+    def _request(self, method, path, payload=None, data=None, headers=None):
+        headers = dict(headers or {}, Authorization=f'Bearer {self.token}')
+        if payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(f'{self.url}/api/render-workers{path}', data=data, method=method,
+                                         headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT_S) as response:
+                body = response.read()
+                return json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            if e.code == 409:
+                raise LeaseLost(message)
+            raise BackendError(e.code, message)
+
+    def lease(self, worker):
+        return self._request('POST', '/lease', {'worker': worker})
+
+    def heartbeat(self, job, progress, stage):
+        self._request('POST', f"/jobs/{job['id']}/heartbeat",
+                      {'lease_token': job['lease_token'], 'progress': progress, 'stage': stage})
+
+    def upload(self, path, digest):
+        with open(path, 'rb') as f:
+            self._request('PUT', f'/uploads/{digest}', data=f, headers={
+                'Content-Type': 'video/mp4', 'Content-Length': str(os.path.getsize(path))})
+
+    def complete(self, job, digest, timings):
+        return self._request('POST', f"/jobs/{job['id']}/complete",
+                             {'lease_token': job['lease_token'], 'sha256': digest, 'timings': timings})['video_path']
+
+    def fail(self, job, error):
+        self._request('POST', f"/jobs/{job['id']}/fail", {'lease_token': job['lease_token'], 'error': error})
+
+
+class Heartbeat(threading.Thread):
+    """Renews a job's lease until stopped, reporting the latest progress"""
+
+    def __init__(self, client, job):
+        super().__init__(name=f"heartbeat-{job['id']}", daemon=True)
+        self.client = client
+        self.job = job
+        self.progress = (0.0, 'rendering')
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.job['heartbeat_seconds']):
+            try:
+                self.client.heartbeat(self.job, *self.progress)
+            except LeaseLost:
+                self.lost.set()
+                return
+            except (BackendError, OSError) as e:
+                # Keep trying; the lease covers a few missed beats
+                print(f"Heartbeat for render job {self.job['id']} failed: {e}")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def run_job(client, job, worker):
+    """Render one leased job and hand the result to the backend"""
+    heartbeat = Heartbeat(client, job)
+    heartbeat.start()
+    timer = render_timings.Timer()
+    os.makedirs(manim_render.RENDER_WORK_DIR, exist_ok=True)
+    outbox = tempfile.mkdtemp(prefix=f"node_job{job['id']}_", dir=manim_render.RENDER_WORK_DIR)
+    output = os.path.join(outbox, 'output.mp4')
+
+    def on_progress(progress, stage):
+        heartbeat.progress = (round(progress, 3), stage)
+
+    try:
+        try:
+            manim_render.render(job['manim_code'], job['file_name'], job['id'], on_progress,
+                                partial_identity=job['scene_identity'], quality=job['render_quality'],
+                                timer=timer, output_path=output)
+        except manim_render.RenderError as e:
+            if not heartbeat.lost.is_set():
+                client.fail(job, str(e))
+            print(f"Render job {job['id']} failed: {e}")
+            return
+        if heartbeat.lost.is_set():
+            raise LeaseLost(job['id'])
+
+        heartbeat.progress = (0.97, 'uploading')
+        digest = file_sha256(output)
+        for entry in timer.entries:
+            entry['node'] = worker
+        client.upload(output, digest)
+        try:
+            video_path = client.complete(job, digest, timer.entries)
+        except BackendError as e:
+            if e.status != 404:
+                raise
+            # Another job published identical bytes and consumed the upload
+            client.upload(output, digest)
+            video_path = client.complete(job, digest, timer.entries)
+        print(f"Published render job {job['id']} as {video_path}")
+    except LeaseLost:
+        print(f"Lost the lease on render job {job['id']}; dropping its render")
+    except Exception:
+        print(f"Render job {job['id']} stopped on this node; its lease will run out:\n{traceback.format_exc()}")
+    finally:
+        heartbeat.stop()
+        shutil.rmtree(outbox, ignore_errors=True)
+
+
+def worker_loop(client, worker, stopped):
+    backoff = POLL_S
+    while not stopped.is_set():
+        try:
+            job = client.lease(worker)
+            backoff = POLL_S
+        except (BackendError, OSError) as e:
+            print(f"{worker} could not lease a job: {e}")
+            stopped.wait(backoff)
+            backoff = min(MAX_BACKOFF_S, backoff * 2)
+            continue
+        if not job:
+            stopped.wait(POLL_S)
+            continue
+        print(f"Leased render job {job['id']} as {worker}")
+        run_job(client, job, worker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', default=os.getenv('RENDER_BACKEND_URL', 'http://localhost:5001'))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('RENDER_WORKERS', '2')))
+    parser.add_argument('--name', default=f'{socket.gethostname()}-{os.getpid()}', help='node name in leases')
+    args = parser.parse_args()
+
+    token = os.getenv('RENDER_WORKER_TOKEN')
+    if not token:
+        print("Set RENDER_WORKER_TOKEN to the backend's render worker token")
+        return 2
+    client = BackendClient(args.backend, token)
+    if manim_render.RENDER_RUNNER == 'zygote':
+        manim_render._zygote.ensure_started()
+
+    stopped = threading.Event()
+    threads = []
+    for i in range(max(1, args.workers)):
+        thread = threading.Thread(target=worker_loop, args=(client, f'{args.name}/{i}', stopped),
+                                  name=f'render-node-{i}', daemon=True)
+        thread.start()
+        threads.append(thread)
+    print(f"Render node {args.name} pulling jobs from {args.backend} with {len(threads)} worker(s)")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stopped.set()
+    finally:
+        manim_render._zygote.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
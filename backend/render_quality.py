@@ -0,0 +1,51 @@
+"""Render quality profiles and the degradation ladder.
+
+A job asks for a quality (one of PROFILES, or a manim -q flag such as 'l').
+Under load the queue may render it with a cheaper profile further down
+LADDER instead: lower resolution, then lower frame rate, then wait() holds
+capped at max_wait seconds. The job keeps its requested quality and is
+re-rendered at that quality in the background once the workers are idle
+(see render_jobs.py).
+"""
+import os
+
+PROFILES = {
+    '2160p60': {'pixel_width': 3840, 'pixel_height': 2160, 'frame_rate': 60, 'max_wait': None},
+    '1440p60': {'pixel_width': 2560, 'pixel_height': 1440, 'frame_rate': 60, 'max_wait': None},
+    '1080p60': {'pixel_width': 1920, 'pixel_height': 1080, 'frame_rate': 60, 'max_wait': None},
+    '720p30': {'pixel_width': 1280, 'pixel_height': 720, 'frame_rate': 30, 'max_wait': None},
+    '480p15': {'pixel_width': 854, 'pixel_height': 480, 'frame_rate': 15, 'max_wait': None},
+    '480p10': {'pixel_width': 854, 'pixel_height': 480, 'frame_rate': 10, 'max_wait': None},
+    '360p10': {'pixel_width': 640, 'pixel_height': 360, 'frame_rate': 10, 'max_wait': None},
+    '360p10-short': {'pixel_width': 640, 'pixel_height': 360, 'frame_rate': 10, 'max_wait': 1.0},
+}
+# Best to cheapest
+LADDER = list(PROFILES)
+# manim -q flags
+FLAGS = {'k': '2160p60', 'p': '1440p60', 'h': '1080p60', 'm': '720p30', 'l': '480p15'}
+
+DEFAULT_QUALITY = os.getenv('RENDER_DEFAULT_QUALITY', '480p15')
+
+
+def normalize(quality):
+    """Profile name for a profile name or manim -q flag; ValueError if unknown"""
+    quality = quality or DEFAULT_QUALITY
+    quality = FLAGS.get(quality, quality)
+    if quality not in PROFILES:
+        raise ValueError(f"Unknown render quality {quality!r}; use one of {', '.join(LADDER)}")
+    return quality
+
+
+def profile(quality):
+    return PROFILES[normalize(quality)]
+
+
+def cheaper(quality):
+    """Profiles below quality on the ladder, best first"""
+    return LADDER[LADDER.index(normalize(quality)) + 1:]
+
+
+def output_dir_name(quality):
+    """Directory manim writes a scene's video to for this profile, e.g. 480p15"""
+    settings = profile(quality)
+    return f"{settings['pixel_height']}p{settings['frame_rate']}"
@@ -0,0 +1,126 @@
+"""Repair loop for renders that fail inside Manim.
+
+Generated scenes often pass validation and still fail at render time: a
+wrong keyword argument, a method that does not exist, a LaTeX error. Without
+repair the job fails and the client has to write the whole scene again and
+queue it from scratch. Instead the render worker asks the LLM for a minimal
+fix and renders again right away, in the same worker and with the same
+scene identity, so the LaTeX and partial movie caches of every animation
+that already rendered are reused.
+
+Each attempt sends the scene and the tail of its traceback (REPAIR_PROMPT).
+The reply must be the whole corrected file. It is validated
+(manim_validator.py) before it is rendered; a reply that fails validation
+is sent back with the validator's errors instead. At most
+RENDER_REPAIR_ATTEMPTS LLM calls are made per job (0 turns repair off).
+Every attempt is recorded in the job's repairs column: the error it
+answered, a unified diff of what changed and its outcome.
+"""
+import difflib
+import os
+import time
+
+import manim_validator
+from llm import get_llm_provider, rate_limited_generate, strip_code_fences
+
+RENDER_REPAIR_ATTEMPTS = int(os.getenv('RENDER_REPAIR_ATTEMPTS', '2'))
+REPAIR_ERROR_CHARS = 3000
+
+REPAIR_PROMPT = """
+This Manim Community scene failed. Fix it with the smallest change that makes it run:
+keep the scene class name, the animations and the text as they are, and only change what the error points at.
+
+Error:
+{error}
+
+Scene:
+```python
+{code}
+```
+
+Reply with the complete corrected Python file and nothing else.
+"""
+
+
+def repairable(error):
+    """True for failures inside the scene itself, not timeouts or a broken render setup"""
+    return str(error).startswith('Manim failed')
+
+
+def traceback_tail(error):
+    """The last traceback in a render error, trimmed to REPAIR_ERROR_CHARS"""
+    text = str(error)
+    start = text.rfind('Traceback')
+    if start >= 0:
+        text = text[start:]
+    return text[-REPAIR_ERROR_CHARS:]
+
+
+def available():
+    if RENDER_REPAIR_ATTEMPTS <= 0:
+        return False
+    try:
+        return get_llm_provider().is_available()
+    except ValueError:
+        return False
+
+
+def propose(manim_code, error):
+    """Ask the LLM for a fixed scene; returns (code, validation result)"""
+    reply = rate_limited_generate(REPAIR_PROMPT.format(error=error, code=manim_code))
+    code = strip_code_fences(reply).strip() + '\n'
+    return code, manim_validator.validate(code)
+
+
+def diff(before, after):
+    return ''.join(difflib.unified_diff(before.splitlines(True), after.splitlines(True), 'scene.py', 'scene.py'))
+
+
+def render_with_repairs(render, manim_code, error, on_attempt, timer):
+    """Retry render(code) with LLM fixes of error; returns (video path, repaired code).
+
+    render is called with each validated candidate and raises like
+    manim_render.render. on_attempt is called with the list of attempts after
+    each change to it, and timer (render_timings.Timer) gets a 'repair' entry
+    per LLM call. Raises the last render error once the attempts are used up.
+    """
+    attempts = []
+    failure = error
+    answered = traceback_tail(error)
+    for number in range(1, RENDER_REPAIR_ATTEMPTS + 1):
+        started = time.perf_counter()
+        attempt = {'attempt': number, 'error': answered}
+        attempts.append(attempt)
+        try:
+            with timer.stage('repair', attempt=number):
+                candidate, validation = propose(manim_code, answered)
+        except Exception as e:
+            attempt.update(outcome='llm_error', detail=str(e), seconds=round(time.perf_counter() - started, 3))
+            on_attempt(attempts)
+            raise failure
+        attempt['patch'] = diff(manim_code, candidate)
+        if candidate.strip() == manim_code.strip():
+            attempt.update(outcome='unchanged', seconds=round(time.perf_counter() - started, 3))
+            on_attempt(attempts)
+            raise failure
+        if not validation['ok']:
+            # Next attempt fixes the candidate's validation errors instead
+            manim_code, answered = candidate, manim_validator.format_errors(validation)
+            attempt.update(outcome='invalid', seconds=round(time.perf_counter() - started, 3))
+            on_attempt(attempts)
+            continue
+        attempt['outcome'] = 'rendering'
+        on_attempt(attempts)
+        try:
+            video_path = render(candidate)
+        except Exception as e:
+            attempt.update(outcome='failed', seconds=round(time.perf_counter() - started, 3))
+            on_attempt(attempts)
+            if not repairable(e):
+                raise
+            manim_code, failure, answered = candidate, e, traceback_tail(e)
+            continue
+        attempt.update(outcome='rendered', seconds=round(time.perf_counter() - started, 3))
+        on_attempt(attempts)
+        return video_path, candidate
+    raise failure
@@ -0,0 +1,252 @@
+"""Render one Manim scene through manim's Python API.
+
+This runs inside the render venv, in a child forked from the render zygote
+(render_zygote.py), never in the Flask process. manim is already imported by
+the time run_job is called, so a job only pays for executing the user script
+and drawing frames. LaTeX and text SVGs come from the shared cache in
+tex_cache.py, filled in one batch per script by tex_batch.py.
+
+Every job records where its time goes (render_timings.py) by wrapping the
+renderer's play() and the file writer's encode, flush and combine steps, plus
+the child's own CPU time and peak RSS (stage 'process'). The timings are
+dumped to spec['timings_path'] even when the job fails.
+"""
+import importlib.util
+import inspect
+import os
+import resource
+import sys
+import time
+
+import live_stream
+import render_quality
+import render_timings
+import tex_batch
+import tex_cache
+import video_probe
+
+
+def load_scene_module(script_path):
+    """Execute a scene script as a fresh module, like ``manim <script>`` does"""
+    module_name = os.path.splitext(os.path.basename(script_path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    sys.path.insert(0, os.path.dirname(script_path))
+    spec.loader.exec_module(module)
+    return module
+
+
+def find_scene_class(module, scene_name):
+    """Return the Scene subclass named scene_name, or the only one defined"""
+    from manim import Scene
+
+    scene_classes = [
+        obj for _, obj in inspect.getmembers(module, inspect.isclass)
+        if issubclass(obj, Scene) and obj is not Scene and obj.__module__ == module.__name__
+    ]
+    for scene_class in scene_classes:
+        if scene_class.__name__ == scene_name:
+            return scene_class
+    if len(scene_classes) == 1:
+        return scene_classes[0]
+    raise LookupError(f"Scene {scene_name} not found in script")
+
+
+def job_config(spec):
+    """Per-job manim config, equivalent to the CLI flags the worker used to pass"""
+    quality = render_quality.profile(spec['quality'])
+    overrides = {
+        'media_dir': spec['media_dir'],
+        'tex_dir': tex_cache.tex_dir(),
+        'text_dir': tex_cache.text_dir(),
+        'input_file': spec['script_path'],
+        'scene_names': [spec['scene_name']],
+        'pixel_width': quality['pixel_width'],
+        'pixel_height': quality['pixel_height'],
+        'frame_rate': quality['frame_rate'],
+        'write_to_movie': True,
+        'progress_bar': 'none',
+        'preview': False,
+    }
+    if spec.get('partial_movie_dir'):
+        # Persistent per-scene partial movies: unchanged play() calls are reused
+        overrides['partial_movie_dir'] = spec['partial_movie_dir']
+        overrides['max_files_cached'] = spec['max_files_cached']
+    return overrides
+
+
+def combine_segments(inputs, output, workspace):
+    """Concatenate partial movies with stream copy, exactly as manim combines a scene"""
+    from pathlib import Path
+
+    from manim.scene.scene_file_writer import SceneFileWriter
+
+    writer = SceneFileWriter.__new__(SceneFileWriter)
+    writer.partial_movie_directory = Path(workspace)
+    writer.combine_files(inputs, Path(output))
+    return output
+
+
+def _label(scene):
+    """Animation types of the play() that just finished, e.g. 'Write, FadeIn'"""
+    return ', '.join(type(animation).__name__ for animation in scene.animations or [])[:200] or None
+
+
+def _timed(fn, totals, key):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            totals[key] += time.perf_counter() - start
+    return wrapper
+
+
+def run_job(spec, on_animation=None):
+    """Run one render child job and return its output.
+
+    spec['mode'] is one of:
+
+    - 'render' (default): render the scene, return the mp4 path; with
+      spec['live_dir'], also publish every finished animation to a
+      progressive HLS playlist there (live_stream.py)
+    - 'plan': replay the scene without drawing a frame, return the scene
+      time after each animation and the animation index each section starts at
+    - 'range': render animations spec['from_animation']..spec['upto_animation']
+      (replaying the ones before them to get the same state) and return their
+      partial movie files in order, without combining them
+    - 'combine': concatenate spec['inputs'] into spec['output']
+    - 'media': extract the poster, sprite and metadata of spec['video'] into
+      spec['output_dir'] (video_probe.py) and return the metadata
+
+    on_animation, if given, is called with the number of animations played
+    so far (including replayed ones) after every play()/wait().
+    """
+    timer = render_timings.Timer()
+    start = time.perf_counter()
+    try:
+        return _run(spec, on_animation, timer)
+    finally:
+        # CPU (including LaTeX subprocesses) and peak RSS of this child; a
+        # forked child's rusage never reaches the backend process
+        usage, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        timer.add('process', time.perf_counter() - start,
+                  cpu_seconds=round(usage.ru_utime + usage.ru_stime + children.ru_utime + children.ru_stime, 4),
+                  peak_rss_bytes=usage.ru_maxrss * 1024)
+        if spec.get('timings_path'):
+            timer.dump(spec['timings_path'])
+
+
+def _run(spec, on_animation, timer):
+    from manim import tempconfig
+
+    mode = spec.get('mode', 'render')
+    if mode == 'combine':
+        with timer.stage('combine'):
+            return combine_segments(spec['inputs'], spec['output'], spec['workspace'])
+    if mode == 'media':
+        return video_probe.extract(spec['video'], spec['output_dir'])
+
+    start = time.perf_counter()
+    os.chdir(spec['workspace'])
+    tex_cache.install(os.path.join(spec['workspace'], 'tex_scratch'))
+    module = load_scene_module(spec['script_path'])
+    scene_class = find_scene_class(module, spec['scene_name'])
+    startup = time.perf_counter() - start
+
+    overrides = job_config(spec)
+    if mode == 'plan':
+        overrides['from_animation_number'] = 10 ** 9  # skip everything
+    elif mode == 'range':
+        overrides['from_animation_number'] = spec['from_animation']
+        overrides['upto_animation_number'] = spec['upto_animation']
+
+    with tempconfig(overrides):
+        start = time.perf_counter()
+        with open(spec['script_path']) as f:
+            batch_compiled = tex_batch.precompile(f.read(), os.path.join(spec['workspace'], 'tex_scratch'))
+        batch_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        scene = scene_class()
+        timer.add('startup', startup + time.perf_counter() - start)
+        renderer = scene.renderer
+        file_writer = renderer.file_writer
+        play = renderer.play
+        timeline = []
+        live = live_stream.LivePlaylist(spec['live_dir']) if mode == 'render' and spec.get('live_dir') else None
+
+        # Encoding runs on manim's writer thread; flushing it ends each animation
+        totals = {'encode': 0.0, 'frames': 0}
+        file_writer.encode_and_write_frame = _timed(file_writer.encode_and_write_frame, totals, 'encode')
+        file_writer.close_partial_movie_stream = _timed(file_writer.close_partial_movie_stream, totals, 'encode')
+        write_frame = file_writer.write_frame
+
+        def count_frames(frame, num_frames=1):
+            totals['frames'] += num_frames
+            return write_frame(frame, num_frames)
+
+        file_writer.write_frame = count_frames
+
+        def play_and_report(*args, **kwargs):
+            nonlocal live
+            start, encoded, written = time.perf_counter(), totals['encode'], totals['frames']
+            result = play(*args, **kwargs)
+            # Replayed animations (from/upto ranges, plans) have no hash and draw nothing
+            if renderer.animations_hashes and renderer.animations_hashes[-1] is not None:
+                frames = totals['frames'] - written
+                timer.add('animation' if frames else 'cached_animation', time.perf_counter() - start,
+                          animation=renderer.num_plays - 1, label=_label(scene), frames=frames,
+                          encode_seconds=round(totals['encode'] - encoded, 4), run_time=round(scene.duration, 3))
+            timeline.append(renderer.time)
+            if live and file_writer.partial_movie_files and file_writer.partial_movie_files[-1]:
+                try:
+                    live.add(file_writer.partial_movie_files[-1])
+                except Exception as e:
+                    # The final mp4 is unaffected; just stop streaming
+                    print(f"Progressive stream stopped: {e}")
+                    live = None
+            if on_animation:
+                on_animation(renderer.num_plays)
+            return result
+
+        renderer.play = play_and_report
+        max_wait = render_quality.profile(spec['quality'])['max_wait']
+        if max_wait is not None:
+            # Degraded profile: shorten long holds, they are only still frames
+            wait = scene.wait
+            scene.wait = lambda duration=1.0, *args, **kwargs: wait(min(duration, max_wait), *args, **kwargs)
+        if mode == 'range':
+            # The backend combines all ranges at once; other ranges may be
+            # writing to the same partial movie dir, so leave it untouched
+            file_writer.combine_to_movie = lambda: None
+            file_writer.clean_cache = lambda: None
+        else:
+            combine = file_writer.combine_to_movie
+
+            def timed_combine():
+                with timer.stage('combine'):
+                    return combine()
+
+            file_writer.combine_to_movie = timed_combine
+        try:
+            scene.render()
+        finally:
+            timer.add('encode', totals['encode'], frames=totals['frames'])
+            timer.add('latex', batch_seconds + tex_cache.stats['compile_seconds'], hits=tex_cache.stats['hits'],
+                      misses=batch_compiled + tex_cache.stats['misses'], batch_compiled=batch_compiled,
+                      batch_seconds=round(batch_seconds, 4))
+        if live:
+            live.finish()
+
+        if mode == 'plan':
+            section_starts = []
+            played = 0
+            for section in file_writer.sections:
+                if section.partial_movie_files:
+                    section_starts.append(played)
+                played += len(section.partial_movie_files)
+            return {'timeline': timeline, 'section_starts': section_starts}
+        if mode == 'range':
+            return [path for path in file_writer.partial_movie_files if path is not None]
+        return str(file_writer.movie_file_path)
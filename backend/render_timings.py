@@ -0,0 +1,148 @@
+"""Where render seconds go: per-stage and per-animation timings of render jobs.
+
+A Timer collects timing entries for one job. Each entry is a stage name,
+its seconds and optional fields. The render child (render_runner.py) records
+its own stages by wrapping manim's renderer and file writer, not by
+parsing its log output:
+
+- startup: loading the user script and constructing the scene
+- latex: batch pre-compile plus on-demand compiles, with cache hits/misses
+- animation: one entry per drawn play()/wait(), with its index, the
+  animation types, the frames written and the encode seconds
+- cached_animation: a play() served from the partial movie cache
+- encode: total seconds the writer thread spent encoding frames, plus the
+  time spent waiting for it to flush at the end of each animation
+- combine: concatenating the partial movies into the scene mp4
+- process: the child's whole run, with its cpu_seconds and peak_rss_bytes
+
+The child dumps them to timings.json in its workspace and manim_render.py
+merges them into the job's Timer. The worker adds queue (from the job's
+timestamps), render (the whole manim run), repair (each LLM fix of a failed
+render, render_repair.py), publish and thumbnails. The request handler adds
+validation. Everything is saved to the render_timings table when the job
+ends, whether it failed or not.
+
+histograms() aggregates the table into per-stage counts, percentiles and
+cumulative buckets for GET /api/render-stats/timings.
+"""
+import contextlib
+import json
+import os
+import time
+
+STAGES = ('queue', 'validation', 'startup', 'latex', 'animation', 'cached_animation', 'encode', 'combine',
+          'process', 'render', 'repair', 'publish', 'thumbnails')
+# Upper bounds (seconds) of the histogram buckets; the last bucket is +Inf
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120, 300)
+COLUMNS = ('stage', 'seconds', 'animation', 'label', 'frames', 'hits', 'misses')
+
+
+class Timer:
+    """Timing entries of one render job (or one render child)"""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, stage, seconds, **fields):
+        self.entries.append({'stage': stage, 'seconds': round(seconds, 4), **fields})
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, **fields)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.entries, f)
+
+    def load(self, path, **fields):
+        """Merge the entries a render child dumped, tagged with fields"""
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for entry in entries:
+            entry.update(fields)
+        self.entries.extend(entries)
+
+
+def save(conn, job_id, timer):
+    """Store a finished job's timings and its queue wait"""
+    rows = []
+    for entry in timer.entries:
+        detail = {key: value for key, value in entry.items() if key not in COLUMNS}
+        rows.append((job_id, *(entry.get(key) for key in COLUMNS), json.dumps(detail) if detail else None))
+    conn.executemany('''
+        INSERT INTO render_timings (job_id, stage, seconds, animation, label, frames, hits, misses, detail)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.execute('''
+        INSERT INTO render_timings (job_id, stage, seconds)
+        SELECT id, 'queue', ROUND(MAX(0, (julianday(started_at) - julianday(created_at)) * 86400), 3)
+        FROM render_jobs WHERE id = ? AND started_at IS NOT NULL
+    ''', (job_id,))
+    conn.commit()
+
+
+def record(conn, job_id, stage, seconds):
+    """Store one timing measured outside the worker (validation)"""
+    conn.execute('INSERT INTO render_timings (job_id, stage, seconds) VALUES (?, ?, ?)',
+                 (job_id, stage, round(seconds, 4)))
+    conn.commit()
+
+
+def for_job(conn, job_id):
+    """A job's timing entries in order, and seconds per stage"""
+    rows = conn.execute('''
+        SELECT stage, seconds, animation, label, frames, hits, misses, detail
+        FROM render_timings WHERE job_id = ? ORDER BY id
+    ''', (job_id,)).fetchall()
+    entries, totals = [], {}
+    for row in rows:
+        entry = {key: value for key, value in zip(COLUMNS, row) if value is not None}
+        if row[7]:
+            entry.update(json.loads(row[7]))
+        entries.append(entry)
+        totals[row[0]] = round(totals.get(row[0], 0) + row[1], 4)
+    return {'entries': entries, 'totals': totals}
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def histograms(conn, hours=24, stage=None):
+    """{stage: count, sum, mean, p50, p90, p99, max and cumulative buckets} over recent jobs"""
+    sql = "SELECT stage, seconds FROM render_timings WHERE created_at >= datetime('now', ?)"
+    params = [f'-{float(hours)} hours']
+    if stage:
+        sql += ' AND stage = ?'
+        params.append(stage)
+    samples = {}
+    for name, seconds in conn.execute(sql, params):
+        samples.setdefault(name, []).append(seconds)
+
+    result = {}
+    for name, values in samples.items():
+        values.sort()
+        buckets = [{'le': bound, 'count': sum(1 for value in values if value <= bound)} for bound in BUCKETS]
+        buckets.append({'le': '+Inf', 'count': len(values)})
+        result[name] = {
+            'count': len(values),
+            'sum': round(sum(values), 3),
+            'mean': round(sum(values) / len(values), 4),
+            'p50': _percentile(values, 0.5),
+            'p90': _percentile(values, 0.9),
+            'p99': _percentile(values, 0.99),
+            'max': values[-1],
+            'buckets': buckets,
+        }
+    return result
+
+
+def timings_path(workspace):
+    return os.path.join(workspace, 'timings.json')
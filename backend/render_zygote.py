@@ -0,0 +1,272 @@
+"""Pre-forked Manim render process ("zygote").
+
+Launching the manim CLI for every job pays for Python startup and for
+importing manim, numpy, scipy, cairo, pango and av before a single frame is
+drawn. The zygote is started once with the render venv's python, imports all
+of that up front, then forks a fresh child per job. The child inherits the
+warm interpreter, runs the scene through manim's Python API
+(render_runner.run_job) and exits, so user code never shares a process with
+another job or with the zygote itself.
+
+Protocol, one JSON object per line:
+
+    backend -> zygote (stdin):   {"token", "workspace", "script_path", "media_dir",
+                                  "scene_name", "quality", "log_path", "result_path"}
+    zygote -> backend (stdout):  {"event": "ready"}
+                                 {"event": "started", "token", "pid"}
+                                 {"event": "animation", "token", "count"}
+                                 {"event": "exit", "token", "returncode"}
+
+The child writes its output path or traceback to result_path and everything
+manim prints to log_path, so only short lines ever go through the pipe.
+
+The backend side of this is ZygoteClient, which the render workers share.
+"""
+import json
+import os
+import queue
+import select
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+VENV_PYTHON = os.path.join(BACKEND_DIR, 'venv312', 'bin', 'python')
+ZYGOTE_START_TIMEOUT_S = int(os.getenv('ZYGOTE_START_TIMEOUT_S', '120'))
+
+
+class ZygoteUnavailable(Exception):
+    """The zygote could not be started or died"""
+
+
+def _emit(fd, message):
+    # A single write of a short line to a pipe is atomic, so the zygote and
+    # its children can share the pipe without interleaving
+    os.write(fd, (json.dumps(message) + '\n').encode('utf-8'))
+
+
+def _run_child(spec, protocol_fd):
+    """Body of a forked child: render one job and _exit, never return"""
+    status = 1
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        log_fd = os.open(spec['log_path'], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(log_fd, 1)
+        os.dup2(log_fd, 2)
+
+        import render_runner
+
+        try:
+            output = render_runner.run_job(
+                spec, lambda count: _emit(protocol_fd, {'event': 'animation', 'token': spec['token'], 'count': count}))
+            result = {'ok': True, 'output': output}
+            status = 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            result = {'ok': False, 'error': traceback.format_exc()}
+        with open(spec['result_path'], 'w') as f:
+            json.dump(result, f)
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(status)
+
+
+def serve():
+    """Zygote main loop: import manim once, then fork a child per job request"""
+    # Everything printed from here on (manim's import banner, warnings) goes to
+    # stderr; the original stdout is kept for protocol messages only
+    protocol_fd = os.dup(1)
+    os.dup2(2, 1)
+
+    import manim  # noqa: F401  (the whole point: pay for this import once)
+    import render_runner  # noqa: F401
+
+    _emit(protocol_fd, {'event': 'ready', 'pid': os.getpid()})
+
+    stdin_fd = sys.stdin.fileno()
+    buffer = b''
+    children = {}
+    stdin_open = True
+
+    while stdin_open or children:
+        # Reap finished children
+        while children:
+            try:
+                pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            token = children.pop(pid, None)
+            if token is not None:
+                _emit(protocol_fd, {
+                    'event': 'exit', 'token': token,
+                    'returncode': os.waitstatus_to_exitcode(wait_status)
+                })
+
+        if not stdin_open:
+            time.sleep(0.1)
+            continue
+
+        ready, _, _ = select.select([stdin_fd], [], [], 0.1)
+        if not ready:
+            continue
+        chunk = os.read(stdin_fd, 65536)
+        if not chunk:
+            stdin_open = False
+            continue
+        buffer += chunk
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            pid = os.fork()
+            if pid == 0:
+                _run_child(spec, protocol_fd)
+            children[pid] = spec['token']
+            _emit(protocol_fd, {'event': 'started', 'token': spec['token'], 'pid': pid})
+
+
+class _PendingJob:
+    def __init__(self):
+        self.events = queue.Queue()
+        self.pid = None
+
+
+class ZygoteClient:
+    """Backend side of the zygote: starts it lazily and runs jobs on it.
+
+    Safe to share between render worker threads; each run() call waits only
+    for its own job's messages.
+    """
+
+    def __init__(self, python=VENV_PYTHON):
+        self.python = python
+        self._process = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _start(self):
+        if not os.path.exists(self.python):
+            raise ZygoteUnavailable(f"Python not found in virtual environment: {self.python}")
+        process = subprocess.Popen(
+            [self.python, '-u', os.path.abspath(__file__)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=BACKEND_DIR,
+        )
+        ready = queue.Queue()
+        threading.Thread(target=self._read_loop, args=(process, ready), name='render-zygote-reader',
+                         daemon=True).start()
+        try:
+            ready.get(timeout=ZYGOTE_START_TIMEOUT_S)
+        except queue.Empty:
+            process.kill()
+            raise ZygoteUnavailable(f"Render zygote did not start within {ZYGOTE_START_TIMEOUT_S} seconds")
+        if process.poll() is not None:
+            raise ZygoteUnavailable(f"Render zygote exited with code {process.returncode}")
+        print(f"Render zygote ready (pid {process.pid})")
+        return process
+
+    def _read_loop(self, process, ready):
+        for raw in process.stdout:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if message.get('event') == 'ready':
+                ready.put(True)
+                continue
+            with self._lock:
+                pending = self._pending.get(message.get('token'))
+            if pending:
+                pending.events.put(message)
+
+        # Zygote is gone: fail everything still waiting on it
+        process.wait()
+        ready.put(False)
+        with self._lock:
+            if self._process is process:
+                self._process = None
+            orphaned = list(self._pending.values())
+        for pending in orphaned:
+            pending.events.put({'event': 'exit', 'returncode': None})
+
+    def ensure_started(self):
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._process = None
+                self._process = self._start()
+            return self._process
+
+    def run(self, spec, timeout, on_animation=None):
+        """Render spec in a forked child and return its result dict.
+
+        Raises TimeoutError (after killing the child) when the job runs past
+        timeout, and ZygoteUnavailable if the zygote cannot be used.
+        """
+        process = self.ensure_started()
+        token = uuid.uuid4().hex
+        spec = dict(spec, token=token)
+        pending = _PendingJob()
+        with self._lock:
+            self._pending[token] = pending
+        try:
+            with self._write_lock:
+                try:
+                    process.stdin.write((json.dumps(spec) + '\n').encode('utf-8'))
+                    process.stdin.flush()
+                except (BrokenPipeError, ValueError):
+                    raise ZygoteUnavailable("Render zygote is not running")
+
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    message = pending.events.get(timeout=max(0.0, remaining))
+                except queue.Empty:
+                    if pending.pid:
+                        try:
+                            os.kill(pending.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                    raise TimeoutError(f"Render timed out after {timeout} seconds")
+                event = message.get('event')
+                if event == 'started':
+                    pending.pid = message['pid']
+                elif event == 'animation' and on_animation:
+                    on_animation(message['count'])
+                elif event == 'exit':
+                    break
+
+            if message.get('returncode') is None:
+                raise ZygoteUnavailable("Render zygote exited while running the job")
+            try:
+                with open(spec['result_path']) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {'ok': False, 'error': f"Render process exited with code {message.get('returncode')}"}
+        finally:
+            with self._lock:
+                self._pending.pop(token, None)
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+        if process and process.poll() is None:
+            process.stdin.close()
+            process.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BACKEND_DIR)
+    serve()
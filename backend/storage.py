@@ -0,0 +1,370 @@
+"""Storage lifecycle of render outputs: catalog, quotas and the sweeper.
+
+Every published mp4 has a row in the videos table (video_media.py). Files in
+the videos directory with no row, left over from before the catalog existed,
+are adopted by the sweeper. A video's ref_count is the number of notes that
+reference it: the note its render job was tied to, plus every note whose
+content mentions its /videos/ path. Notes whose submission joined the same
+render (video_owners) count too. refresh_refs() recomputes the counts
+from the notes table right before anything is deleted, so no note edit path
+needs to maintain them.
+
+Quotas:
+
+- STORAGE_USER_QUOTA_BYTES caps a user's published videos. A new render
+  that would start over the quota is refused with QuotaExceeded; nothing of
+  the user's is deleted to make room.
+- STORAGE_MAX_BYTES caps everything the render pipeline keeps on disk:
+  published videos, the render, partial movie and LaTeX caches, HLS ladders,
+  media assets, live streams and workspaces. The host also keeps
+  STORAGE_MIN_FREE_BYTES free.
+
+sweep() runs every STORAGE_SWEEP_INTERVAL_S on a daemon thread. It deletes:
+
+1. workspaces of renders that died (older than STORAGE_WORKSPACE_TTL_S),
+   including manim's old tmp* dirs under backend/media/videos
+2. staging files and directories abandoned by interrupted publishes, and
+   render node uploads that were never published (render_leases.py)
+3. unreferenced anonymous videos nobody has played for
+   STORAGE_UNREFERENCED_TTL_S
+4. HLS ladders and media assets of videos that no longer exist
+5. live stream directories (live_stream.sweep)
+
+Then, while the host is over STORAGE_MAX_BYTES or under
+STORAGE_MIN_FREE_BYTES, it evicts across tiers in least recently used order:
+unreferenced anonymous videos, cached renders and HLS ladders, then partial
+movies and LaTeX SVGs. Referenced videos, and videos an upgrade job is about
+to replace, are never deleted. Nothing younger than STORAGE_MIN_AGE_S is
+deleted either.
+
+Video notes created from the chat live only in the browser's local notes
+store, so ref_count misses them. Videos rendered for a signed-in user
+(user_email set, or any user in video_owners) are therefore never
+reclaimed: only anonymous renders are, and playing one refreshes its last
+use (touch()).
+"""
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+
+import live_stream
+import manim_render
+import partial_cache
+import render_cache
+import render_leases
+import tex_cache
+import video_delivery
+import video_media
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+STORAGE_MAX_BYTES = int(os.getenv('STORAGE_MAX_BYTES', str(20 * 1024 ** 3)))
+STORAGE_USER_QUOTA_BYTES = int(os.getenv('STORAGE_USER_QUOTA_BYTES', str(1024 ** 3)))
+STORAGE_MIN_FREE_BYTES = int(os.getenv('STORAGE_MIN_FREE_BYTES', str(2 * 1024 ** 3)))
+STORAGE_UNREFERENCED_TTL_S = int(os.getenv('STORAGE_UNREFERENCED_TTL_S', str(14 * 86400)))
+STORAGE_MIN_AGE_S = int(os.getenv('STORAGE_MIN_AGE_S', '3600'))
+STORAGE_WORKSPACE_TTL_S = int(os.getenv('STORAGE_WORKSPACE_TTL_S', '3600'))
+STORAGE_SWEEP_INTERVAL_S = int(os.getenv('STORAGE_SWEEP_INTERVAL_S', '900'))
+LEGACY_MEDIA_VIDEOS_DIR = os.path.join(BACKEND_DIR, 'media', 'videos')
+# Last use is written at most this often per video while it is being played
+TOUCH_INTERVAL_S = 3600
+
+_sweep_lock = threading.Lock()
+_touched = {}
+_sweeper = None
+
+# Unreferenced anonymous videos, least recently used first; evaluated for a row aliased as v.
+# A user's videos may be referenced from notes the backend cannot see, so they are never reclaimed.
+RECLAIMABLE_SQL = '''
+    SELECT v.video_path, COALESCE(v.size_bytes, 0), CAST(strftime('%s', COALESCE(v.last_used_at, v.updated_at)) AS INTEGER)
+    FROM videos v
+    WHERE v.ref_count = 0 AND v.user_email IS NULL
+      AND NOT EXISTS (SELECT 1 FROM video_owners o WHERE o.video_path = v.video_path AND o.user_email IS NOT NULL)
+      AND COALESCE(v.last_used_at, v.updated_at) < datetime('now', ?)
+      AND NOT EXISTS (
+          SELECT 1 FROM render_jobs u JOIN render_jobs o ON o.id = u.upgrade_of
+          WHERE u.status IN ('queued', 'running') AND o.video_path = v.video_path
+      )
+'''
+
+
+class QuotaExceeded(Exception):
+    """A user's published videos are over their quota"""
+
+    def __init__(self, used_bytes, quota_bytes):
+        super().__init__(f"Storage quota exceeded: {used_bytes} of {quota_bytes} bytes used")
+        self.used_bytes = used_bytes
+        self.quota_bytes = quota_bytes
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _age(path):
+    try:
+        return time.time() - os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def managed_dirs():
+    """Every directory whose contents count against STORAGE_MAX_BYTES"""
+    return [
+        manim_render.VIDEOS_DIR,
+        manim_render.RENDER_WORK_DIR,
+        LEGACY_MEDIA_VIDEOS_DIR,
+        render_cache.RENDER_CACHE_DIR,
+        render_leases.UPLOAD_DIR,
+        partial_cache.PARTIAL_CACHE_DIR,
+        tex_cache.TEX_CACHE_DIR,
+        video_delivery.HLS_CACHE_DIR,
+        video_media.MEDIA_ASSETS_DIR,
+        live_stream.RENDER_LIVE_DIR,
+    ]
+
+
+def total_bytes():
+    return sum(_dir_size(directory) for directory in managed_dirs() if os.path.isdir(directory))
+
+
+def touch(database, video_path):
+    """Record that a video was played; cheap enough to call on every request"""
+    now = time.time()
+    if now - _touched.get(video_path, 0) < TOUCH_INTERVAL_S:
+        return
+    _touched[video_path] = now
+    conn = sqlite3.connect(database, timeout=5)
+    try:
+        conn.execute('UPDATE videos SET last_used_at = CURRENT_TIMESTAMP WHERE video_path = ?', (video_path,))
+        conn.commit()
+    except sqlite3.Error as e:
+        # Never fail playback over bookkeeping
+        print(f"Could not record use of {video_path}: {e}")
+    finally:
+        conn.close()
+
+
+def adopt_untracked(conn):
+    """Add published mp4s that have no videos row, last used at their mtime"""
+    if not os.path.isdir(manim_render.VIDEOS_DIR):
+        return 0
+    known = {row[0] for row in conn.execute('SELECT video_path FROM videos')}
+    adopted = 0
+    for entry in os.scandir(manim_render.VIDEOS_DIR):
+        if not entry.is_file() or entry.name.startswith('.') or not entry.name.endswith('.mp4'):
+            continue
+        video_path = f'/videos/{entry.name}'
+        if video_path in known:
+            continue
+        stat = entry.stat()
+        conn.execute('''
+            INSERT OR IGNORE INTO videos (video_path, content_hash, size_bytes, last_used_at, updated_at)
+            VALUES (?, ?, ?, datetime(?, 'unixepoch'), datetime(?, 'unixepoch'))
+        ''', (video_path, video_delivery.content_hash(entry.path), stat.st_size, int(stat.st_mtime),
+              int(stat.st_mtime)))
+        adopted += 1
+    conn.commit()
+    if adopted:
+        print(f"Adopted {adopted} untracked video(s) into the catalog")
+    return adopted
+
+
+def refresh_refs(conn):
+    """Recount how many notes reference each video"""
+    conn.execute('''
+        UPDATE videos SET ref_count = (
+            SELECT COUNT(*) FROM notes n
+            WHERE n.id = videos.note_id OR instr(n.content, videos.video_path) > 0
+               OR n.id IN (SELECT o.note_id FROM video_owners o WHERE o.video_path = videos.video_path)
+        )
+    ''')
+    conn.commit()
+
+
+def reclaimable(conn, min_age_s):
+    """[(video_path, size, last used epoch)] of deletable videos, oldest use first"""
+    return conn.execute(RECLAIMABLE_SQL + ' ORDER BY 3 ASC', (f'-{int(min_age_s)} seconds',)).fetchall()
+
+
+def delete_video(conn, video_path):
+    """Delete a published video and its catalog row; its assets go in the next sweep"""
+    try:
+        os.remove(video_delivery.video_file(video_path[len('/videos/'):]))
+    except (video_delivery.VideoNotFound, OSError):
+        pass
+    conn.execute('DELETE FROM videos WHERE video_path = ?', (video_path,))
+    conn.execute('DELETE FROM video_owners WHERE video_path = ?', (video_path,))
+    conn.commit()
+    print(f"Deleted unreferenced video {video_path}")
+
+
+def usage(conn, user_email):
+    row = conn.execute('''
+        SELECT COALESCE(SUM(size_bytes), 0), COUNT(*) FROM videos
+        WHERE user_email = ? OR video_path IN (SELECT video_path FROM video_owners WHERE user_email = ?)
+    ''', (user_email, user_email)).fetchone()
+    return {'used_bytes': row[0], 'videos': row[1], 'quota_bytes': STORAGE_USER_QUOTA_BYTES}
+
+
+def enforce_user_quota(conn, user_email):
+    """Raise QuotaExceeded if the user is at their quota; never deletes their videos"""
+    if not user_email or STORAGE_USER_QUOTA_BYTES <= 0:
+        return
+    used = usage(conn, user_email)['used_bytes']
+    if used >= STORAGE_USER_QUOTA_BYTES:
+        raise QuotaExceeded(used, STORAGE_USER_QUOTA_BYTES)
+
+
+def _sweep_workspaces():
+    removed = 0
+    for directory, prefix in ((manim_render.RENDER_WORK_DIR, ''), (LEGACY_MEDIA_VIDEOS_DIR, 'tmp')):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_dir() and entry.name.startswith(prefix) and _age(entry.path) > STORAGE_WORKSPACE_TTL_S:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def _sweep_staging():
+    """Dot-prefixed leftovers of publishes that died between write and rename, and stale uploads"""
+    removed = 0
+    for directory in (manim_render.VIDEOS_DIR, render_cache.RENDER_CACHE_DIR, video_delivery.HLS_CACHE_DIR,
+                      video_media.MEDIA_ASSETS_DIR, render_leases.UPLOAD_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            stale = entry.name.startswith('.') or directory == render_leases.UPLOAD_DIR
+            if stale and _age(entry.path) > STORAGE_WORKSPACE_TTL_S:
+                _remove(entry.path)
+                removed += 1
+    return removed
+
+
+def _sweep_derived(conn):
+    """HLS ladders and media assets whose video is gone"""
+    hashes = {row[0] for row in conn.execute('SELECT content_hash FROM videos')}
+    removed = 0
+    for directory in (video_delivery.HLS_CACHE_DIR, video_media.MEDIA_ASSETS_DIR):
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if (entry.is_dir() and not entry.name.startswith('.') and entry.name not in hashes
+                    and _age(entry.path) > STORAGE_MIN_AGE_S):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def bytes_over():
+    """How many bytes must go for the host to be within its limits"""
+    os.makedirs(manim_render.VIDEOS_DIR, exist_ok=True)
+    free = shutil.disk_usage(manim_render.VIDEOS_DIR).free
+    return max(total_bytes() - STORAGE_MAX_BYTES, STORAGE_MIN_FREE_BYTES - free)
+
+
+def _evict_lru(conn, excess):
+    """Delete unreferenced videos, cached renders and HLS ladders, least recently used first"""
+    candidates = []
+    for video_path, size, used_at in reclaimable(conn, STORAGE_MIN_AGE_S):
+        candidates.append((used_at, size, 'video', video_path))
+    for key, size, used_at in conn.execute('''
+        SELECT cache_key, size_bytes, CAST(strftime('%s', last_used_at) AS INTEGER) FROM render_cache
+    '''):
+        candidates.append((used_at, size, 'render', key))
+    if os.path.isdir(video_delivery.HLS_CACHE_DIR):
+        for entry in os.scandir(video_delivery.HLS_CACHE_DIR):
+            if entry.is_dir() and not entry.name.startswith('.') and _age(entry.path) > STORAGE_MIN_AGE_S:
+                candidates.append((entry.stat().st_mtime, _dir_size(entry.path), 'hls', entry.path))
+
+    evicted = 0
+    for _, size, kind, target in sorted(candidates):
+        if excess <= 0:
+            break
+        if kind == 'video':
+            delete_video(conn, target)
+        elif kind == 'render':
+            render_cache.remove(conn, target)
+        else:
+            shutil.rmtree(target, ignore_errors=True)
+        excess -= size
+        evicted += 1
+    return excess, evicted
+
+
+def sweep(database):
+    """One pass of orphan cleanup and, under disk pressure, LRU eviction"""
+    with _sweep_lock:
+        conn = sqlite3.connect(database, timeout=30)
+        try:
+            stats = {'workspaces': _sweep_workspaces(), 'staging': _sweep_staging()}
+            adopt_untracked(conn)
+            refresh_refs(conn)
+            stale = reclaimable(conn, STORAGE_UNREFERENCED_TTL_S)
+            for video_path, _, _ in stale:
+                delete_video(conn, video_path)
+            stats['videos'] = len(stale)
+            stats['derived'] = _sweep_derived(conn)
+            stats['live'] = live_stream.sweep()
+
+            excess = bytes_over()
+            if excess > 0:
+                print(f"Render storage is {excess} bytes over its limits; evicting")
+                excess, stats['evicted'] = _evict_lru(conn, excess)
+                if excess > 0:
+                    size = _dir_size(partial_cache.PARTIAL_CACHE_DIR)
+                    partial_cache.evict(max(0, size - excess))
+                    excess = bytes_over()
+                if excess > 0:
+                    size = _dir_size(tex_cache.TEX_CACHE_DIR)
+                    tex_cache.evict(max(0, size - excess))
+                    excess = bytes_over()
+                if excess > 0:
+                    print(f"Render storage is still {excess} bytes over its limits; only referenced data is left")
+            return stats
+        finally:
+            conn.close()
+
+
+def start_sweeper(database, interval=None):
+    """Run sweep() now and then every interval seconds on a daemon thread; 0 disables it"""
+    global _sweeper
+    if _sweeper is not None:
+        return _sweeper
+    interval = STORAGE_SWEEP_INTERVAL_S if interval is None else interval
+    if interval <= 0:
+        print("Storage sweeper disabled")
+        return None
+
+    def loop():
+        while True:
+            try:
+                sweep(database)
+            except Exception:
+                print(f"Storage sweep failed:\n{traceback.format_exc()}")
+            time.sleep(interval)
+
+    _sweeper = threading.Thread(target=loop, name='storage-sweeper', daemon=True)
+    _sweeper.start()
+    return _sweeper
@@ -0,0 +1,191 @@
+"""Compile all of a script's LaTeX in one latex run before the scene starts.
+
+Left alone, manim compiles every uncached Tex/MathTex when the scene creates
+it: one latex process and one dvisvgm process per expression, in sequence. A
+typical lesson has 20-40 of them.
+
+This pre-pass reads the script's AST and collects every Tex, MathTex and
+SingleStringMathTex call whose strings (and tex-affecting keyword arguments)
+are literals. For each call it works out the exact expressions manim will
+compile, including the per-substring pieces MathTex splits out. The
+expressions missing from the shared cache (tex_cache.py) are typeset as the
+pages of a single multi-page standalone document. One dvisvgm pass then
+splits the pages into per-hash SVGs in the cache, so the scene runs on cache
+hits.
+
+Anything this cannot see statically (f-strings, variables, custom
+templates) is still compiled by manim one at a time, as before. If the batch
+fails for any reason (for example a LaTeX error in one expression) it is
+skipped and every expression compiles individually, which also gives the
+usual per-expression error message.
+"""
+import ast
+import glob
+import inspect
+import os
+import re
+import subprocess
+from pathlib import Path
+
+import tex_cache
+
+TEX_CLASSES = ('MathTex', 'Tex', 'SingleStringMathTex')
+TEX_KWARGS = ('arg_separator', 'substrings_to_isolate', 'tex_to_color_map', 'tex_environment')
+TEX_BATCH_MIN_EXPRESSIONS = int(os.getenv('TEX_BATCH_MIN_EXPRESSIONS', '2'))
+
+STANDALONE_CLASS = r'\documentclass[preview]{standalone}'
+BATCH_CLASS = r'\documentclass[preview,multi=manimpage]{standalone}' + '\n' + r'\newenvironment{manimpage}{}{}'
+
+
+def _literal_kwarg(name, node):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        # Only the keys of tex_to_color_map matter for compilation; the
+        # values are usually color constants like BLUE
+        if name == 'tex_to_color_map' and isinstance(node, ast.Dict) and None not in node.keys:
+            return {ast.literal_eval(key): None for key in node.keys}
+        raise
+
+
+def collect_tex_calls(manim_code):
+    """Return (class_name, args, kwargs) for every Tex-like call with literal strings"""
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError:
+        return []
+    calls = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        if name not in TEX_CLASSES or not node.args:
+            continue
+        try:
+            args = [ast.literal_eval(arg) for arg in node.args]
+            if not all(isinstance(arg, str) for arg in args):
+                continue
+            kwargs = {}
+            for keyword in node.keywords:
+                if keyword.arg is None or keyword.arg == 'tex_template':
+                    raise ValueError('not statically known')
+                if keyword.arg in TEX_KWARGS:
+                    kwargs[keyword.arg] = _literal_kwarg(keyword.arg, keyword.value)
+        except (ValueError, TypeError, SyntaxError):
+            continue
+        calls.append((name, args, kwargs))
+    return calls
+
+
+def expressions_for_call(name, args, kwargs):
+    """The (expression, environment) pairs manim compiles for one call"""
+    from manim.mobject.text import tex_mobject
+
+    cls = getattr(tex_mobject, name)
+    defaults = inspect.signature(cls.__init__).parameters
+    obj = cls.__new__(cls)
+    environment = kwargs.get('tex_environment', defaults['tex_environment'].default)
+    if name == 'SingleStringMathTex':
+        return [(obj._get_modified_expression(args[0]), environment)]
+
+    # Mirrors MathTex.__init__: the joined string, then each isolated piece
+    obj.arg_separator = kwargs.get('arg_separator', defaults['arg_separator'].default)
+    obj.substrings_to_isolate = kwargs.get('substrings_to_isolate') or []
+    obj.tex_to_color_map = kwargs.get('tex_to_color_map') or {}
+    tex_strings = obj._break_up_tex_strings(args)
+    pieces = [obj.arg_separator.join(tex_strings), *tex_strings]
+    return [(obj._get_modified_expression(piece), environment) for piece in pieces]
+
+
+def _page_body(texcode):
+    return texcode.split(r'\begin{document}', 1)[1].rsplit(r'\end{document}', 1)[0].strip('\n')
+
+
+def compile_batch(expressions, scratch_dir):
+    """Typeset uncached (expression, environment) pairs as one document.
+
+    Returns the number of SVGs added to the shared cache.
+    """
+    from manim import config
+    from manim.utils.tex_file_writing import make_tex_compilation_command, tex_hash
+
+    template = config['tex_template']
+    if STANDALONE_CLASS not in template.body:
+        return 0
+
+    pending = {}
+    for expression, environment in expressions:
+        if environment is not None:
+            texcode = template.get_texcode_for_expression_in_env(expression, environment)
+        else:
+            texcode = template.get_texcode_for_expression(expression)
+        name = tex_hash(texcode)
+        if name not in pending and not os.path.exists(os.path.join(tex_cache.tex_dir(), f'{name}.svg')):
+            pending[name] = texcode
+    if len(pending) < TEX_BATCH_MIN_EXPRESSIONS:
+        return 0
+
+    # Same preamble as the single-expression documents, one page per expression
+    names = list(pending)
+    head = template.body.split(r'\begin{document}', 1)[0].replace(STANDALONE_CLASS, BATCH_CLASS)
+    pages = '\n'.join(f'\\begin{{manimpage}}\n{_page_body(pending[name])}\n\\end{{manimpage}}' for name in names)
+    document = f'{head}\\begin{{document}}\n{pages}\n\\end{{document}}\n'
+
+    batch_dir = os.path.join(scratch_dir, 'batch')
+    os.makedirs(batch_dir, exist_ok=True)
+    tex_file = os.path.join(batch_dir, 'batch.tex')
+    with open(tex_file, 'w', encoding='utf-8') as f:
+        f.write(document)
+
+    command = make_tex_compilation_command(
+        template.tex_compiler, template.output_format, Path(tex_file), Path(batch_dir))
+    if subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=batch_dir).returncode != 0:
+        print(f"Batch LaTeX compile of {len(names)} expressions failed; compiling them one at a time")
+        return 0
+
+    output_file = os.path.join(batch_dir, 'batch' + template.output_format)
+    subprocess.run([
+        'dvisvgm',
+        *(['--pdf'] if template.output_format == '.pdf' else []),
+        '--page=1-',
+        '--no-fonts',
+        '--verbosity=0',
+        f'--output={os.path.join(batch_dir, "page-%p.svg")}',
+        output_file,
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=batch_dir)
+
+    page_files = {}
+    for path in glob.glob(os.path.join(batch_dir, 'page-*.svg')):
+        match = re.search(r'page-0*(\d+)\.svg$', path)
+        if match:
+            page_files[int(match.group(1))] = path
+    if len(page_files) != len(names):
+        print(f"Batch LaTeX produced {len(page_files)} pages for {len(names)} expressions; "
+              f"compiling them one at a time")
+        return 0
+
+    for page, name in enumerate(names, start=1):
+        tex_path = os.path.join(batch_dir, f'{name}.tex')
+        with open(tex_path, 'w', encoding='utf-8') as f:
+            f.write(pending[name])
+        tex_cache.publish_file(tex_path, os.path.join(tex_cache.tex_dir(), f'{name}.tex'))
+        tex_cache.publish_file(page_files[page], os.path.join(tex_cache.tex_dir(), f'{name}.svg'))
+    return len(names)
+
+
+def precompile(manim_code, scratch_dir):
+    """Batch-compile every statically known expression in manim_code"""
+    expressions = []
+    for name, args, kwargs in collect_tex_calls(manim_code):
+        try:
+            expressions.extend(expressions_for_call(name, args, kwargs))
+        except Exception:
+            continue
+    if not expressions:
+        return 0
+    try:
+        return compile_batch(expressions, scratch_dir)
+    except Exception as e:
+        print(f"Batch LaTeX pre-pass skipped: {e}")
+        return 0
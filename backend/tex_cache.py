@@ -0,0 +1,251 @@
+"""Shared, persistent LaTeX and Pango text SVG cache for all render jobs.
+
+Manim caches compiled Tex/MathTex SVGs in media_dir/Tex and Pango Text SVGs
+in media_dir/texts, keyed by a hash of the source. Every render job has its
+own throwaway media_dir, so on its own that cache is lost after each job.
+All jobs instead point tex_dir and text_dir at TEX_CACHE_DIR, which lives
+outside the public web root and survives restarts.
+
+Inside a render child (see render_runner.py) install() wraps manim so a
+missing SVG is compiled in the job's private scratch directory and then
+renamed into the shared directory, so concurrent jobs never see a partial
+file. A cache hit bumps the file's mtime, and evict() deletes the least
+recently used entries once the cache is larger than TEX_CACHE_MAX_BYTES.
+
+Pre-warm the cache at deploy time with the render venv's python:
+
+    backend/venv312/bin/python backend/tex_cache.py prewarm
+    backend/venv312/bin/python backend/tex_cache.py import frontend/public/videos/Tex
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEX_CACHE_DIR = os.getenv('TEX_CACHE_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'tex'))
+TEX_CACHE_MAX_BYTES = int(os.getenv('TEX_CACHE_MAX_BYTES', str(256 * 1024 ** 2)))
+# Entries used this recently are never evicted, so a job that just got a hit
+# can still read its file
+TEX_CACHE_MIN_AGE_S = int(os.getenv('TEX_CACHE_MIN_AGE_S', '600'))
+TEX_CORPUS_FILE = os.path.join(BACKEND_DIR, 'tex_corpus.txt')
+
+_evict_lock = threading.Lock()
+# What this render child's scene asked of the cache (reported by render_runner)
+stats = {'hits': 0, 'misses': 0, 'compile_seconds': 0.0}
+
+
+def tex_dir():
+    return os.path.join(TEX_CACHE_DIR, 'Tex')
+
+
+def text_dir():
+    return os.path.join(TEX_CACHE_DIR, 'texts')
+
+
+def manim_cfg():
+    """manim.cfg contents pointing the manim CLI at the shared cache"""
+    return f"[CLI]\ntex_dir = {tex_dir()}\ntext_dir = {text_dir()}\n"
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def publish_file(source_path, cached_path):
+    """Atomically move a freshly compiled file into the shared cache"""
+    staging_path = f'{cached_path}.{os.getpid()}.partial'
+    shutil.move(source_path, staging_path)
+    os.replace(staging_path, cached_path)
+
+
+def install(scratch_dir):
+    """Route manim's Tex and Text SVG generation through the shared cache.
+
+    Called once in a render child before the scene runs. scratch_dir is a
+    private directory (in the job workspace) used while compiling.
+    """
+    from manim import config
+    from manim.mobject.text import tex_mobject, text_mobject
+    from manim.utils import tex_file_writing
+
+    os.makedirs(tex_dir(), exist_ok=True)
+    os.makedirs(text_dir(), exist_ok=True)
+    tex_scratch = os.path.join(scratch_dir, 'Tex')
+    text_scratch = os.path.join(scratch_dir, 'texts')
+    os.makedirs(tex_scratch, exist_ok=True)
+    os.makedirs(text_scratch, exist_ok=True)
+    config.tex_dir = tex_dir()
+    config.text_dir = text_dir()
+
+    compile_tex_svg = tex_file_writing.tex_to_svg_file
+
+    def cached_tex_to_svg_file(expression, environment=None, tex_template=None):
+        if tex_template is None:
+            tex_template = config['tex_template']
+        if environment is not None:
+            output = tex_template.get_texcode_for_expression_in_env(expression, environment)
+        else:
+            output = tex_template.get_texcode_for_expression(expression)
+        name = tex_file_writing.tex_hash(output)
+        cached_svg = os.path.join(tex_dir(), f'{name}.svg')
+        if os.path.exists(cached_svg):
+            _touch(cached_svg)
+            stats['hits'] += 1
+            return cached_svg
+
+        stats['misses'] += 1
+        start = time.perf_counter()
+        shared_dir = config.tex_dir
+        config.tex_dir = tex_scratch
+        try:
+            svg_file = compile_tex_svg(expression, environment, tex_template)
+        finally:
+            config.tex_dir = shared_dir
+            stats['compile_seconds'] += time.perf_counter() - start
+        publish_file(str(svg_file.with_suffix('.tex')), os.path.join(tex_dir(), f'{name}.tex'))
+        publish_file(str(svg_file), cached_svg)
+        return cached_svg
+
+    tex_file_writing.tex_to_svg_file = cached_tex_to_svg_file
+    tex_mobject.tex_to_svg_file = cached_tex_to_svg_file
+
+    def cached_text2svg(text2svg):
+        def wrapper(self, color):
+            cached_svg = os.path.join(text_dir(), f'{self._text2hash(color)}.svg')
+            if os.path.exists(cached_svg):
+                _touch(cached_svg)
+                stats['hits'] += 1
+                return cached_svg
+            stats['misses'] += 1
+            start = time.perf_counter()
+            shared_dir = config.text_dir
+            config.text_dir = text_scratch
+            try:
+                svg_file = text2svg(self, color)
+            finally:
+                config.text_dir = shared_dir
+                stats['compile_seconds'] += time.perf_counter() - start
+            publish_file(svg_file, cached_svg)
+            return cached_svg
+        return wrapper
+
+    text_mobject.Text._text2svg = cached_text2svg(text_mobject.Text._text2svg)
+    text_mobject.MarkupText._text2svg = cached_text2svg(text_mobject.MarkupText._text2svg)
+
+
+def evict(max_bytes=None):
+    """Delete least recently used SVGs (and their .tex) until the cache fits"""
+    max_bytes = TEX_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        total = 0
+        for directory in (tex_dir(), text_dir()):
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or entry.name.endswith('.partial'):
+                    continue
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.name.endswith('.svg'):
+                    entries.append((stat.st_mtime, entry.path))
+        if total <= max_bytes:
+            return 0
+
+        cutoff = time.time() - TEX_CACHE_MIN_AGE_S
+        evicted = 0
+        for mtime, svg_path in sorted(entries):
+            if total <= max_bytes or mtime > cutoff:
+                break
+            for path in (svg_path, svg_path[:-len('.svg')] + '.tex'):
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            evicted += 1
+        if evicted:
+            print(f"Evicted {evicted} cached LaTeX/text SVG(s)")
+        return evicted
+
+
+def import_dir(source_dir):
+    """Copy existing <hash>.tex/<hash>.svg pairs from an old media Tex dir"""
+    os.makedirs(tex_dir(), exist_ok=True)
+    imported = 0
+    for name in os.listdir(source_dir):
+        if not name.endswith('.svg'):
+            continue
+        stem = name[:-len('.svg')]
+        tex_path = os.path.join(source_dir, f'{stem}.tex')
+        if not os.path.exists(tex_path) or os.path.exists(os.path.join(tex_dir(), name)):
+            continue
+        for source in (tex_path, os.path.join(source_dir, name)):
+            fd, staging = tempfile.mkstemp(dir=tex_dir(), suffix='.partial')
+            os.close(fd)
+            shutil.copyfile(source, staging)
+            os.replace(staging, os.path.join(tex_dir(), os.path.basename(source)))
+        imported += 1
+    return imported
+
+
+def load_corpus(path=TEX_CORPUS_FILE):
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f if line.strip() and not line.startswith('#')]
+
+
+def prewarm(expressions):
+    """Compile expressions as MathTex into the shared cache; needs manim"""
+    from manim import MathTex
+
+    import tex_batch
+
+    scratch_dir = tempfile.mkdtemp(prefix='tex_prewarm_')
+    try:
+        install(scratch_dir)
+        # One latex run for everything; whatever fails there compiles below
+        tex_batch.precompile('\n'.join(f'MathTex({expression!r})' for expression in expressions), scratch_dir)
+        failed = 0
+        for expression in expressions:
+            try:
+                MathTex(expression)
+            except Exception as e:
+                failed += 1
+                print(f"Could not compile {expression!r}: {e}")
+        return len(expressions) - failed, failed
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the shared LaTeX/text SVG cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    prewarm_parser = commands.add_parser('prewarm', help='compile a corpus of common expressions')
+    prewarm_parser.add_argument('--corpus', default=TEX_CORPUS_FILE)
+    import_parser = commands.add_parser('import', help='copy .tex/.svg pairs from an old Tex dir')
+    import_parser.add_argument('source_dir')
+    commands.add_parser('evict', help='trim the cache to TEX_CACHE_MAX_BYTES')
+    args = parser.parse_args()
+
+    if args.command == 'prewarm':
+        started = time.perf_counter()
+        compiled, failed = prewarm(load_corpus(args.corpus))
+        print(f"Pre-warmed {compiled} expression(s) into {tex_dir()} in "
+              f"{time.perf_counter() - started:.1f}s ({failed} failed)")
+    elif args.command == 'import':
+        print(f"Imported {import_dir(args.source_dir)} cached expression(s) into {tex_dir()}")
+    else:
+        evict()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
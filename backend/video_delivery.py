@@ -0,0 +1,135 @@
+"""Serve finished renders from the backend instead of the Next.js dev server.
+
+GET /api/videos/<name> serves a published mp4 with HTTP Range support and
+a strong ETag (the sha256 of the file), handing the file to the WSGI
+server's file wrapper (sendfile under gunicorn) rather than reading it in
+Python. Names can be re-published (a quality upgrade swaps the file in
+place), so a plain URL must be revalidated. A URL carrying the current hash
+as ``?v=`` is immutable and cached for a year.
+
+GET /api/videos/<name>/master.m3u8 serves an adaptive HLS ladder of the
+same video. It is built on first request by video_ladder.py with the render
+venv's PyAV, and stored on disk under HLS_CACHE_DIR/<sha256>/. The variant
+playlists and segments are served from /api/hls/<sha256>/..., which never
+change and are cached as immutable.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import manim_render
+import render_zygote
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+HLS_CACHE_DIR = os.getenv('HLS_CACHE_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'hls'))
+LADDER_SCRIPT = os.path.join(BACKEND_DIR, 'video_ladder.py')
+LADDER_TIMEOUT_S = int(os.getenv('LADDER_TIMEOUT_S', '600'))
+MASTER_PLAYLIST = 'master.m3u8'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+_ladder_locks = {}
+
+
+class VideoNotFound(Exception):
+    pass
+
+
+def video_file(name):
+    """Path of a published video, or VideoNotFound; name is a bare file name"""
+    if os.path.basename(name) != name or name.startswith('.') or not name.endswith('.mp4'):
+        raise VideoNotFound(name)
+    path = os.path.join(manim_render.VIDEOS_DIR, name)
+    if not os.path.isfile(path):
+        raise VideoNotFound(name)
+    return path
+
+
+def content_hash(path):
+    """sha256 of the file, remembered until the file is replaced"""
+    stat = os.stat(path)
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _hashes_lock:
+        cached = _hashes.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _hashes_lock:
+        _hashes[path] = (signature, digest)
+    return digest
+
+
+def video_url(video_path):
+    """Versioned delivery URL for a job's /videos/<name> path, or None"""
+    if not video_path or not video_path.startswith('/videos/'):
+        return None
+    name = video_path[len('/videos/'):]
+    try:
+        return f'/api/videos/{name}?v={content_hash(video_file(name))[:16]}'
+    except (VideoNotFound, OSError):
+        return None
+
+
+def hls_url(video_path):
+    if not video_path or not video_path.startswith('/videos/'):
+        return None
+    return f"/api/videos/{video_path[len('/videos/'):]}/{MASTER_PLAYLIST}"
+
+
+def ladder_dir(digest):
+    return os.path.join(HLS_CACHE_DIR, digest)
+
+
+def ensure_ladder(path):
+    """Build the HLS ladder for a video if it is not cached; returns its sha256"""
+    digest = content_hash(path)
+    final_dir = ladder_dir(digest)
+    if os.path.exists(os.path.join(final_dir, MASTER_PLAYLIST)):
+        # The directory's mtime is its last use for storage.py's LRU eviction
+        os.utime(final_dir)
+        return digest
+
+    with _hashes_lock:
+        lock = _ladder_locks.setdefault(digest, threading.Lock())
+    with lock:
+        if os.path.exists(os.path.join(final_dir, MASTER_PLAYLIST)):
+            return digest
+        os.makedirs(HLS_CACHE_DIR, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=f'.{digest}.', dir=HLS_CACHE_DIR)
+        try:
+            print(f"Building HLS ladder for {os.path.basename(path)}")
+            result = subprocess.run(
+                [render_zygote.VENV_PYTHON, LADDER_SCRIPT, path, os.path.join(staging_dir, 'ladder')],
+                capture_output=True, text=True, timeout=LADDER_TIMEOUT_S,
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"HLS ladder failed: {result.stderr[-2000:]}")
+            # Publish the whole ladder at once; readers never see a partial one
+            try:
+                os.replace(os.path.join(staging_dir, 'ladder'), final_dir)
+            except OSError:
+                if not os.path.exists(os.path.join(final_dir, MASTER_PLAYLIST)):
+                    raise
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            with _hashes_lock:
+                _ladder_locks.pop(digest, None)
+    return digest
+
+
+def master_playlist(path):
+    """Master playlist text pointing at the immutable per-hash variant URLs"""
+    digest = ensure_ladder(path)
+    with open(os.path.join(ladder_dir(digest), MASTER_PLAYLIST)) as f:
+        lines = f.read().splitlines()
+    return digest, '\n'.join(
+        line if line.startswith('#') or not line else f'/api/hls/{digest}/{line}' for line in lines
+    ) + '\n'
@@ -0,0 +1,101 @@
+"""Transcode a finished render into a multi-bitrate HLS ladder.
+
+Runs with the render venv's python, which has PyAV:
+
+    backend/venv312/bin/python backend/video_ladder.py <video.mp4> <output dir>
+
+The source is decoded once, and every frame is scaled and encoded for each
+rung no taller than the source. Each rung is segmented by libavformat's HLS
+muxer into <height>p/index.m3u8 plus MPEG-TS segments of about
+HLS_SEGMENT_S seconds. master.m3u8 lists the rungs with their bandwidth and
+resolution. video_delivery.py runs this lazily, the first time a video's HLS
+stream is requested.
+"""
+import json
+import os
+import sys
+from fractions import Fraction
+
+# (height, video bitrate in bits/s), smallest first
+RUNGS = [(360, 500_000), (480, 900_000), (720, 2_000_000), (1080, 4_500_000)]
+HLS_SEGMENT_S = int(os.getenv('HLS_SEGMENT_S', '4'))
+MASTER_PLAYLIST = 'master.m3u8'
+
+
+def _even(value):
+    return max(2, int(round(value / 2)) * 2)
+
+
+def rungs_for(height):
+    """Ladder rungs for a source of this height (always at least one)"""
+    rungs = [rung for rung in RUNGS if rung[0] <= height]
+    return rungs or RUNGS[:1]
+
+
+def build(source_path, output_dir):
+    """Write the ladder into output_dir; returns the list of rungs written"""
+    import av
+
+    os.makedirs(output_dir, exist_ok=True)
+    with av.open(source_path) as source:
+        in_stream = source.streams.video[0]
+        width, height = in_stream.codec_context.width, in_stream.codec_context.height
+        rate = in_stream.average_rate or Fraction(15)
+        keyframe_interval = max(1, int(round(rate * HLS_SEGMENT_S)))
+
+        outputs = []
+        for rung_height, bitrate in rungs_for(height):
+            rung_width = _even(width * rung_height / height)
+            rung_dir = os.path.join(output_dir, f'{rung_height}p')
+            os.makedirs(rung_dir)
+            container = av.open(os.path.join(rung_dir, 'index.m3u8'), 'w', format='hls', options={
+                'hls_time': str(HLS_SEGMENT_S),
+                'hls_playlist_type': 'vod',
+                'hls_segment_filename': os.path.join(rung_dir, 'segment%04d.ts'),
+            })
+            stream = container.add_stream('libx264', rate=rate, options={
+                # Fixed GOP so every segment starts on a keyframe
+                'g': str(keyframe_interval),
+                'keyint_min': str(keyframe_interval),
+                'sc_threshold': '0',
+                'preset': 'veryfast',
+            })
+            stream.width, stream.height = rung_width, rung_height
+            stream.pix_fmt = 'yuv420p'
+            stream.bit_rate = bitrate
+            outputs.append({'height': rung_height, 'width': rung_width, 'bitrate': bitrate,
+                            'container': container, 'stream': stream})
+
+        for index, frame in enumerate(source.decode(in_stream)):
+            for output in outputs:
+                scaled = frame.reformat(width=output['width'], height=output['height'], format='yuv420p')
+                scaled.pts = index
+                scaled.time_base = 1 / rate
+                for packet in output['stream'].encode(scaled):
+                    output['container'].mux(packet)
+
+    for output in outputs:
+        for packet in output['stream'].encode():
+            output['container'].mux(packet)
+        output['container'].close()
+
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for output in outputs:
+        lines.append(f"#EXT-X-STREAM-INF:BANDWIDTH={output['bitrate']},"
+                     f"RESOLUTION={output['width']}x{output['height']}")
+        lines.append(f"{output['height']}p/index.m3u8")
+    with open(os.path.join(output_dir, MASTER_PLAYLIST), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return [{key: output[key] for key in ('height', 'width', 'bitrate')} for output in outputs]
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 2
+    print(json.dumps(build(sys.argv[1], sys.argv[2])))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
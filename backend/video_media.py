@@ -0,0 +1,161 @@
+"""Poster frames, sprite thumbnails and metadata of published videos.
+
+After a render job publishes its mp4, the render worker runs video_probe.py
+on it while the file is still in the page cache: on the render zygote when
+it is up (a forked child that already has PyAV loaded), otherwise with the
+render venv's python. Nothing is decoded on request.
+
+The output goes into MEDIA_ASSETS_DIR/<sha256 of the video>/, next to the
+HLS ladders, and is published with an atomic directory rename. Identical
+bytes (a render cache hit) reuse the existing assets. An upgraded video gets
+a new hash, so the poster and sprite URLs are immutable.
+
+The videos table has one row per published video (its /videos/ path). The
+row holds the metadata and links the video to its render job, note and
+user. Other notes and users whose identical submission joined the same
+render are in video_owners. It is also the catalog storage.py uses for
+quotas and cleanup.
+render_jobs.get_job and GET /api/notes return media_for() of it.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+
+import manim_render
+import render_zygote
+import video_delivery
+import video_probe
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MEDIA_ASSETS_DIR = os.getenv('MEDIA_ASSETS_DIR', os.path.join(BACKEND_DIR, 'render_cache', 'media'))
+PROBE_SCRIPT = os.path.join(BACKEND_DIR, 'video_probe.py')
+PROBE_TIMEOUT_S = int(os.getenv('PROBE_TIMEOUT_S', '120'))
+ASSET_NAMES = (video_probe.POSTER_NAME, video_probe.SPRITE_NAME)
+
+VIDEO_COLUMNS = '''
+    video_path, note_id, job_id, content_hash, duration, fps, width, height, bit_rate, size_bytes, sprite
+'''
+
+
+def assets_dir(digest):
+    return os.path.join(MEDIA_ASSETS_DIR, digest)
+
+
+def _load_metadata(digest):
+    try:
+        with open(os.path.join(assets_dir(digest), video_probe.METADATA_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _probe(path, output_dir, workspace):
+    if manim_render.RENDER_RUNNER == 'zygote':
+        try:
+            spec = manim_render.zygote_spec(workspace, None, None, None, None, mode='media',
+                                            video=path, output_dir=output_dir)
+            return manim_render.run_zygote_job(spec)
+        except render_zygote.ZygoteUnavailable as e:
+            print(f"Render zygote unavailable, probing with a venv process: {e}")
+    result = subprocess.run([render_zygote.VENV_PYTHON, PROBE_SCRIPT, path, output_dir],
+                            capture_output=True, text=True, timeout=PROBE_TIMEOUT_S)
+    if result.returncode != 0:
+        raise RuntimeError(f"Video probe failed: {result.stderr[-2000:]}")
+    return json.loads(result.stdout)
+
+
+def extract(path):
+    """Make sure the assets of a video file exist; returns (sha256, metadata)"""
+    digest = video_delivery.content_hash(path)
+    metadata = _load_metadata(digest)
+    if metadata:
+        return digest, metadata
+
+    os.makedirs(MEDIA_ASSETS_DIR, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=f'.{digest}.', dir=MEDIA_ASSETS_DIR)
+    try:
+        output_dir = os.path.join(staging_dir, 'media')
+        metadata = _probe(path, output_dir, staging_dir)
+        try:
+            os.replace(output_dir, assets_dir(digest))
+        except OSError:
+            # Another worker published the same video first
+            if not _load_metadata(digest):
+                raise
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return digest, metadata
+
+
+def record(conn, video_path, job_id=None, note_id=None, user_email=None):
+    """Extract a published video's assets and upsert its videos row"""
+    name = video_path[len('/videos/'):]
+    digest, metadata = extract(video_delivery.video_file(name))
+    conn.execute('''
+        INSERT INTO videos (video_path, note_id, job_id, user_email, content_hash, duration, fps, width, height,
+                            bit_rate, size_bytes, sprite, last_used_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (video_path) DO UPDATE SET
+            note_id = COALESCE(excluded.note_id, videos.note_id), job_id = excluded.job_id,
+            user_email = COALESCE(excluded.user_email, videos.user_email),
+            content_hash = excluded.content_hash, duration = excluded.duration, fps = excluded.fps,
+            width = excluded.width, height = excluded.height, bit_rate = excluded.bit_rate,
+            size_bytes = excluded.size_bytes, sprite = excluded.sprite, updated_at = CURRENT_TIMESTAMP,
+            last_used_at = CURRENT_TIMESTAMP
+    ''', (video_path, note_id, job_id, user_email, digest, metadata['duration'], metadata['fps'],
+          metadata['width'], metadata['height'], metadata['bit_rate'], metadata['size_bytes'],
+          json.dumps(metadata['sprite'])))
+    conn.commit()
+    return digest
+
+
+def _row_to_media(row):
+    video_path, digest = row[0], row[3]
+    return {
+        'video_path': video_path,
+        'note_id': row[1],
+        'job_id': row[2],
+        'duration': row[4],
+        'fps': row[5],
+        'width': row[6],
+        'height': row[7],
+        'bit_rate': row[8],
+        'size_bytes': row[9],
+        'sprite': json.loads(row[10]) if row[10] else None,
+        # Videos adopted into the catalog by storage.py have not been probed
+        'poster_url': f'/api/media/{digest}/{video_probe.POSTER_NAME}' if row[10] else None,
+        'sprite_url': f'/api/media/{digest}/{video_probe.SPRITE_NAME}' if row[10] else None,
+        'video_url': video_delivery.video_url(video_path),
+        'hls_url': video_delivery.hls_url(video_path),
+    }
+
+
+def media_for(conn, video_path):
+    """Poster, sprite and metadata of a published video, or None"""
+    row = conn.execute(f'SELECT {VIDEO_COLUMNS} FROM videos WHERE video_path = ?', (video_path,)).fetchone()
+    return _row_to_media(row) if row else None
+
+
+def media_for_notes(conn, note_ids):
+    """{note id: [media, ...]} for the videos linked to these notes"""
+    note_ids = list(note_ids)
+    if not note_ids:
+        return {}
+    placeholders = ', '.join('?' * len(note_ids))
+    rows = conn.execute(f'''
+        SELECT {VIDEO_COLUMNS} FROM videos WHERE note_id IN ({placeholders}) ORDER BY id
+    ''', note_ids).fetchall()
+    media = {}
+    for row in rows:
+        media.setdefault(row[1], []).append(_row_to_media(row))
+    owned = conn.execute(f'''
+        SELECT note_id, video_path FROM video_owners
+        WHERE note_id IN ({placeholders}) AND video_path IS NOT NULL ORDER BY id
+    ''', note_ids).fetchall()
+    for note_id, video_path in owned:
+        shared = media_for(conn, video_path)
+        if shared:
+            media.setdefault(note_id, []).append(shared)
+    return media
@@ -0,0 +1,122 @@
+"""Extract a poster frame, sprite thumbnails and metadata from a finished render.
+
+Runs where PyAV and Pillow are available: in a render zygote child (see
+render_runner.py, mode 'media') or with the render venv's python:
+
+    backend/venv312/bin/python backend/video_probe.py <video.mp4> <output dir>
+
+The video is decoded once. SPRITE_COUNT frames, evenly spaced over the
+video, are scaled to THUMB_WIDTH and tiled SPRITE_COLUMNS per row into
+sprite.jpg for hover scrubbing. The poster is the sampled frame with the
+most on-screen content (highest luma spread). A Manim lesson usually starts
+and often ends on an empty background, so its first and last frames make
+poor posters. media.json holds the metadata and the sprite layout.
+"""
+import json
+import math
+import os
+import sys
+
+POSTER_NAME = 'poster.jpg'
+SPRITE_NAME = 'sprite.jpg'
+METADATA_NAME = 'media.json'
+SPRITE_COUNT = int(os.getenv('SPRITE_COUNT', '20'))
+SPRITE_COLUMNS = 5
+THUMB_WIDTH = 160
+POSTER_MAX_WIDTH = 1280
+JPEG_QUALITY = 82
+
+
+def _scaled(image, max_width):
+    if image.width <= max_width:
+        return image
+    return image.resize((max_width, max(2, round(image.height * max_width / image.width))))
+
+
+def extract(source_path, output_dir):
+    """Write poster, sprite and media.json into output_dir; returns the metadata"""
+    import av
+    from PIL import Image, ImageStat
+
+    os.makedirs(output_dir, exist_ok=True)
+    with av.open(source_path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = 'AUTO'
+        width, height = stream.codec_context.width, stream.codec_context.height
+        codec = stream.codec_context.name
+        fps = float(stream.average_rate) if stream.average_rate else None
+        if container.duration:
+            duration = container.duration / av.time_base
+        elif stream.duration and stream.time_base:
+            duration = float(stream.duration * stream.time_base)
+        else:
+            duration = (stream.frames / fps) if stream.frames and fps else 0.0
+        bit_rate = container.bit_rate
+
+        count = max(1, SPRITE_COUNT)
+        interval = duration / count if duration else 0.0
+        thumb_height = max(2, round(height * THUMB_WIDTH / width))
+        thumbs = []
+        poster, poster_score = None, -1.0
+        frames = 0
+        for frame in container.decode(stream):
+            frames += 1
+            if len(thumbs) >= count:
+                continue
+            seconds = frame.time if frame.time is not None else (frames - 1) / (fps or 1)
+            # Sample the middle of each interval; a zero duration samples the first frames
+            if seconds + 1e-6 < (len(thumbs) + 0.5) * interval:
+                continue
+            image = frame.to_image()
+            thumb = image.resize((THUMB_WIDTH, thumb_height))
+            score = ImageStat.Stat(thumb.convert('L')).stddev[0]
+            # Later frames win ties: a lesson builds up its content over time
+            if score >= poster_score:
+                poster, poster_score = _scaled(image, POSTER_MAX_WIDTH), score
+            thumbs.append(thumb)
+
+    if not thumbs:
+        raise ValueError(f"No video frames in {source_path}")
+
+    columns = min(SPRITE_COLUMNS, len(thumbs))
+    rows = math.ceil(len(thumbs) / columns)
+    sprite = Image.new('RGB', (columns * THUMB_WIDTH, rows * thumb_height))
+    for index, thumb in enumerate(thumbs):
+        sprite.paste(thumb, ((index % columns) * THUMB_WIDTH, (index // columns) * thumb_height))
+    sprite.save(os.path.join(output_dir, SPRITE_NAME), 'JPEG', quality=JPEG_QUALITY)
+    poster.save(os.path.join(output_dir, POSTER_NAME), 'JPEG', quality=JPEG_QUALITY)
+
+    size_bytes = os.path.getsize(source_path)
+    metadata = {
+        'duration': round(duration, 3),
+        'fps': round(fps, 3) if fps else None,
+        'width': width,
+        'height': height,
+        'frames': frames,
+        'bit_rate': bit_rate or (int(size_bytes * 8 / duration) if duration else None),
+        'size_bytes': size_bytes,
+        'codec': codec,
+        'sprite': {
+            'count': len(thumbs),
+            'columns': columns,
+            'rows': rows,
+            'interval': round(interval, 3),
+            'width': THUMB_WIDTH,
+            'height': thumb_height,
+        },
+    }
+    with open(os.path.join(output_dir, METADATA_NAME), 'w') as f:
+        json.dump(metadata, f)
+    return metadata
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        return 2
+    print(json.dumps(extract(sys.argv[1], sys.argv[2])))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"use client";
+
+import { useEffect, useRef } from 'react';
+
+// hls.js is only needed where the browser cannot play HLS itself (Safari can),
+// so it is bundled as a separate chunk and loaded on first use
+let hlsModule: Promise<any> | null = null;
+
+function loadHls(): Promise<any> {
+  if (!hlsModule) {
+    hlsModule = import('hls.js')
+      .then((module) => module.default)
+      .catch((error) => {
+        hlsModule = null;
+        throw error;
+      });
+  }
+  return hlsModule;
+}
+
+interface LiveVideoPlayerProps {
+  src: string;
+  className?: string;
+  autoPlay?: boolean;
+  fallbackSrc?: string; // plain video to play if the stream cannot be loaded
+  poster?: string;
+}
+
+// Plays an HLS stream: a render in progress, or a finished video's quality ladder
+export default function LiveVideoPlayer({ src, className, autoPlay = true, fallbackSrc, poster }: LiveVideoPlayerProps) {
+  const videoRef = useRef<HTMLVideoElement>(null);
+
+  useEffect(() => {
+    const video = videoRef.current;
+    if (!video) return;
+
+    const useFallback = () => {
+      if (fallbackSrc && video.src !== fallbackSrc) video.src = fallbackSrc;
+    };
+
+    if (video.canPlayType('application/vnd.apple.mpegurl')) {
+      video.src = src;
+      video.addEventListener('error', useFallback, { once: true });
+      return () => video.removeEventListener('error', useFallback);
+    }
+
+    let hls: any = null;
+    let cancelled = false;
+    loadHls()
+      .then((Hls) => {
+        if (cancelled) return;
+        if (!Hls?.isSupported()) {
+          useFallback();
+          return;
+        }
+        // Start from the first segment, not the live edge: it is a lesson
+        hls = new Hls({ startPosition: 0 });
+        hls.on(Hls.Events.ERROR, (_event: string, data: any) => {
+          if (data.fatal && fallbackSrc) {
+            hls.destroy();
+            hls = null;
+            useFallback();
+          }
+        });
+        hls.loadSource(src);
+        hls.attachMedia(video);
+      })
+      .catch((error) => {
+        console.error('HLS playback unavailable:', error);
+        useFallback();
+      });
+
+    return () => {
+      cancelled = true;
+      hls?.destroy();
+    };
+  }, [src, fallbackSrc]);
+
+  return (
+    <video
+      ref={videoRef}
+      controls
+      autoPlay={autoPlay}
+      muted={autoPlay}
+      playsInline
+      poster={poster}
+      className={className || 'w-full rounded-lg shadow mt-2'}
+    />
+  );
+}
@@ -4,6 +4,7 @@ import { useState, useEffect, useRef } from 'react';
 import { notesStore } from '@/lib/notesStore';
 import 'katex/dist/katex.min.css';
 import GraphRenderer from './GraphRenderer';
+import LiveVideoPlayer from './LiveVideoPlayer';
 import ReactDOM from 'react-dom/client';
 
 interface Note {
@@ -15,6 +16,7 @@ interface Note {
   updated_at: string;
   type?: 'note' | 'video';
   video_path?: string;
+  media?: { poster_url: string };
 }
 
 interface RichTextEditorProps {
@@ -1224,7 +1226,16 @@ export default function RichTextEditor({ note, onSave }: RichTextEditorProps) {
               
               {/* Try to detect if it's a real video first */}
               <div className="relative">
-                {/* First try to load as video */}
+                {/* Rendered lessons stream from the backend as adaptive HLS */}
+                {note.video_path.startsWith('/videos/') ? (
+                  <LiveVideoPlayer
+                    src={`http://localhost:5001/api${note.video_path}/master.m3u8`}
+                    fallbackSrc={`http://localhost:5001/api${note.video_path}`}
+                    poster={note.media ? `http://localhost:5001${note.media.poster_url}` : undefined}
+                    autoPlay={false}
+                    className="w-full max-w-3xl mx-auto rounded-lg shadow-lg"
+                  />
+                ) : (
                 <video
                   controls
                   className="w-full max-w-3xl mx-auto rounded-lg shadow-lg"
@@ -1240,6 +1251,7 @@ export default function RichTextEditor({ note, onSave }: RichTextEditorProps) {
                   <source src={note.video_path} type="video/mp4" />
                   Your browser does not support the video tag.
                 </video>
+                )}
                 
                 {/* Fallback iframe for HTML placeholders (hidden by default) */}
                 <iframe
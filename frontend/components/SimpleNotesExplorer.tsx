@@ -2,6 +2,7 @@
 
 import { useEffect, useMemo, useState } from 'react';
 import { notesStore, type Note } from '@/lib/notesStore';
+import VideoThumbnail from './VideoThumbnail';
 
 interface SimpleNotesExplorerProps {
   onSelectNote: (note: Note) => void;
@@ -215,7 +216,17 @@ export default function SimpleNotesExplorer({ onSelectNote, onSelectFolder, curr
               draggable
               onDragStart={(e) => onDragStartNote(e, n.id)}
             >
-              <div className="truncate" title={n.title}>📝 {n.title}</div>
+              {n.type === 'video' && n.media ? (
+                <div className="flex items-center gap-2 min-w-0">
+                  <VideoThumbnail media={n.media} />
+                  <div className="min-w-0">
+                    <div className="truncate" title={n.title}>🎥 {n.title}</div>
+                    <div className="text-xs text-gray-500">{n.media.height}p • {n.media.fps ?? '?'} fps</div>
+                  </div>
+                </div>
+              ) : (
+                <div className="truncate" title={n.title}>📝 {n.title}</div>
+              )}
               <button
                 className="text-xs text-red-500 hover:text-red-700"
                 onClick={(e) => { e.stopPropagation(); handleDeleteNote(n.id); }}
@@ -0,0 +1,49 @@
+"use client";
+
+import { useState } from 'react';
+import type { VideoMedia } from '@/lib/notesStore';
+
+const BACKEND_URL = 'http://localhost:5001';
+const THUMB_WIDTH = 96;
+
+function formatDuration(seconds: number) {
+  const s = Math.round(seconds);
+  return `${Math.floor(s / 60)}:${String(s % 60).padStart(2, '0')}`;
+}
+
+// Poster of a rendered lesson; hovering scrubs through its sprite thumbnails
+export default function VideoThumbnail({ media }: { media: VideoMedia }) {
+  const [frame, setFrame] = useState<number | null>(null);
+  const sprite = media.sprite;
+  const height = Math.round(THUMB_WIDTH * media.height / media.width);
+
+  function onMouseMove(e: React.MouseEvent<HTMLDivElement>) {
+    if (!sprite) return;
+    const rect = e.currentTarget.getBoundingClientRect();
+    const fraction = Math.min(0.999, Math.max(0, (e.clientX - rect.left) / rect.width));
+    setFrame(Math.floor(fraction * sprite.count));
+  }
+
+  const scale = sprite ? THUMB_WIDTH / sprite.width : 1;
+  const style: React.CSSProperties = sprite && frame !== null
+    ? {
+        backgroundImage: `url(${BACKEND_URL}${media.sprite_url})`,
+        backgroundSize: `${sprite.columns * THUMB_WIDTH}px ${sprite.rows * sprite.height * scale}px`,
+        backgroundPosition: `-${(frame % sprite.columns) * THUMB_WIDTH}px -${Math.floor(frame / sprite.columns) * sprite.height * scale}px`,
+      }
+    : { backgroundImage: `url(${BACKEND_URL}${media.poster_url})`, backgroundSize: 'cover' };
+
+  return (
+    <div
+      className="relative flex-shrink-0 rounded bg-black"
+      style={{ width: THUMB_WIDTH, height, ...style }}
+      onMouseMove={onMouseMove}
+      onMouseLeave={() => setFrame(null)}
+      title={`${media.width}×${media.height} • ${media.fps ?? '?'} fps • ${(media.size_bytes / 1e6).toFixed(1)} MB`}
+    >
+      <span className="absolute bottom-0.5 right-0.5 px-1 rounded bg-black/70 text-[10px] text-white">
+        {formatDuration(frame !== null && sprite ? (frame + 0.5) * sprite.interval : media.duration)}
+      </span>
+    </div>
+  );
+}
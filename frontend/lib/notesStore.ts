@@ -9,6 +9,19 @@ export interface Folder {
   created_at: string;
 }
 
+// Poster, sprite thumbnails and metadata the render worker extracts (backend video_media.py)
+export interface VideoMedia {
+  duration: number;
+  fps: number | null;
+  width: number;
+  height: number;
+  bit_rate: number | null;
+  size_bytes: number;
+  poster_url: string;
+  sprite_url: string;
+  sprite: { count: number; columns: number; rows: number; interval: number; width: number; height: number } | null;
+}
+
 export interface Note {
   id: number;
   title: string;
@@ -18,6 +31,8 @@ export interface Note {
   updated_at: string;
   type?: 'note' | 'video';
   video_path?: string;
+  media?: VideoMedia;
+  server_id?: number; // id of the backend copy the AI chat reads and edits
 }
 
 type Listener = () => void;
@@ -150,6 +165,9 @@ export const notesStore = {
   findNoteById(id: number): Note | undefined {
     return state.notes.find((n) => n.id === id);
   },
+  findNoteByServerId(serverId: number): Note | undefined {
+    return state.notes.find((n) => n.server_id === serverId);
+  },
   createNote(title: string, content = '', folder_id: number | null = null): Note {
     const n: Note = {
       id: nextId(state.notes),
@@ -163,7 +181,7 @@ export const notesStore = {
     emit();
     return n;
   },
-  createVideoNote(title: string, videoPath: string, folder_id: number | null): Note {
+  createVideoNote(title: string, videoPath: string, folder_id: number | null, media?: VideoMedia): Note {
     const n: Note = {
       id: nextId(state.notes),
       title,
@@ -171,6 +189,7 @@ export const notesStore = {
       folder_id,
       type: 'video',
       video_path: videoPath,
+      media,
       created_at: nowISO(),
       updated_at: nowISO(),
     };
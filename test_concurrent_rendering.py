@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Stress test: run many Manim renders at once and check every output.
+
+Half of the jobs share a topic on purpose, which used to make renders delete
+or overwrite each other's files. Run with the backend venv so PyAV is
+available for decoding the outputs:
+
+    backend/venv312/bin/python test_concurrent_rendering.py --jobs 8 --concurrency 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import manim_render  # noqa: E402
+
+SCENE_TEMPLATE = '''
+from manim import *
+
+class StressScene(Scene):
+    def construct(self):
+        label = Text("Render {index}", font_size=48)
+        self.play(Write(label), run_time=0.5)
+        square = Square().next_to(label, DOWN)
+        self.play(Create(square), run_time=0.5)
+        self.wait(0.5)
+'''
+
+
+def check_output(video_path):
+    """Return a list of problems with a published video"""
+    problems = []
+    disk_path = os.path.join(manim_render.VIDEOS_DIR, os.path.basename(video_path))
+    if not os.path.exists(disk_path):
+        return [f'{video_path} is missing']
+    if os.path.getsize(disk_path) == 0:
+        return [f'{video_path} is empty']
+    with open(disk_path, 'rb') as f:
+        if f.read(8)[4:8] != b'ftyp':
+            problems.append(f'{video_path} is not an mp4')
+    try:
+        import av
+    except ImportError:
+        return problems
+    try:
+        with av.open(disk_path) as container:
+            frames = sum(1 for _ in container.decode(video=0))
+        if frames == 0:
+            problems.append(f'{video_path} has no frames')
+    except Exception as e:
+        problems.append(f'{video_path} does not decode: {e}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--keep', action='store_true', help='keep the published videos')
+    args = parser.parse_args()
+
+    run_id = int(time.time())
+
+    def render_one(index):
+        # Even jobs all share one topic; odd jobs get their own
+        file_name = 'stress same topic' if index % 2 == 0 else f'stress topic {index}'
+        code = SCENE_TEMPLATE.format(index=index)
+        started = time.perf_counter()
+        try:
+            path = manim_render.render(code, file_name, f'{run_id}{index:03d}')
+            return index, path, None, time.perf_counter() - started
+        except Exception as e:
+            return index, None, str(e), time.perf_counter() - started
+
+    print(f"Rendering {args.jobs} scenes with concurrency {args.concurrency}...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(render_one, range(args.jobs)))
+    elapsed = time.perf_counter() - started
+
+    failures = []
+    paths = []
+    for index, path, error, seconds in results:
+        print(f"  job {index}: {'OK ' + path if path else 'FAILED'} ({seconds:.1f}s)")
+        if error:
+            failures.append(f'job {index} failed: {error[-500:]}')
+            continue
+        paths.append(path)
+        failures.extend(check_output(path))
+
+    if len(set(paths)) != len(paths):
+        failures.append('two jobs published to the same path')
+    leftovers = [d for d in os.listdir(manim_render.RENDER_WORK_DIR) if d.startswith(f'job{run_id}')] \
+        if os.path.isdir(manim_render.RENDER_WORK_DIR) else []
+    if leftovers:
+        failures.append(f'workspaces not cleaned up: {leftovers}')
+
+    if not args.keep:
+        for path in paths:
+            disk_path = os.path.join(manim_render.VIDEOS_DIR, os.path.basename(path))
+            if os.path.exists(disk_path):
+                os.remove(disk_path)
+
+    print(f"Finished in {elapsed:.1f}s")
+    if failures:
+        print("FAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"All {args.jobs} renders produced distinct, valid videos")
+
+
+if __name__ == '__main__':
+    main()
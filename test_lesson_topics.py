@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Unit test: lesson topic normalization (lessons.subject and lessons.topic_key).
+
+Requests that only differ in how they ask for a video must share one topic
+key, and so one cached script, scene and render. Subjects must keep the
+topic itself intact, including words that merely start like a request
+phrase. Run it with the backend venv (lessons imports the render pipeline):
+
+    backend/venv312/bin/python test_lesson_topics.py
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+import lessons  # noqa: E402
+
+SUBJECTS = [
+    ('make a video on the atom', 'the atom'),
+    ('create a video on the atom', 'the atom'),
+    ('Can you make me a short video about Photosynthesis?', 'Photosynthesis'),
+    ('explain entropy', 'entropy'),
+    ('Explain: entropy', 'entropy'),
+    ('Explaining variance', 'Explaining variance'),
+    ('teach me about black holes', 'black holes'),
+    ('Derivatives', 'Derivatives'),
+]
+
+SAME_KEY = [
+    ('make a video on the atom', 'create a video on the atom'),
+    ('Explain entropy.', 'please make an animated lesson about entropy'),
+    ('video on the Atom', 'the atom'),
+]
+
+KEYS = [
+    ('make a video on the atom', 'atom'),
+    ('Explaining variance', 'explaining variance'),
+    ('Explain: entropy', 'entropy'),
+]
+
+
+def main():
+    failures = []
+    for topic, expected in SUBJECTS:
+        got = lessons.subject(topic)
+        if got != expected:
+            failures.append(f"subject({topic!r}) = {got!r}, expected {expected!r}")
+    for first, second in SAME_KEY:
+        if lessons.topic_key(first) != lessons.topic_key(second):
+            failures.append(f"topic_key({first!r}) = {lessons.topic_key(first)!r} but "
+                            f"topic_key({second!r}) = {lessons.topic_key(second)!r}")
+    for topic, expected in KEYS:
+        got = lessons.topic_key(topic)
+        if got != expected:
+            failures.append(f"topic_key({topic!r}) = {got!r}, expected {expected!r}")
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        return 1
+    print(f"OK: {len(SUBJECTS)} subjects and {len(SAME_KEY) + len(KEYS)} topic keys")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
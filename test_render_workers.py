@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Multi-process test: remote render nodes, lease expiry and exactly-once publishing.
+
+Starts one backend (backend/app.py, no local render workers, short leases, a
+scratch database) and several render nodes (backend/render_node.py) on this
+machine, then:
+
+1. queues a handful of small renders
+2. freezes the first node (SIGSTOP) right after it leases a job, so its
+   lease runs out while it still holds the job
+3. kills a second node (SIGKILL) right after it leases a job
+4. lets two healthy nodes drain the queue, including both orphaned jobs
+   once their leases are requeued
+5. thaws the frozen node, which must be refused (lease lost) when it
+   heartbeats or tries to publish its render
+
+It then checks that every job completed, that each one was published by
+exactly one node, that the orphaned jobs were published by a healthy
+node, and that each job has exactly one file in the videos directory. Run it
+with the backend venv (Flask and the render zygote's Manim):
+
+    backend/venv312/bin/python test_render_workers.py --jobs 6 --lease 6
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+VIDEOS_DIR = os.path.join(ROOT_DIR, 'frontend', 'public', 'videos')
+TOKEN = 'render-workers-test'
+
+SCENE = '''from manim import *
+
+
+class WorkerTest{index}(Scene):
+    def construct(self):
+        square = Square(color=BLUE)
+        self.play(Create(square))
+        self.play(square.animate.rotate({index} * PI / 7))
+        self.wait({wait})
+'''
+
+
+class Process:
+    """A child process whose output lines are collected and echoed with a prefix"""
+
+    def __init__(self, name, args, env, cwd):
+        self.name = name
+        self.lines = []
+        self.changed = threading.Condition()
+        self.process = subprocess.Popen(args, env=env, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        text=True, start_new_session=True)
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            print(f"[{self.name}] {line.rstrip()}")
+            with self.changed:
+                self.lines.append(line)
+                self.changed.notify_all()
+
+    def wait_for(self, pattern, timeout):
+        """First match of pattern in the output, waiting up to timeout seconds"""
+        regex = re.compile(pattern)
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            while True:
+                for line in self.lines:
+                    match = regex.search(line)
+                    if match:
+                        return match
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"{self.name} never printed {pattern!r}")
+                self.changed.wait(remaining)
+
+    def matches(self, pattern):
+        with self.changed:
+            return [match for match in map(re.compile(pattern).search, self.lines) if match]
+
+    def signal(self, signum):
+        try:
+            os.killpg(self.process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def request_json(url, payload=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def wait_for_backend(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return request_json(f'{url}/api/health')
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"Backend did not come up at {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=6)
+    parser.add_argument('--lease', type=int, default=6, help='lease seconds (RENDER_LEASE_S)')
+    parser.add_argument('--port', type=int, default=5077)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the queue to drain')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='render_workers_test_')
+    url = f'http://127.0.0.1:{args.port}'
+    run_id = f'workers{os.getpid()}'
+    env = dict(os.environ, PYTHONUNBUFFERED='1', RENDER_WORKER_TOKEN=TOKEN, RENDER_BACKEND_URL=url,
+               RENDER_LEASE_S=str(args.lease), RENDER_WORKERS='0', PORT=str(args.port),
+               DATABASE=os.path.join(scratch, 'users.db'), RENDER_PROGRESSIVE='0', RENDER_SECTION_WORKERS='1',
+               RENDER_CACHE_DIR=os.path.join(scratch, 'render_cache'),
+               RENDER_UPLOAD_DIR=os.path.join(scratch, 'uploads'),
+               MEDIA_ASSETS_DIR=os.path.join(scratch, 'media'),
+               # The scratch database knows none of the shared videos directory's files
+               STORAGE_SWEEP_INTERVAL_S='0')
+    processes = []
+
+    def start(name, args_, env_=env):
+        process = Process(name, args_, env_, BACKEND_DIR)
+        processes.append(process)
+        return process
+
+    def start_node(name):
+        node_env = dict(env, RENDER_WORK_DIR=os.path.join(scratch, name, 'work'),
+                        PARTIAL_CACHE_DIR=os.path.join(scratch, name, 'partial_movies'))
+        return start(name, [sys.executable, 'render_node.py', '--workers', '1', '--name', name], node_env)
+
+    failures = []
+    try:
+        start('backend', [sys.executable, 'app.py'])
+        wait_for_backend(url, 60)
+
+        job_ids = []
+        for index in range(args.jobs):
+            response = request_json(f'{url}/api/render-video', {
+                'manimCode': SCENE.format(index=index, wait=0.5 + index / 10),
+                'fileName': f'{run_id} {index}',
+                'topic': f'Render worker test {index}',
+                'quality': '360p10',
+                'adaptive': False,
+            })
+            job_ids.append(response['job_id'])
+        print(f"Queued render jobs {job_ids}")
+
+        frozen = start_node('frozen')
+        frozen_job = int(frozen.wait_for(r'Leased render job (\d+)', 60).group(1))
+        frozen.signal(signal.SIGSTOP)
+        print(f"Froze node 'frozen' holding job {frozen_job}")
+
+        killed = start_node('killed')
+        killed_job = int(killed.wait_for(r'Leased render job (\d+)', 60).group(1))
+        killed.signal(signal.SIGKILL)
+        print(f"Killed node 'killed' holding job {killed_job}")
+
+        healthy = [start_node('healthy-a'), start_node('healthy-b')]
+
+        deadline = time.monotonic() + args.timeout
+        jobs = {}
+        while time.monotonic() < deadline:
+            jobs = {job_id: request_json(f'{url}/api/render-jobs/{job_id}')['job'] for job_id in job_ids}
+            if all(job['status'] in ('completed', 'failed') for job in jobs.values()):
+                break
+            time.sleep(1)
+
+        frozen.signal(signal.SIGCONT)
+        try:
+            frozen.wait_for(rf'Lost the lease on render job {frozen_job}\b', 3 * args.lease + 30)
+        except TimeoutError as e:
+            failures.append(str(e))
+
+        published = {}
+        for node in [frozen] + healthy:
+            for match in node.matches(r'Published render job (\d+)'):
+                published.setdefault(int(match.group(1)), []).append(node.name)
+
+        for job_id in job_ids:
+            job = jobs.get(job_id, {})
+            if job.get('status') != 'completed':
+                failures.append(f"job {job_id} is {job.get('status')}: {job.get('error')}")
+            if len(published.get(job_id, [])) != 1:
+                failures.append(f"job {job_id} was published by {published.get(job_id, [])}, not exactly one node")
+            files = glob.glob(os.path.join(VIDEOS_DIR, f'*{run_id}*-{job_id}.mp4'))
+            if len(files) != 1:
+                failures.append(f"job {job_id} has {len(files)} published files")
+        for job_id, name in ((frozen_job, 'frozen'), (killed_job, 'killed')):
+            worker = jobs.get(job_id, {}).get('worker') or ''
+            if not worker.startswith('healthy-'):
+                failures.append(f"job {job_id} leased to the {name} node was finished by {worker!r}")
+        leftovers = glob.glob(os.path.join(VIDEOS_DIR, f'.*{run_id}*'))
+        if leftovers:
+            failures.append(f"staging files left behind: {leftovers}")
+    finally:
+        for process in reversed(processes):
+            process.signal(signal.SIGCONT)
+            process.signal(signal.SIGTERM)
+        for process in processes:
+            try:
+                process.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.signal(signal.SIGKILL)
+        for path in glob.glob(os.path.join(VIDEOS_DIR, f'*{run_id}*')):
+            os.remove(path)
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        return 1
+    print(f"\nOK: {args.jobs} jobs published exactly once; the frozen and killed nodes' leases were requeued")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Correctness test: section-parallel renders must match serial renders frame for frame.
+
+Renders each sample lesson twice on the render zygote, once serially and
+once split into parallel animation ranges, decodes both videos with PyAV and
+compares the frame count and a hash of every decoded frame. Run with the
+backend venv so PyAV is available:
+
+    backend/venv312/bin/python test_section_parallel.py --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+import manim_render  # noqa: E402
+
+LESSONS_DIR = os.path.join(ROOT_DIR, 'backend', 'benchmarks', 'lessons')
+
+
+def frame_hashes(video_path):
+    import av
+
+    disk_path = os.path.join(manim_render.VIDEOS_DIR, os.path.basename(video_path))
+    hashes = []
+    with av.open(disk_path) as container:
+        for frame in container.decode(video=0):
+            hashes.append(hashlib.sha1(frame.to_ndarray(format='rgb24').tobytes()).hexdigest())
+    os.remove(disk_path)
+    return hashes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('lessons', nargs='*', help='lesson scripts (default: backend/benchmarks/lessons/*.py)')
+    args = parser.parse_args()
+
+    # The sample lessons are short; split them anyway
+    manim_render.RENDER_PARALLEL_MIN_ANIMATIONS = 2
+    lessons = args.lessons or sorted(glob.glob(os.path.join(LESSONS_DIR, '*.py')))
+    run_id = int(time.time())
+    failures = []
+
+    for index, path in enumerate(lessons):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            code = f.read()
+
+        started = time.perf_counter()
+        serial = manim_render.render(code, f'{name} serial', f'{run_id}s{index}', runner='zygote', section_workers=1)
+        serial_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        parallel = manim_render.render(code, f'{name} parallel', f'{run_id}p{index}', runner='zygote',
+                                       section_workers=args.workers)
+        parallel_seconds = time.perf_counter() - started
+
+        serial_frames = frame_hashes(serial)
+        parallel_frames = frame_hashes(parallel)
+        mismatched = [i for i, (a, b) in enumerate(zip(serial_frames, parallel_frames)) if a != b]
+        status = 'OK'
+        if len(serial_frames) != len(parallel_frames):
+            status = 'FAILED'
+            failures.append(f'{name}: {len(serial_frames)} serial frames vs {len(parallel_frames)} parallel')
+        elif mismatched:
+            status = 'FAILED'
+            failures.append(f'{name}: {len(mismatched)} frames differ, first at frame {mismatched[0]}')
+        print(f"  {name}: {status} {len(serial_frames)} frames, serial {serial_seconds:.1f}s, "
+              f"parallel {parallel_seconds:.1f}s")
+
+    if failures:
+        print("FAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print(f"All {len(lessons)} lessons render identically in parallel")
+
+
+if __name__ == '__main__':
+    main()